@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+MCP 서버 기동 시간 벤치마크
+Claude Desktop처럼 mcp_wrapper.py를 새 프로세스로 띄우고 첫 initialize 응답까지의
+시간을 잰 뒤, python -X importtime으로 import 시간 내역을 보여준다.
+사용법: python3 benchmarks/bench_startup.py [-n 반복 수] [--max-ms 기준] [비교할 mcp_wrapper.py 경로 ...]
+  --max-ms를 주면 중앙값이 기준을 넘을 때 종료 코드 1 (회귀 감지용)
+  비교 대상 디렉터리에 printer.py도 함께 두면 해당 버전의 printer를 사용한다.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INITIALIZE = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}}).encode() + b"\n"
+
+
+def spawn_to_initialize(wrapper_path):
+    """프로세스 생성부터 첫 initialize 응답 수신까지의 시간(ms)"""
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, wrapper_path],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env,
+    )
+    process.stdin.write(INITIALIZE)
+    process.stdin.flush()
+    response = process.stdout.readline()
+    elapsed = (time.perf_counter() - started) * 1000
+    process.stdin.close()
+    process.wait()
+    assert b'"protocolVersion"' in response, response
+    return elapsed
+
+
+def import_breakdown(wrapper_path, top=12):
+    """-X importtime 결과에서 누적 시간이 큰 모듈 목록 [(누적 us, 자체 us, 모듈)]"""
+    directory, filename = os.path.split(os.path.abspath(wrapper_path))
+    module = os.path.splitext(filename)[0]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([directory, ROOT])}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=directory,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCP 서버 기동 시간 벤치마크")
+    parser.add_argument("wrappers", nargs="*", help="비교할 mcp_wrapper.py 경로")
+    parser.add_argument("-n", "--runs", type=int, default=20, help="반복 횟수 (기본값: 20)")
+    parser.add_argument("--max-ms", type=float, help="중앙값 허용 기준 (ms)")
+    args = parser.parse_args()
+
+    wrappers = [os.path.join(ROOT, "mcp_wrapper.py")] + args.wrappers
+    medians = []
+    for path in wrappers:
+        samples = sorted(spawn_to_initialize(path) for _ in range(args.runs))
+        median = statistics.median(samples)
+        medians.append(median)
+        print(f"{path}")
+        print(f"  spawn → initialize: min {samples[0]:.1f} ms  median {median:.1f} ms  "
+              f"max {samples[-1]:.1f} ms  ({args.runs}회)")
+        print("  import 누적 시간 상위:")
+        for cumulative, self_time, name in import_breakdown(path):
+            print(f"    {cumulative / 1000:>7.1f} ms (자체 {self_time / 1000:>5.1f} ms) {name}")
+
+    if args.max_ms is not None and medians[0] > args.max_ms:
+        print(f"❌ 기동 시간 회귀: {medians[0]:.1f} ms > {args.max_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
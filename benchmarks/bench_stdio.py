@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+MCP stdio 전송 처리량 벤치마크
+mcp_wrapper.py 프로세스에 tools/list 요청을 한꺼번에 흘려 넣고 초당 처리 메시지 수를 잰다.
+사용법: python3 benchmarks/bench_stdio.py [요청 수] [비교할 mcp_wrapper.py 경로 ...]
+  예) git show HEAD~1:mcp_wrapper.py > /tmp/old_wrapper.py
+      python3 benchmarks/bench_stdio.py 5000 /tmp/old_wrapper.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def flood(wrapper_path, count):
+    """count개의 tools/list 요청을 보내고 모든 응답을 받을 때까지의 시간(초)"""
+    payload = "".join(
+        json.dumps({"jsonrpc": "2.0", "id": i, "method": "tools/list"}) + "\n" for i in range(count)
+    ).encode()
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    process = subprocess.Popen(
+        [sys.executable, wrapper_path],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env,
+    )
+    # 첫 응답으로 프로세스 기동 시간을 측정에서 제외
+    process.stdin.write(b'{"jsonrpc": "2.0", "id": -1, "method": "initialize"}\n')
+    process.stdin.flush()
+    process.stdout.readline()
+
+    def feed():
+        process.stdin.write(payload)
+        process.stdin.close()
+
+    # 응답을 읽으면서 동시에 써야 파이프 버퍼가 차서 멈추지 않는다
+    started = time.perf_counter()
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+    received = sum(1 for _ in process.stdout)
+    elapsed = time.perf_counter() - started
+    feeder.join()
+    process.wait()
+    assert received == count, f"응답 {received}/{count}개"
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    wrappers = [os.path.join(ROOT, "mcp_wrapper.py")] + sys.argv[2:]
+    for path in wrappers:
+        elapsed = flood(path, count)
+        print(f"{os.path.relpath(path):<30} {count / elapsed:>10,.0f} msg/s  ({elapsed * 1000:.0f} ms / {count})")
+
+
+if __name__ == "__main__":
+    main()
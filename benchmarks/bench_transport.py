@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+출력 전송 경로 벤치마크: lp(임시 파일) vs lp(stdin 파이프) vs raw 소켓(9100) 연결 풀
+로컬 가짜 raw 프린터 서버와 PATH에 올린 가짜 lp 스크립트를 사용한다.
+사용법: python3 benchmarks/bench_transport.py [작업 수]
+"""
+
+import os
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import printer
+
+FAKE_LP = """#!/bin/sh
+# CUPS lp 대용: 입력을 읽고 버린 뒤 작업 ID 출력
+for last; do :; done
+if [ -f "$last" ]; then cat "$last" > /dev/null; else cat > /dev/null; fi
+echo "request id is FAKE-1 (1 file(s))"
+"""
+
+
+class _SinkHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while self.request.recv(65536):
+            pass
+
+
+def install_fake_lp(directory):
+    """가짜 lp 스크립트를 만들고 PATH 앞에 추가"""
+    path = os.path.join(directory, "lp")
+    with open(path, "w") as f:
+        f.write(FAKE_LP)
+    os.chmod(path, 0o755)
+    os.environ["PATH"] = directory + os.pathsep + os.environ["PATH"]
+
+
+def measure(label, printer_name, jobs, spool=printer.SPOOL_STDIN):
+    """printer_print를 jobs번 호출해 처리량과 지연 시간 출력"""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(jobs):
+        t0 = time.perf_counter()
+        ok = printer.printer_print(f"벤치마크 작업 {i} 우유 사오기", printer_name, True, spool)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        assert ok, f"{label} 출력 실패"
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<11} {jobs / elapsed:>10.1f} jobs/s  "
+          f"p50 {statistics.median(latencies):>7.3f} ms  p99 {p99:>7.3f} ms")
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SinkHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as bin_dir:
+            install_fake_lp(bin_dir)
+            measure("lp-tempfile", "BENCH_PRINTER", jobs, printer.SPOOL_TEMPFILE)
+            measure("lp-stdin", "BENCH_PRINTER", jobs, printer.SPOOL_STDIN)
+            measure("raw", f"socket://127.0.0.1:{server.server_address[1]}", jobs)
+    finally:
+        printer.raw_pool.close()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+텍스트 폭 계산 마이크로벤치마크
+사용법: python3 benchmarks/bench_width.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from printer import get_text_width
+
+
+def legacy_get_text_width(text):
+    """기존 문자 단위 루프 구현 (비교 기준)"""
+    width = 0
+    for char in text:
+        if ord(char) > 127:
+            width += 2
+        else:
+            width += 1
+    return width
+
+
+SAMPLES = {
+    "ascii": "Buy milk and prepare the meeting slides " * 25,
+    "hangul": "우유사오기회의준비사항프레젠테이션자료준비" * 50,
+    "mixed": "오늘 할일: 운동, 장보기, 청소 (Latte 2잔) " * 30,
+    # CP949로 인코딩되지 않는 문자(반각 가나)가 섞여 테이블 경로를 타는 경우
+    "table": "할일 ｱｲｳ 체크 ﾁｪｯｸ " * 60,
+}
+
+
+def chars_per_sec(func, text, number=2000):
+    """func(text)를 반복 실행해 초당 처리 문자 수 계산"""
+    elapsed = min(timeit.repeat(lambda: func(text), number=number, repeat=3))
+    return len(text) * number / elapsed
+
+
+def main():
+    print(f"{'sample':<8} {'chars':>6} {'legacy c/s':>14} {'table c/s':>14} {'speedup':>8}")
+    for name, text in SAMPLES.items():
+        legacy = chars_per_sec(legacy_get_text_width, text)
+        current = chars_per_sec(get_text_width, text)
+        print(f"{name:<8} {len(text):>6} {legacy:>14,.0f} {current:>14,.0f} {current / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
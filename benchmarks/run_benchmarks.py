@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+렌더링/출력 파이프라인 벤치마크 모음
+PATH 앞에 가짜 lp/lpstat을 올려 실제 프린터 없이 실행하며, 항목별
+ops/sec, p50/p99 지연 시간, 최대 메모리를 JSON으로 출력한다.
+사용법: python3 benchmarks/run_benchmarks.py [-o 결과.json] [--compare 이전결과.json] [--quick]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import printer
+import raster
+from mcp_wrapper import MCPServer
+
+FAKE_LP = """#!/bin/sh
+# CUPS lp 대용: 입력을 읽고 버린 뒤 작업 ID 출력
+for last; do :; done
+if [ -f "$last" ]; then cat "$last" > /dev/null; else cat > /dev/null; fi
+echo "request id is BENCH-1 (1 file(s))"
+"""
+
+FAKE_LPSTAT = """#!/bin/sh
+# CUPS lpstat 대용: 고정된 프린터 상태 출력
+echo "printer BENCH_PRINTER is idle.  enabled since Mon 01 Jan 2024"
+[ "$1" = "-l" ] && echo "BENCH_PRINTER accepting requests since Mon 01 Jan 2024"
+exit 0
+"""
+
+MEMO = "오늘 할일: 우유 사오기, 회의 준비사항 정리, Latte 2잔 주문, 프레젠테이션 자료 준비 " * 3
+LONG_DOCUMENT = "회의록 메모 Meeting notes 결정 사항과 후속 조치 항목 " * 400
+RASTER_LINE = "Coffee ☕ 2 cups, call Mina 📞 at 3pm!!!"  # 40칸을 채우는 래스터 줄
+
+
+def install_fake_cups(directory):
+    """가짜 lp/lpstat을 만들고 PATH 앞에 추가"""
+    for name, script in (("lp", FAKE_LP), ("lpstat", FAKE_LPSTAT)):
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(script)
+        os.chmod(path, 0o755)
+    os.environ["PATH"] = directory + os.pathsep + os.environ["PATH"]
+
+
+def _percentile(sorted_samples, fraction):
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * fraction))]
+
+
+def _summarize(samples_ns, peak_bytes):
+    samples_ns.sort()
+    total = sum(samples_ns)
+    return {
+        "iterations": len(samples_ns),
+        "ops_per_sec": round(len(samples_ns) / (total / 1e9), 1) if total else None,
+        "p50_us": round(_percentile(samples_ns, 0.50) / 1000, 2),
+        "p99_us": round(_percentile(samples_ns, 0.99) / 1000, 2),
+        "peak_bytes": peak_bytes,
+    }
+
+
+def measure(func, budget, max_iterations, setup=None):
+    """동기 함수 반복 측정 (시간 예산 또는 최대 반복 수까지)"""
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < max_iterations and time.perf_counter() < deadline:
+        if setup:
+            setup()
+        started = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - started)
+
+    # 메모리 측정은 별도 1회 실행 (tracemalloc이 실행 시간을 왜곡하므로)
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return _summarize(samples, peak)
+
+
+def measure_async(coroutine_func, budget, max_iterations, setup=None):
+    """코루틴 함수를 하나의 이벤트 루프 안에서 반복 측정"""
+
+    async def run():
+        samples = []
+        deadline = time.perf_counter() + budget
+        while len(samples) < max_iterations and time.perf_counter() < deadline:
+            if setup:
+                setup()
+            started = time.perf_counter_ns()
+            await coroutine_func()
+            samples.append(time.perf_counter_ns() - started)
+        if setup:
+            setup()
+        tracemalloc.start()
+        await coroutine_func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return _summarize(samples, peak)
+
+    return asyncio.run(run())
+
+
+def build_cases():
+    """(이름, 측정 함수, 비동기 여부, setup) 목록"""
+    lines = printer.prepare_print_content(MEMO)
+    content = printer.create_esc_pos_content(lines)
+    server = MCPServer()
+    clear_cache = printer.render_cache.clear
+
+    def request(name, arguments, request_id=1):
+        return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                "params": {"name": name, "arguments": arguments}}
+
+    print_request = request("print_memo", {"text": MEMO, "printer_name": "BENCH_PRINTER"})
+    status_request = request("get_printer_status", {"printer_name": "BENCH_PRINTER"})
+    tools_list = {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}
+
+    # 래스터 줄 조립 (p50_us / 1000 = 40칸 한 줄당 ms)
+    renderer = raster.RasterRenderer(printer.PAPER_WIDTH)
+
+    def cold_renderer():
+        nonlocal renderer
+        renderer = raster.RasterRenderer(printer.PAPER_WIDTH)
+
+    return [
+        ("get_text_width/ascii", lambda: printer.get_text_width("Buy milk and prepare slides " * 20), False, None),
+        ("get_text_width/hangul", lambda: printer.get_text_width(MEMO), False, None),
+        ("wrap_text/memo", lambda: printer.wrap_text(MEMO), False, None),
+        ("wrap_text/long_document", lambda: printer.wrap_text(LONG_DOCUMENT), False, None),
+        ("prepare_print_content", lambda: printer.prepare_print_content(MEMO), False, None),
+        ("create_esc_pos_content", lambda: printer.create_esc_pos_content(lines), False, None),
+        ("optimize_esc_pos", lambda: printer.optimize_esc_pos(content), False, None),
+        ("raster_line/cold_glyphs", lambda: renderer.band(RASTER_LINE), False, cold_renderer),
+        ("raster_line/warm_glyphs", lambda: renderer.bitmap(RASTER_LINE), False, None),
+        ("raster_line/band_cached", lambda: renderer.band(RASTER_LINE), False, None),
+        ("printer_preview/cold", lambda: printer.printer_preview(MEMO), False, clear_cache),
+        ("printer_preview/cached", lambda: printer.printer_preview(MEMO), False, None),
+        ("handle_request/tools_list", lambda: server.handle_request(tools_list), True, None),
+        ("handle_request/get_printer_status", lambda: server.handle_request(status_request), True,
+         server.status_cache.invalidate),
+        ("handle_request/print_memo", lambda: server.handle_request(print_request), True, None),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, previous_path):
+    """이전 결과 JSON과 ops/sec 비교 출력 (stderr)"""
+    with open(previous_path) as f:
+        previous = json.load(f)["results"]
+    print(f"{'benchmark':<36} {'before':>12} {'after':>12} {'ratio':>7}", file=sys.stderr)
+    for name, result in current.items():
+        before = previous.get(name, {}).get("ops_per_sec")
+        after = result["ops_per_sec"]
+        ratio = f"{after / before:.2f}x" if before and after else "-"
+        print(f"{name:<36} {before or '-':>12} {after:>12} {ratio:>7}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="렌더링/출력 파이프라인 벤치마크")
+    parser.add_argument("-o", "--output", help="결과 JSON 저장 경로 (기본값: stdout)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 경로")
+    parser.add_argument("--quick", action="store_true", help="항목당 시간 예산을 줄여 빠르게 실행")
+    parser.add_argument("-k", "--filter", default="", help="이름에 이 문자열이 포함된 항목만 실행")
+    args = parser.parse_args()
+
+    budget = 0.2 if args.quick else 1.0
+    results = {}
+    with tempfile.TemporaryDirectory() as bin_dir:
+        install_fake_cups(bin_dir)
+        for name, func, is_async, setup in build_cases():
+            if args.filter not in name:
+                continue
+            # 서브프로세스를 띄우는 항목은 반복 수를 제한
+            max_iterations = 200 if "print_memo" in name or "status" in name else 100000
+            runner = measure_async if is_async else measure
+            results[name] = runner(func, budget, max_iterations, setup)
+            print(f"  {name:<36} {results[name]['ops_per_sec']:>12,.1f} ops/s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
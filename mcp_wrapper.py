@@ -7,11 +7,12 @@ Claude Desktop과 printer 간의 직접 인터페이스
 import json
 import sys
 import os
+import time
 import asyncio
+import threading
 import printer
 from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
 
 # MCP 프로토콜 관련 상수
 MCP_VERSION = "2024-11-05"
@@ -19,13 +20,565 @@ SERVER_NAME = "todo-printer"
 SERVER_VERSION = "1.0.0"
 
 # MCP 서버 설정 (환경변수 의존성 제거)
+STATUS_TTL = 5.0            # 상태 캐시 신선 기간 (초)
+STATUS_STALE_TTL = 60.0     # 만료 후에도 즉시 반환하며 백그라운드 갱신하는 기간 (초)
+STATUS_HOT_WINDOW = 300.0   # 백그라운드 폴러가 갱신을 유지하는 최근 조회 기간 (초)
+STATUS_POLL_INTERVAL = 3.0  # 백그라운드 폴러 주기 (초)
+BATCH_CONCURRENCY = 8       # JSON-RPC 배치 요청 동시 처리 수
+MAX_CONCURRENT_REQUESTS = 16  # stdio 루프에서 동시에 처리하는 요청 수
+MAX_FRAME_SIZE = 1024 * 1024  # 요청 한 줄(프레임) 최대 크기 (바이트)
+MAX_MEMO_LENGTH = 500       # 메모 하나의 최대 글자 수
+MAX_MEMOS_PER_JOB = 50      # print_memos 한 번에 출력할 수 있는 메모 수
+COALESCE_WINDOW = 0.2       # print_memo 요청을 모아 한 작업으로 합치는 대기 시간 (초)
+COALESCE_MAX_JOBS = 10      # 대기 시간 전이라도 이만큼 모이면 바로 출력
+PRINTER_IDLE_TIMEOUT = 30.0  # 프린터별 작업자가 일 없이 이만큼 지나면 종료 (초)
+INVENTORY_CACHE_KEY = ("inventory",)  # 전체 프린터 목록 캐시 키 (프린터 이름과 겹치지 않게 튜플)
+PROFILE_ENV = "TODO_PRINTER_PROFILE"  # 프로파일링 설정 (예: "every=10,threshold_ms=200,dir=/tmp/prof")
+PROFILE_TOP_N = 15                    # 로그에 남기는 누적 시간 상위 함수 수
+
+
+class StatusCache:
+    """프린터 상태 TTL 캐시 (stale-while-revalidate)
+
+    - 신선(ttl 이내): 캐시 값 즉시 반환
+    - 만료(stale_ttl 이내): 캐시 값을 즉시 반환하고 백그라운드에서 갱신
+    - 그 외: 조회 완료까지 대기 (같은 키의 동시 조회는 하나로 합침)
+    """
+
+    def __init__(self, ttl: float = STATUS_TTL, stale_ttl: float = STATUS_STALE_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: Dict[Any, Dict[str, Any]] = {}
+        self._refreshing: Dict[Any, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(self, key, fetch):
+        """key의 캐시 값 반환 (fetch: 값을 새로 조회하는 인자 없는 코루틴 함수)"""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry["accessed_at"] = now
+            age = now - entry["fetched_at"]
+            if age < self.ttl:
+                self.hits += 1
+                printer.metrics.inc("status_cache_total", result="hit")
+                return entry["value"]
+            if age < self.stale_ttl:
+                self.stale_hits += 1
+                printer.metrics.inc("status_cache_total", result="stale")
+                self._start_refresh(key, fetch)
+                return entry["value"]
+
+        self.misses += 1
+        printer.metrics.inc("status_cache_total", result="miss")
+        return await asyncio.shield(self._start_refresh(key, fetch))
+
+    def _start_refresh(self, key, fetch) -> asyncio.Task:
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(key, fetch))
+            self._refreshing[key] = task
+        return task
+
+    async def _refresh(self, key, fetch):
+        try:
+            value = await fetch()
+            previous = self._entries.get(key)
+            now = time.monotonic()
+            self._entries[key] = {
+                "value": value,
+                "fetch": fetch,
+                "fetched_at": now,
+                "accessed_at": previous["accessed_at"] if previous else now,
+            }
+            return value
+        finally:
+            self._refreshing.pop(key, None)
+
+    def invalidate(self, key=None):
+        """key(생략 시 전체) 캐시 항목 제거"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def refresh_hot(self, hot_window: float = STATUS_HOT_WINDOW):
+        """최근 조회된 항목 중 신선 기간의 절반이 지난 것을 갱신"""
+        now = time.monotonic()
+        tasks = [
+            self._start_refresh(key, entry["fetch"])
+            for key, entry in list(self._entries.items())
+            if now - entry["accessed_at"] < hot_window and now - entry["fetched_at"] >= self.ttl / 2
+        ]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        """캐시 적중/실패 카운터"""
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
+
+
+class PrintCoalescer:
+    """짧은 시간 안에 몰린 출력 요청을 프린터별로 모아 작업 하나로 출력
+
+    프린터별 첫 요청부터 window초 동안(또는 max_jobs개가 모일 때까지) 기다린 뒤
+    모인 메모를 ESC/POS 스트림 하나로 합쳐 한 번에 제출한다 (초기화 명령은 한 번,
+    절단은 메모마다). 각 호출자는 자기 메모의 결과만 받는다.
+    """
+
+    def __init__(self, window: float = COALESCE_WINDOW, max_jobs: int = COALESCE_MAX_JOBS,
+                 submit=None):
+        self.window = window
+        self.max_jobs = max_jobs
+        # submit(texts, printer_name) -> 항목별 결과 목록을 돌려줄 awaitable
+        # (호출하는 순간 작업 순서가 정해지도록 프린터 대기열에 바로 넣는 함수를 줄 것)
+        self._submit = submit or (lambda texts, printer_name: printer.printer_print_many_async(
+            texts, printer_name, True, cut_each=True))
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flushing = set()
+        self.jobs = 0
+        self.batches = 0
+
+    async def submit(self, text: str, printer_name: str) -> Dict[str, Any]:
+        """메모 하나를 대기열에 넣고 출력 결과({"success", "lines", "error"})를 기다림"""
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(printer_name)
+        if batch is None:
+            batch = self._pending[printer_name] = {
+                "texts": [],
+                "futures": [],
+                "timer": loop.call_later(self.window, self._flush, printer_name),
+            }
+        future = loop.create_future()
+        batch["texts"].append(text)
+        batch["futures"].append(future)
+        self.jobs += 1
+        if len(batch["texts"]) >= self.max_jobs:
+            self._flush(printer_name)
+        # 호출자가 취소되어도 이미 모인 작업은 출력
+        return await asyncio.shield(future)
+
+    def flush(self, printer_name: str):
+        """printer_name에 모여 있는 메모를 기다리지 않고 바로 제출
+
+        모으지 않는 작업(print_memos 등)을 같은 프린터에 내기 전에 호출하면 먼저 들어온
+        메모가 먼저 출력된다.
+        """
+        self._flush(printer_name)
+
+    def _flush(self, printer_name: str):
+        batch = self._pending.pop(printer_name, None)
+        if batch is None:
+            return
+        batch["timer"].cancel()
+        self.batches += 1
+        submission = self._submit(batch["texts"], printer_name)
+        task = asyncio.ensure_future(self._run(batch, submission))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _run(self, batch: Dict[str, Any], submission):
+        try:
+            results = await submission
+        except Exception as e:
+            results = [{"success": False, "lines": 0, "error": f"출력 오류: {e}"} for _ in batch["texts"]]
+        for future, result in zip(batch["futures"], results):
+            if not future.done():
+                future.set_result(result)
+
+    async def drain(self):
+        """대기 중인 작업을 모두 바로 출력하고 끝날 때까지 대기"""
+        for printer_name in list(self._pending):
+            self._flush(printer_name)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        """받은 요청 수, 제출한 작업 수, 대기 중인 요청 수"""
+        return {
+            "jobs": self.jobs,
+            "batches": self.batches,
+            "pending": sum(len(batch["texts"]) for batch in self._pending.values()),
+        }
+
+
+class PrinterScheduler:
+    """프린터별 FIFO 작업자
+
+    같은 프린터의 작업은 들어온 순서대로 하나씩 실행해 CUPS 작업이나 raw 소켓
+    전송이 섞이지 않게 하고, 다른 프린터의 작업은 서로 기다리지 않고 동시에 실행한다.
+    작업자는 프린터의 첫 작업이 들어올 때 만들고 idle_timeout초 동안 일이 없으면 종료한다.
+    """
+
+    def __init__(self, idle_timeout: float = PRINTER_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._running = set()
+        self.jobs = 0
+        self.started = 0
+        self.reaped = 0
+
+    async def submit(self, printer_name: str, job) -> Any:
+        """job(인자 없는 코루틴 함수)을 프린터 대기열 끝에 넣고 결과를 기다림"""
+        # 호출자가 취소되어도 대기열에 들어간 작업은 출력
+        return await asyncio.shield(self.enqueue(printer_name, job))
+
+    def enqueue(self, printer_name: str, job) -> asyncio.Future:
+        """job을 지금 바로 프린터 대기열 끝에 넣고 결과 Future 반환 (submit의 동기 버전)"""
+        loop = asyncio.get_running_loop()
+        worker = self._workers.get(printer_name)
+        # 이벤트 루프가 바뀌었으면(테스트의 asyncio.run 반복 등) 이전 작업자는 버리고 새로 만듦
+        if worker is None or worker.done() or worker.get_loop() is not loop:
+            queue = self._queues[printer_name] = asyncio.Queue()
+            self._workers[printer_name] = asyncio.ensure_future(self._work(printer_name, queue))
+            self._running.discard(printer_name)
+            self.started += 1
+        future = loop.create_future()
+        self._queues[printer_name].put_nowait((job, future, time.perf_counter()))
+        self.jobs += 1
+        return future
+
+    async def _work(self, printer_name: str, queue: asyncio.Queue):
+        while True:
+            try:
+                job, future, queued_at = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    if self._queues.get(printer_name) is queue:
+                        del self._queues[printer_name]
+                        del self._workers[printer_name]
+                    self.reaped += 1
+                    return
+                continue
+            printer.metrics.observe("stage_seconds", time.perf_counter() - queued_at, stage="printer_queue")
+            self._running.add(printer_name)
+            try:
+                result = await job()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._running.discard(printer_name)
+                queue.task_done()
+
+    def depths(self) -> Dict[str, int]:
+        """프린터별 대기 중 + 실행 중인 작업 수"""
+        return {
+            name: queue.qsize() + (name in self._running)
+            for name, queue in self._queues.items()
+        }
+
+    async def drain(self):
+        """지금까지 들어온 작업이 모두 끝날 때까지 대기"""
+        loop = asyncio.get_running_loop()
+        queues = [queue for name, queue in self._queues.items() if self._workers[name].get_loop() is loop]
+        await asyncio.gather(*(queue.join() for queue in queues))
+
+    def close(self):
+        """작업자 종료 (drain 후 서버 종료 시 호출)"""
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._queues.clear()
+        self._running.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """작업자 수, 받은 작업 수, 생성/종료된 작업자 수, 프린터별 대기열 깊이"""
+        return {
+            "workers": len(self._workers),
+            "jobs": self.jobs,
+            "started": self.started,
+            "reaped": self.reaped,
+            "depths": self.depths(),
+        }
+
+
+class RequestProfiler:
+    """도구 호출 cProfile 프로파일러 (선택 기능)
+
+    every_n번째 도구 호출마다 프로파일링하고, 처리 시간이 threshold_ms 이상인
+    경우에만 .prof 파일을 저장하고 누적 시간 상위 top_n 함수를 로그로 남긴다.
+    cProfile은 스레드당 하나만 켤 수 있으므로 프로파일링 중인 호출이 있으면
+    다른 호출은 건너뛴다. 프로파일에는 대기 중 실행된 다른 태스크도 섞여 나온다.
+    """
+
+    def __init__(self, every_n: int = 1, threshold_ms: float = 0.0, directory: str = ".",
+                 top_n: int = PROFILE_TOP_N, log=None):
+        if every_n < 1:
+            raise ValueError(f"every_n은 1 이상이어야 합니다: {every_n}")
+        self.every_n = every_n
+        self.threshold_ms = threshold_ms
+        self.directory = directory
+        self.top_n = top_n
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self.calls = 0
+        self.dumps = 0
+        self._active = False
+
+    @classmethod
+    def from_options(cls, options: Union[Dict[str, Any], bool], log=None) -> Optional["RequestProfiler"]:
+        """initialize 옵션/환경변수 설정으로 생성 (비활성 설정이면 None)
+
+        options가 True이면 기본값으로 켜고 False이면 끈다. 값이 잘못되면
+        TypeError/ValueError를 그대로 올린다.
+        """
+        if options is True:
+            options = {}
+        elif not options:
+            return None
+        if not isinstance(options, dict):
+            raise TypeError(f"프로파일링 옵션은 객체 또는 true/false여야 합니다: {options!r}")
+        if not options.get("enabled", True):
+            return None
+        return cls(
+            every_n=int(options.get("every_n", options.get("every", 1))),
+            threshold_ms=float(options.get("threshold_ms", 0.0)),
+            directory=str(options.get("dir", ".")),
+            top_n=int(options.get("top_n", options.get("top", PROFILE_TOP_N))),
+            log=log,
+        )
+
+    @staticmethod
+    def parse_spec(spec: str) -> Dict[str, str]:
+        """"every=10,threshold_ms=200,dir=/tmp/prof" 형식 문자열을 옵션 딕셔너리로 변환"""
+        options = {}
+        for item in spec.split(","):
+            key, sep, value = item.partition("=")
+            if key.strip():
+                options[key.strip()] = value.strip() if sep else "1"
+        return options
+
+    def begin(self):
+        """이번 호출을 프로파일링하면 (Profile, 시작 시각), 아니면 None"""
+        self.calls += 1
+        if self._active or self.calls % self.every_n:
+            return None
+        import cProfile  # 프로파일링을 켠 경우에만 필요
+
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile, time.perf_counter()
+
+    def finish(self, token, label: str):
+        """프로파일링 종료, 임계값 이상이면 .prof 저장과 상위 함수 로그"""
+        profile, started = token
+        profile.disable()
+        self._active = False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return None
+
+        import io
+        import pstats
+
+        path = os.path.join(self.directory, f"request-{self.calls:05d}-{label}-{elapsed_ms:.0f}ms.prof")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(path)
+        except OSError as e:
+            # 프로파일 저장 실패가 도구 호출 결과에 영향을 주지 않도록 로그만 남김
+            self.log(f"Profile dump failed: {e}")
+            return None
+        self.dumps += 1
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(self.top_n)
+        self.log(f"Profiled {label} ({elapsed_ms:.1f}ms) -> {path}\n{summary.getvalue()}")
+        return path
+
+
+# 응답 템플릿에서 요청마다 바뀌는 값이 들어갈 자리 표시 (JSON 문자열로는 이스케이프되어 나타남)
+_ID_SLOT = "\x00id\x00"
+_MESSAGE_SLOT = "\x00message\x00"
+
+
+class PreSerializedResponse(dict):
+    """직렬화된 JSON 문자열(json 속성)을 함께 가진 응답 딕셔너리
+
+    result/error 객체는 템플릿과 공유하므로 수정하면 안 된다.
+    """
+
+    __slots__ = ("json",)
+
+
+class ResponseTemplate:
+    """id(와 오류 메시지)만 바뀌는 고정 JSON-RPC 응답 템플릿
+
+    본문은 생성 시 한 번만 직렬화하고, render()에서는 id와 message만
+    JSON으로 변환해 미리 만든 조각 사이에 끼워 넣는다.
+    """
+
+    def __init__(self, body_key: str, body: Dict[str, Any]):
+        self.body_key = body_key
+        self.body = body
+        self.has_message = body.get("message") == _MESSAGE_SLOT
+        skeleton = json.dumps({"jsonrpc": "2.0", "id": _ID_SLOT, body_key: body}, ensure_ascii=False)
+        self._head, rest = skeleton.split(json.dumps(_ID_SLOT), 1)
+        if self.has_message:
+            self._middle, self._tail = rest.split(json.dumps(_MESSAGE_SLOT), 1)
+        else:
+            self._middle, self._tail = rest, ""
+
+    @classmethod
+    def error(cls, code: int, message: str = _MESSAGE_SLOT) -> "ResponseTemplate":
+        """오류 응답 템플릿 (message 생략 시 render 때 메시지를 받음)"""
+        return cls("error", {"code": code, "message": message})
+
+    def render(self, request_id: Any, message: Optional[str] = None) -> PreSerializedResponse:
+        id_json = json.dumps(request_id, ensure_ascii=False)
+        if self.has_message:
+            body = {"code": self.body["code"], "message": message}
+            serialized = self._head + id_json + self._middle + json.dumps(message, ensure_ascii=False) + self._tail
+        else:
+            body = self.body
+            serialized = self._head + id_json + self._middle
+        response = PreSerializedResponse(jsonrpc="2.0", id=request_id)
+        response[self.body_key] = body
+        response.json = serialized
+        return response
+
+
+def serialize_response(response: Any) -> str:
+    """응답(또는 배치 응답 목록)을 JSON 문자열로 변환 (미리 직렬화된 응답은 그대로 사용)"""
+    if isinstance(response, PreSerializedResponse):
+        return response.json
+    if isinstance(response, list):
+        return "[" + ", ".join(map(serialize_response, response)) + "]"
+    return json.dumps(response, ensure_ascii=False)
+
+
+# 고정 오류 응답 템플릿
+PARSE_ERROR = ResponseTemplate.error(-32700)
+INVALID_REQUEST = ResponseTemplate.error(-32600)
+METHOD_NOT_FOUND = ResponseTemplate.error(-32601)
+MISSING_TOOL_NAME = ResponseTemplate.error(-32602, "Invalid params: missing tool name")
+INTERNAL_ERROR = ResponseTemplate.error(-32603)
+
+
+class FrameTooLarge(Exception):
+    """요청 한 줄이 최대 프레임 크기를 넘음 (해당 줄은 버려짐)"""
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    """줄바꿈으로 끝나는 프레임 하나 읽기 (EOF면 b'')
+
+    프레임이 reader의 limit보다 길면 줄 끝까지 버리고 FrameTooLarge를 올린다.
+    """
+    try:
+        return await reader.readuntil(b'\n')
+    except asyncio.IncompleteReadError as e:
+        return e.partial  # 마지막 줄에 줄바꿈이 없는 경우
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+        while True:
+            await reader.readexactly(consumed)
+            try:
+                await reader.readuntil(b'\n')
+                break
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError as again:
+                consumed = again.consumed
+        raise FrameTooLarge()
+
+
+class _TextStdoutWriter:
+    """파이프가 아닌 stdout(파일, 테스트 캡처)용 StreamWriter 대용"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data: bytes):
+        self.stream.write(data.decode())
+
+    async def drain(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+
+
+async def open_stdio(limit: int = MAX_FRAME_SIZE):
+    """stdin/stdout을 이벤트 루프에 연결한 (StreamReader, writer) 반환
+
+    파이프/소켓/터미널이면 이벤트 루프가 직접 읽고 쓴다. 일반 파일이나
+    fileno가 없는 스트림(테스트의 StringIO 등)은 스레드 하나가 stdin을
+    읽어 StreamReader에 넣어 주고, stdout에는 동기적으로 쓴다.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=limit)
+
+    try:
+        stdin = open(os.dup(sys.stdin.fileno()), 'rb', buffering=0)
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stdin)
+        except BaseException:
+            stdin.close()
+            raise
+    except (OSError, ValueError, AttributeError):
+        def pump():
+            for chunk in getattr(sys.stdin, "buffer", sys.stdin):
+                data = chunk if isinstance(chunk, bytes) else chunk.encode()
+                loop.call_soon_threadsafe(reader.feed_data, data)
+            loop.call_soon_threadsafe(reader.feed_eof)
+
+        threading.Thread(target=pump, name="stdin-pump", daemon=True).start()
+
+    try:
+        sys.stdout.flush()
+        stdout = open(os.dup(sys.stdout.fileno()), 'wb', buffering=0)
+        try:
+            transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, stdout)
+        except BaseException:
+            stdout.close()
+            raise
+        writer = asyncio.StreamWriter(transport, protocol, None, loop)
+    except (OSError, ValueError, AttributeError):
+        writer = _TextStdoutWriter(sys.stdout)
+
+    return reader, writer
+
 
 class MCPServer:
     """MCP 서버 구현"""
     
-    def __init__(self):
-        # ThreadPoolExecutor로 동기 함수들을 비동기로 실행
-        self.executor = ThreadPoolExecutor(max_workers=2)
+    def __init__(self, status_ttl: float = STATUS_TTL, status_stale_ttl: float = STATUS_STALE_TTL,
+                 status_poll_interval: Optional[float] = None,
+                 batch_concurrency: int = BATCH_CONCURRENCY,
+                 max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+                 max_frame_size: int = MAX_FRAME_SIZE,
+                 profiler: Optional[RequestProfiler] = None,
+                 coalesce_window: Optional[float] = None,
+                 coalesce_max_jobs: int = COALESCE_MAX_JOBS,
+                 printer_idle_timeout: float = PRINTER_IDLE_TIMEOUT):
+        self.batch_concurrency = batch_concurrency
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_frame_size = max_frame_size
+        # lpstat 결과 캐시 (status_poll_interval 지정 시 run() 동안 백그라운드로 갱신)
+        self.status_cache = StatusCache(status_ttl, status_stale_ttl)
+        self.status_poll_interval = status_poll_interval
+        # 프린터별 FIFO 작업자 (모든 출력 작업은 여기를 거쳐 프린터마다 순서대로 실행)
+        self.scheduler = PrinterScheduler(printer_idle_timeout)
+        # print_memo 요청 병합 대기열 (coalesce_window 지정 시에만 사용)
+        self.print_queue = PrintCoalescer(coalesce_window, coalesce_max_jobs,
+                                          submit=self._print_many) if coalesce_window else None
+        # 도구 호출 프로파일러 (None이면 꺼짐, configure_profiling 또는 initialize 옵션으로 설정)
+        self.profiler = profiler
+        # ThreadPoolExecutor로 동기 함수들을 비동기로 실행 (미리보기 등 CPU 작업 전용,
+        # lp/lpstat 호출은 printer의 asyncio 서브프로세스 버전을 직접 await).
+        # 기동 시간을 줄이기 위해 처음 필요할 때 생성한다.
+        self._executor = None
         self.tools = {
             "print_memo": {
                 "name": "print_memo",
@@ -47,6 +600,72 @@ class MCPServer:
                             "type": "boolean",
                             "description": "미리보기 모드 (실제로 출력하지 않음)",
                             "default": False
+                        },
+                        "qr": {
+                            "type": "string",
+                            "maxLength": printer.QR_MAX_BYTES["M"],
+                            "description": f"본문 아래에 출력할 QR 코드 데이터 (URL 등, 프린터가 직접 생성, UTF-8 {printer.QR_MAX_BYTES['M']}바이트 이내)"
+                        },
+                        "barcode": {
+                            "type": "string",
+                            "description": "본문 아래에 출력할 바코드 데이터 (주문 번호 등)"
+                        },
+                        "barcode_type": {
+                            "type": "string",
+                            "enum": sorted(printer.BARCODE_TYPES),
+                            "description": "바코드 종류",
+                            "default": "CODE128"
+                        },
+                        "markup": {
+                            "type": "boolean",
+                            "description": "마크업 해석: '# 제목'(2배 크기), '## 제목'(세로 2배), '**굵게**', '>>오른쪽 정렬', '<<왼쪽 정렬'",
+                            "default": False
+                        }
+                    },
+                    "required": ["text"]
+                }
+            },
+            "print_memos": {
+                "name": "print_memos",
+                "description": "여러 메모(할일 목록 등)를 한 번의 출력 작업으로 출력합니다. 항목별 결과를 알려줍니다. 텍스트를 절대로 수정하지 마세요.",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "memos": {
+                            "type": "array",
+                            "description": f"출력할 메모 목록 (각 {MAX_MEMO_LENGTH}자 이내)",
+                            "items": {"type": "string", "maxLength": MAX_MEMO_LENGTH},
+                            "minItems": 1,
+                            "maxItems": MAX_MEMOS_PER_JOB
+                        },
+                        "printer_name": {
+                            "type": "string",
+                            "description": "프린터 이름",
+                            "default": "BIXOLON_SRP_330II"
+                        },
+                        "cut_each": {
+                            "type": "boolean",
+                            "description": "메모마다 용지 절단 (false면 마지막에 한 번만 절단)",
+                            "default": True
+                        }
+                    },
+                    "required": ["memos"]
+                }
+            },
+            "print_document": {
+                "name": "print_document",
+                "description": f"회의록, 로그 등 {MAX_MEMO_LENGTH}자를 넘는 긴 문서를 출력합니다. 길이 제한이 없으며 렌더링과 전송을 조각 단위로 진행합니다. 텍스트를 절대로 수정하지 마세요.",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "text": {
+                            "type": "string",
+                            "description": "출력할 문서 (길이 제한 없음)"
+                        },
+                        "printer_name": {
+                            "type": "string",
+                            "description": "프린터 이름",
+                            "default": "BIXOLON_SRP_330II"
                         }
                     },
                     "required": ["text"]
@@ -75,32 +694,136 @@ class MCPServer:
                     "required": ["printer_name"]
                 }
             },
+            "get_metrics": {
+                "name": "get_metrics",
+                "description": "단계별 처리 시간(줄바꿈, 인코딩, lp 등)과 성공/실패/캐시 적중 카운터를 조회합니다",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "format": {
+                            "type": "string",
+                            "enum": ["json", "prometheus"],
+                            "description": "출력 형식",
+                            "default": "json"
+                        },
+                        "path": {
+                            "type": "string",
+                            "description": "지정하면 Prometheus 텍스트 형식으로 이 파일에 저장"
+                        }
+                    }
+                }
+            },
         }
 
+        self._build_templates()
+
+    def _build_templates(self):
+        """initialize/tools/list 응답을 미리 직렬화 (self.tools를 바꾼 뒤에는 다시 호출)"""
+        self.initialize_template = ResponseTemplate("result", {
+            "protocolVersion": MCP_VERSION,
+            "serverInfo": {
+                "name": SERVER_NAME,
+                "version": SERVER_VERSION
+            },
+            "capabilities": {
+                "tools": {}
+            }
+        })
+        self.tools_list_template = ResponseTemplate("result", {
+            "tools": list(self.tools.values())
+        })
+
+    @property
+    def executor(self):
+        """동기 함수 실행용 ThreadPoolExecutor (처음 사용할 때 생성)"""
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=2)
+        return self._executor
+
+    def shutdown_executor(self):
+        """ThreadPoolExecutor 정리 (생성된 경우에만)"""
+        if getattr(self, '_executor', None) is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
     def __del__(self):
         """소멸자에서 ThreadPoolExecutor 정리"""
-        if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=True)
+        self.shutdown_executor()
+
+    def configure_profiling(self, options: Union[Dict[str, Any], bool, None]):
+        """프로파일링 설정 (options가 비었거나 enabled=false면 끔)
+
+        잘못된 설정은 로그만 남기고 프로파일링을 끈 채로 둔다 (initialize 핸드셰이크와
+        서버 시작이 진단 기능 때문에 실패하지 않도록).
+        """
+        try:
+            self.profiler = RequestProfiler.from_options(options, log=self.log_debug)
+        except (TypeError, ValueError) as e:
+            self.profiler = None
+            self.log_debug(f"Invalid profiling options ignored ({options!r}): {e}")
+            return
+        if self.profiler is not None:
+            self.log_debug(f"Profiling enabled: every {self.profiler.every_n} call(s), "
+                           f">= {self.profiler.threshold_ms}ms -> {self.profiler.directory}")
 
     def log_debug(self, message: str):
         """디버그 로그 (stderr로 출력)"""
         print(f"[DEBUG] {datetime.now().isoformat()} - {message}", file=sys.stderr)
 
+    def _print_many(self, texts: List[str], printer_name: str):
+        """코얼레서가 모은 메모를 지금 프린터 대기열에 넣고 결과를 기다릴 awaitable 반환"""
+        return asyncio.shield(self.scheduler.enqueue(printer_name, lambda: printer.printer_print_many_async(
+            texts, printer_name, True, cut_each=True)))
+
+    def _submit_in_order(self, printer_name: str, job):
+        """모으는 중인 같은 프린터의 메모를 먼저 대기열에 넣은 뒤 job 제출 (요청 순서 유지)"""
+        if self.print_queue is not None:
+            self.print_queue.flush(printer_name)
+        return self.scheduler.submit(printer_name, job)
+
     async def _run_sync(self, func, *args):
-        """동기 함수를 비동기로 실행"""
+        """동기 함수를 비동기로 실행 (스레드 풀 대기 시간은 executor_queue 단계로 기록)"""
         loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, func, *args)
+        submitted = time.perf_counter()
+
+        def run():
+            printer.metrics.observe("stage_seconds", time.perf_counter() - submitted, stage="executor_queue")
+            return func(*args)
+
+        return await loop.run_in_executor(self.executor, run)
     
 
     async def handle_tool_call(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-        """MCP 도구 호출 처리"""
+        """MCP 도구 호출 처리 (도구별 처리 시간과 성공/실패 횟수 기록, 설정 시 프로파일링)"""
+        # 알 수 없는 도구 이름은 하나로 묶어 시계열 수가 늘어나지 않게 함
+        tool = tool_name if tool_name in self.tools else "unknown"
+        profile = self.profiler.begin() if self.profiler is not None else None
+        try:
+            with printer.metrics.time("tool_seconds", tool=tool):
+                result = await self._dispatch_tool_call(tool_name, arguments)
+        finally:
+            if profile is not None:
+                self.profiler.finish(profile, tool)
+        printer.metrics.inc("tool_calls_total", tool=tool,
+                            result="failure" if result.get("isError") else "success")
+        return result
+
+    async def _dispatch_tool_call(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """도구 이름에 맞는 처리 함수 호출"""
         try:
             if tool_name == "print_memo":
                 return await self._handle_print_memo(arguments)
+            elif tool_name == "print_memos":
+                return await self._handle_print_memos(arguments)
+            elif tool_name == "print_document":
+                return await self._handle_print_document(arguments)
             elif tool_name == "list_printers":
                 return await self._handle_list_printers(arguments)
             elif tool_name == "get_printer_status":
                 return await self._handle_get_printer_status(arguments)
+            elif tool_name == "get_metrics":
+                return await self._handle_get_metrics(arguments)
             else:
                 raise ValueError(f"Unknown tool: {tool_name}")
         
@@ -132,19 +855,43 @@ class MCPServer:
                 }]
             }
         
-        if len(text) > 500:
+        if len(text) > MAX_MEMO_LENGTH:
             return {
                 "isError": True,
                 "content": [{
                     "type": "text",
-                    "text": f"❌ 텍스트가 너무 깁니다. ({len(text)}/500자) 500자 이내로 입력하세요."
+                    "text": f"❌ 텍스트가 너무 깁니다. ({len(text)}/{MAX_MEMO_LENGTH}자) {MAX_MEMO_LENGTH}자 이내로 입력하거나 긴 문서는 print_document를 사용하세요."
                 }]
             }
         
+        # QR/바코드는 프린터가 직접 그리도록 ESC/POS 심볼 명령으로 전달
+        qr = arguments.get("qr")
+        barcode = arguments.get("barcode")
+        barcode_type = arguments.get("barcode_type", "CODE128")
+        markup = bool(arguments.get("markup", False))
+        try:
+            symbols = []
+            if qr:
+                symbols.append(printer.qr_code_command(qr))
+            if barcode:
+                symbols.append(printer.barcode_command(barcode, barcode_type))
+        except ValueError as e:
+            return {
+                "isError": True,
+                "content": [{
+                    "type": "text",
+                    "text": f"❌ QR/바코드 생성 실패: {str(e)}"
+                }]
+            }
+
         if preview:
             # 미리보기 생성
             try:
-                preview_text = await self._run_sync(printer.printer_preview, text)
+                preview_text = await self._run_sync(printer.printer_preview, text, printer_name, markup)
+                if qr:
+                    preview_text += f"\n🔳 QR 코드: {qr}"
+                if barcode:
+                    preview_text += f"\n▮ 바코드({barcode_type}): {barcode}"
                 return {
                     "content": [{
                         "type": "text",
@@ -162,7 +909,15 @@ class MCPServer:
         else:
             # 실제 출력
             try:
-                success = await self._run_sync(printer.printer_print, text, printer_name, True)
+                if self.print_queue is not None and not symbols and not markup:
+                    # 비슷한 시각에 들어온 다른 메모와 합쳐 한 작업으로 출력
+                    success = (await self.print_queue.submit(text, printer_name))["success"]
+                else:
+                    success = await self._submit_in_order(printer_name, lambda: printer.printer_print_async(
+                        text, printer_name, True, symbols=symbols, markup=markup))
+                # 출력 후에는 프린터 상태가 바뀌므로 캐시 무효화
+                self.status_cache.invalidate(printer_name)
+                self.status_cache.invalidate(INVENTORY_CACHE_KEY)
                 if success:
                     return {
                         "content": [{
@@ -187,10 +942,120 @@ class MCPServer:
                     }]
                 }
 
+    async def _handle_print_memos(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """여러 메모를 CUPS 작업 하나로 출력 (항목별 결과 보고)"""
+        memos = arguments.get("memos")
+        printer_name = arguments.get("printer_name", "BIXOLON_SRP_330II")
+        cut_each = arguments.get("cut_each", True)
+
+        if not isinstance(memos, list) or not memos:
+            return {
+                "isError": True,
+                "content": [{
+                    "type": "text",
+                    "text": "❌ 출력할 메모 목록이 비어있습니다."
+                }]
+            }
+
+        if len(memos) > MAX_MEMOS_PER_JOB:
+            return {
+                "isError": True,
+                "content": [{
+                    "type": "text",
+                    "text": f"❌ 메모가 너무 많습니다. ({len(memos)}/{MAX_MEMOS_PER_JOB}개)"
+                }]
+            }
+
+        # 항목별 검증: 통과한 메모만 작업에 넣고, 나머지는 오류로 보고
+        results: List[Optional[Dict[str, Any]]] = [None] * len(memos)
+        texts, positions = [], []
+        for index, memo in enumerate(memos):
+            text = memo.strip() if isinstance(memo, str) else ""
+            if not text:
+                results[index] = {"success": False, "error": "텍스트가 비어있습니다"}
+            elif len(text) > MAX_MEMO_LENGTH:
+                results[index] = {"success": False, "error": f"텍스트가 너무 깁니다 ({len(text)}/{MAX_MEMO_LENGTH}자)"}
+            else:
+                texts.append(text)
+                positions.append(index)
+
+        if texts:
+            try:
+                printed = await self._submit_in_order(printer_name, lambda: printer.printer_print_many_async(
+                    texts, printer_name, True, cut_each=cut_each))
+            except Exception as e:
+                printed = [{"success": False, "error": f"출력 오류: {str(e)}"} for _ in texts]
+            for position, result in zip(positions, printed):
+                results[position] = result
+            # 출력 후에는 프린터 상태가 바뀌므로 캐시 무효화
+            self.status_cache.invalidate(printer_name)
+            self.status_cache.invalidate(INVENTORY_CACHE_KEY)
+
+        succeeded = sum(1 for result in results if result["success"])
+        report = [f"{'✅' if succeeded else '❌'} 출력 완료: {succeeded}/{len(memos)}개 (작업 {1 if texts else 0}개)"]
+        for index, (memo, result) in enumerate(zip(memos, results), 1):
+            preview = str(memo).strip().replace("\n", " ")
+            if len(preview) > 20:
+                preview = preview[:20] + "…"
+            if result["success"]:
+                report.append(f"  {index}. ✅ {preview} ({result['lines']}줄)")
+            else:
+                report.append(f"  {index}. ❌ {preview} - {result['error']}")
+
+        response = {
+            "content": [{
+                "type": "text",
+                "text": "\n".join(report)
+            }]
+        }
+        if not succeeded:
+            response["isError"] = True
+        return response
+
+    async def _handle_print_document(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """긴 문서를 스트리밍으로 출력 (줄바꿈 -> 인코딩 -> 전송을 조각 단위로)"""
+        text = arguments.get("text", "")
+        printer_name = arguments.get("printer_name", "BIXOLON_SRP_330II")
+
+        if not isinstance(text, str) or not text.strip():
+            return {
+                "isError": True,
+                "content": [{
+                    "type": "text",
+                    "text": "❌ 출력할 텍스트가 비어있습니다."
+                }]
+            }
+
+        stats: Dict[str, int] = {}
+        try:
+            success = await self._submit_in_order(printer_name, lambda: printer.printer_print_stream_async(
+                text, printer_name, True, stats=stats))
+        except Exception as e:
+            success = False
+            self.log_debug(f"print_document error: {str(e)}")
+        # 출력 후에는 프린터 상태가 바뀌므로 캐시 무효화
+        self.status_cache.invalidate(printer_name)
+        self.status_cache.invalidate(INVENTORY_CACHE_KEY)
+        if not success:
+            return {
+                "isError": True,
+                "content": [{
+                    "type": "text",
+                    "text": f"❌ 출력 실패: {printer_name}"
+                }]
+            }
+        return {
+            "content": [{
+                "type": "text",
+                "text": f"✅ 출력 완료: {len(text)}자, {stats['lines']}줄 ({stats['chunks']}개 조각으로 전송)"
+            }]
+        }
+
     async def _handle_list_printers(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """프린터 목록 조회 처리 (직접 호출)"""
         try:
-            printers = await self._run_sync(printer.printer_list)
+            # lpstat 한 번으로 전체 프린터 상태 조회 (프린터별 추가 호출 없음)
+            printers = await self.status_cache.get(INVENTORY_CACHE_KEY, printer.printer_inventory_async)
             
             if not printers:
                 return {
@@ -201,13 +1066,10 @@ class MCPServer:
                 }
             
             printer_list = ["🖨️  사용 가능한 프린터:"]
-            for printer_name in printers:
-                try:
-                    status = await self._run_sync(printer.printer_status, printer_name)
-                    printer_list.append(f"  ✅ {printer_name}")
-                    printer_list.append(f"     상태: {status}")
-                except Exception as e:
-                    printer_list.append(f"  ❌ {printer_name} (상태 확인 실패: {str(e)})")
+            for record in printers:
+                status_icon = "✅" if record["enabled"] and record["accepting"] else "❌"
+                printer_list.append(f"  {status_icon} {record['name']}")
+                printer_list.append(f"     상태: {printer.describe_printer(record)}")
             
             printer_list.append(f"\n총 {len(printers)}개 프린터")
             
@@ -231,7 +1093,9 @@ class MCPServer:
         printer_name = arguments.get("printer_name", "BIXOLON_SRP_330II")
         
         try:
-            status = await self._run_sync(printer.printer_status, printer_name)
+            status = await self.status_cache.get(
+                printer_name, lambda: printer.printer_status_async(printer_name)
+            )
             
             # 상태 메시지에서 'idle'나 'processing' 같은 키워드로 가용성 판단
             is_available = "idle" in status.lower() or "accepting" in status.lower()
@@ -256,6 +1120,43 @@ class MCPServer:
                 }]
             }
 
+    async def _handle_get_metrics(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """측정값 조회 처리 (JSON 또는 Prometheus 텍스트, 파일 저장 선택)"""
+        output_format = arguments.get("format", "json")
+        path = arguments.get("path")
+
+        try:
+            lines = []
+            if path:
+                await self._run_sync(printer.metrics.write_prometheus, path)
+                lines.append(f"💾 Prometheus 형식으로 저장: {path}")
+
+            if output_format == "prometheus":
+                lines.append(printer.metrics.to_prometheus())
+            else:
+                snapshot = printer.metrics.snapshot()
+                snapshot["render_cache"] = printer.render_cache.stats()
+                snapshot["status_cache"] = self.status_cache.stats()
+                if self.print_queue is not None:
+                    snapshot["print_queue"] = self.print_queue.stats()
+                snapshot["printer_queues"] = self.scheduler.stats()
+                lines.append(json.dumps(snapshot, ensure_ascii=False, indent=2))
+
+            return {
+                "content": [{
+                    "type": "text",
+                    "text": "\n".join(lines)
+                }]
+            }
+        except Exception as e:
+            return {
+                "isError": True,
+                "content": [{
+                    "type": "text",
+                    "text": f"❌ 측정값 조회 실패: {str(e)}"
+                }]
+            }
+
 
     async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """MCP 요청 처리"""
@@ -269,43 +1170,20 @@ class MCPServer:
         
         try:
             if method == "initialize":
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "protocolVersion": MCP_VERSION,
-                        "serverInfo": {
-                            "name": SERVER_NAME,
-                            "version": SERVER_VERSION
-                        },
-                        "capabilities": {
-                            "tools": {}
-                        }
-                    }
-                }
+                options = params.get("initializationOptions") or {}
+                if "profiling" in options:
+                    self.configure_profiling(options["profiling"])
+                return self.initialize_template.render(request_id)
             
             elif method == "tools/list":
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": {
-                        "tools": list(self.tools.values())
-                    }
-                }
+                return self.tools_list_template.render(request_id)
             
             elif method == "tools/call":
                 tool_name = params.get("name")
                 arguments = params.get("arguments", {})
                 
                 if not tool_name:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": request_id,
-                        "error": {
-                            "code": -32602,
-                            "message": "Invalid params: missing tool name"
-                        }
-                    }
+                    return MISSING_TOOL_NAME.render(request_id)
                 
                 result = await self.handle_tool_call(tool_name, arguments)
                 
@@ -316,86 +1194,156 @@ class MCPServer:
                 }
             
             else:
-                return {
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "error": {
-                        "code": -32601,
-                        "message": f"Method not found: {method}"
-                    }
-                }
+                return METHOD_NOT_FOUND.render(request_id, f"Method not found: {method}")
         
         except Exception as e:
             self.log_debug(f"Request handling error: {str(e)}")
-            return {
-                "jsonrpc": "2.0",
-                "id": request_id if request_id is not None else 1,
-                "error": {
-                    "code": -32603,
-                    "message": f"Internal error: {str(e)}"
-                }
-            }
+            return INTERNAL_ERROR.render(request_id, f"Internal error: {str(e)}")
+
+    async def handle_message(self, message: Any) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        """JSON-RPC 메시지 처리 (단일 요청 또는 배치 배열)"""
+        if isinstance(message, dict):
+            return await self.handle_request(message)
+
+        if not isinstance(message, list) or not message:
+            return INVALID_REQUEST.render(1, "Invalid Request: expected an object or a non-empty batch array")
+
+        # 배치 항목은 세마포어로 동시 실행 수를 제한하며 병렬 처리 (응답 순서는 요청 순서 유지)
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def dispatch(item):
+            if not isinstance(item, dict):
+                return INVALID_REQUEST.render(1, "Invalid Request: batch item must be an object")
+            async with semaphore:
+                return await self.handle_request(item)
+
+        return list(await asyncio.gather(*(dispatch(item) for item in message)))
+
+    async def _poll_status(self):
+        """최근 조회된 프린터 상태를 주기적으로 갱신하는 백그라운드 작업"""
+        while True:
+            await asyncio.sleep(self.status_poll_interval)
+            try:
+                await self.status_cache.refresh_hot()
+            except Exception as e:
+                self.log_debug(f"Status poll error: {str(e)}")
+
+    async def _process_line(self, line: bytes) -> str:
+        """입력 한 줄을 처리해 직렬화된 응답 문자열 반환"""
+        try:
+            request = json.loads(line)
+            # 배치 요청의 응답도 배열 하나로 한 번에 출력
+            response = await self.handle_message(request)
+            return serialize_response(response)
+
+        except json.JSONDecodeError as e:
+            self.log_debug(f"JSON decode error: {str(e)}")
+            # null 대신 기본값 id 사용
+            return PARSE_ERROR.render(1, f"Parse error: {str(e)}").json
+
+        except Exception as e:
+            self.log_debug(f"Unexpected error: {str(e)}")
+            return INTERNAL_ERROR.render(1, f"Internal error: {str(e)}").json
+
+    async def _stdout_writer(self, outgoing: asyncio.Queue, writer):
+        """응답을 stdout에 쓰는 단일 writer (응답 줄이 섞이지 않도록 직렬화)
+
+        대기 중인 응답은 한 번에 모아 쓰고, drain()으로 상대가 읽는 속도에 맞춘다.
+        """
+        done = False
+        while not done:
+            payloads = [await outgoing.get()]
+            while not outgoing.empty():
+                payloads.append(outgoing.get_nowait())
+            if None in payloads:
+                done = True
+                payloads = payloads[:payloads.index(None)]
+            if payloads:
+                writer.write("".join(payload + "\n" for payload in payloads).encode())
+                await writer.drain()
+
+        # drain()은 버퍼가 high-water mark 아래로 내려갈 때까지만 기다리므로,
+        # 종료 전에는 한계를 0으로 낮춰 남은 응답을 모두 내보낸다
+        transport = getattr(writer, "transport", None)
+        if transport is not None:
+            transport.set_write_buffer_limits(0)
+            await writer.drain()
 
     async def run(self):
-        """MCP 서버 실행"""
+        """MCP 서버 실행
+
+        요청마다 태스크를 만들어 동시에 처리하고, 끝나는 순서대로 응답을 쓴다
+        (클라이언트는 id로 응답을 맞춘다). 처리 중인 요청이 max_concurrent_requests에
+        도달하면 다음 줄을 읽지 않고 기다린다.
+        """
         self.log_debug("MCP Todo Printer Server starting...")
-        
+        poller = asyncio.ensure_future(self._poll_status()) if self.status_poll_interval else None
+        reader, writer = await open_stdio(self.max_frame_size)
+        outgoing: asyncio.Queue = asyncio.Queue()
+        writer_task = asyncio.ensure_future(self._stdout_writer(outgoing, writer))
+        slots = asyncio.Semaphore(self.max_concurrent_requests)
+        pending = set()
+
+        async def process(line: bytes):
+            try:
+                outgoing.put_nowait(await self._process_line(line))
+            finally:
+                slots.release()
+
         try:
             while True:
-                line = await asyncio.get_event_loop().run_in_executor(None, sys.stdin.readline)
+                try:
+                    line = await read_frame(reader)
+                except FrameTooLarge:
+                    self.log_debug(f"Frame too large (limit {self.max_frame_size} bytes)")
+                    outgoing.put_nowait(INVALID_REQUEST.render(
+                        1, f"Invalid Request: frame exceeds {self.max_frame_size} bytes"
+                    ).json)
+                    continue
                 if not line:
                     break
                 
                 line = line.strip()
                 if not line:
                     continue
-                
-                try:
-                    request = json.loads(line)
-                    response = await self.handle_request(request)
-                    print(json.dumps(response, ensure_ascii=False))
-                    sys.stdout.flush()
-                
-                except json.JSONDecodeError as e:
-                    self.log_debug(f"JSON decode error: {str(e)}")
-                    error_response = {
-                        "jsonrpc": "2.0",
-                        "id": 1,  # null 대신 기본값 사용
-                        "error": {
-                            "code": -32700,
-                            "message": f"Parse error: {str(e)}"
-                        }
-                    }
-                    print(json.dumps(error_response))
-                    sys.stdout.flush()
-                
-                except Exception as e:
-                    self.log_debug(f"Unexpected error: {str(e)}")
-                    error_response = {
-                        "jsonrpc": "2.0",
-                        "id": 1,
-                        "error": {
-                            "code": -32603,
-                            "message": f"Internal error: {str(e)}"
-                        }
-                    }
-                    print(json.dumps(error_response))
-                    sys.stdout.flush()
+
+                await slots.acquire()
+                task = asyncio.ensure_future(process(line))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            # 입력이 끝나도 처리 중인 요청의 응답은 모두 출력
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
         
         except KeyboardInterrupt:
             self.log_debug("Server stopped by user")
         except Exception as e:
             self.log_debug(f"Server error: {str(e)}")
+        finally:
+            for task in pending:
+                task.cancel()
+            if self.print_queue is not None:
+                await self.print_queue.drain()
+            await self.scheduler.drain()
+            self.scheduler.close()
+            outgoing.put_nowait(None)
+            await writer_task
+            writer.close()
+            if poller is not None:
+                poller.cancel()
 
 async def main():
     """메인 함수"""
-    server = MCPServer()
+    server = MCPServer(status_poll_interval=STATUS_POLL_INTERVAL, coalesce_window=COALESCE_WINDOW)
+    profile_spec = os.environ.get(PROFILE_ENV)
+    if profile_spec:
+        server.configure_profiling(RequestProfiler.parse_spec(profile_spec))
     try:
         await server.run()
     finally:
         # ThreadPoolExecutor 정리
-        if hasattr(server, 'executor'):
-            server.executor.shutdown(wait=True)
+        server.shutdown_executor()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
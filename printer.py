@@ -4,173 +4,1476 @@
 사용법: python3 print_text.py "출력할 텍스트"
 """
 
+import os
+import re
 import sys
+import signal
+import asyncio
+import select
+import socket
 import subprocess
-import tempfile
-import argparse
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from itertools import accumulate, chain, repeat
+
+PAPER_WIDTH = 40          # 한 줄 출력 폭 (반각 문자 기준)
+TEXT_ENCODING = 'cp949'   # 본문 인코딩 (EUC-KR 상위 집합)
+
+# East Asian Width 분류 중 전각(2칸)으로 출력되는 것들.
+# 프린터가 한글 모드(FS &)로 동작하므로 모호한 폭(A) 문자(·, ※, ① 등)도
+# KS X 1001 전각 글리프로 출력된다.
+_WIDE_EAW = frozenset(('W', 'F', 'A'))
+# 폭을 차지하지 않는 결합/서식 문자
+_ZERO_WIDTH_CATEGORIES = frozenset(('Mn', 'Me', 'Cf'))
+
+
+def _eaw_char_width(char):
+    """unicodedata 기반 단일 문자 폭 (테이블 생성용)"""
+    if unicodedata.category(char) in _ZERO_WIDTH_CATEGORIES:
+        return 0
+    if unicodedata.east_asian_width(char) in _WIDE_EAW:
+        return 2
+    return 1
+
+
+def _build_bmp_width_table():
+    """BMP(U+0000~U+FFFF) 전체의 문자 폭 테이블 생성 (import 시 1회)"""
+    table = bytearray(b'\x01' * 0x10000)
+    for code_point in range(0x80, 0x10000):
+        width = _eaw_char_width(chr(code_point))
+        if width != 1:
+            table[code_point] = width
+    return bytes(table)
+
+
+# (코드포인트 → 폭 바이트맵, str.translate 용 동일 테이블) 쌍.
+# 생성에 수십 ms가 걸리고 ASCII/CP949 본문에는 필요 없으므로 처음 쓸 때 만든다.
+_bmp_width_tables = None
+
+
+def _width_tables():
+    """BMP 폭 테이블 반환 (처음 호출 시 1회 생성)"""
+    global _bmp_width_tables
+    if _bmp_width_tables is None:
+        widths = _build_bmp_width_table()
+        # translate 용 테이블은 폭 값을 \x00/\x01/\x02 문자로 치환
+        _bmp_width_tables = (widths, widths.decode('latin-1'))
+    return _bmp_width_tables
+
+
+@lru_cache(maxsize=1024)
+def _astral_char_width(char):
+    """BMP 밖 문자(이모지, CJK 확장 등) 폭 계산 (드물게 등장하므로 캐시)"""
+    return _eaw_char_width(char)
+
+
+def char_width(char):
+    """단일 문자의 출력 폭 (전각=2, 반각=1, 결합문자=0)"""
+    code_point = ord(char)
+    if code_point < 0x10000:
+        return _width_tables()[0][code_point]
+    return _astral_char_width(char)
+
 
 def get_text_width(text):
-    """텍스트의 실제 폭 계산 (한글=2, 영문=1)"""
-    width = 0
-    for char in text:
-        if ord(char) > 127:  # 한글/특수문자
-            width += 2
-        else:  # 영문/숫자
-            width += 1
-    return width
+    """텍스트의 실제 폭 계산 (전각=2, 반각=1, 결합문자=0)"""
+    if text.isascii():
+        return len(text)
+    # CP949로 인코딩 가능한 문자는 바이트 수가 폭 테이블 값과 같다
+    # (유일한 예외인 soft hyphen U+00AD 제외). 한글 본문은 대부분 여기서 끝난다.
+    if '\xad' not in text:
+        try:
+            return len(text.encode('cp949'))
+        except UnicodeEncodeError:
+            pass
+    if max(text) > '\uffff':
+        return sum(map(char_width, text))
+    widths = text.translate(_width_tables()[1])
+    return len(text) + widths.count('\x02') - widths.count('\x00')
 
-def wrap_text(text, max_width=40):
-    """텍스트를 지정된 폭으로 줄바꿈"""
-    lines = []
-    current_line = ""
-    current_width = 0
-    
-    words = text.split()
-    
+def _split_long_word(word, max_width):
+    """max_width보다 넓은 단어를 폭 누적합 기준으로 잘라 조각 단위로 생성"""
+    offsets = list(accumulate(map(char_width, word)))
+    start = 0
+    consumed = 0
+    while start < len(word):
+        end = bisect_right(offsets, consumed + max_width, start)
+        if end == start:  # 한 글자가 max_width보다 넓은 경우에도 진행 보장
+            end = start + 1
+        yield word[start:end]
+        consumed = offsets[end - 1]
+        start = end
+
+
+def iter_wrapped_lines(text, max_width=40):
+    """텍스트를 지정된 폭으로 줄바꿈하며 한 줄씩 생성 (원문 줄바꿈 유지)"""
+    if not text or text.isspace():
+        return
+
+    for paragraph in text.splitlines():
+        yield from _wrap_words(paragraph.split(), max_width)
+
+
+def _wrap_words(words, max_width):
+    """단어 이터러블 하나(원문 한 줄)를 폭에 맞춰 줄 단위로 생성 (단어가 없으면 빈 줄 하나)"""
+    line = []
+    line_width = 0
     for word in words:
         word_width = get_text_width(word)
-        space_width = 1 if current_line else 0
-        
+
         # 현재 줄에 단어를 추가할 수 있는지 확인
-        if current_width + space_width + word_width <= max_width:
-            if current_line:
-                current_line += " "
-                current_width += 1
-            current_line += word
-            current_width += word_width
+        if line and line_width + 1 + word_width <= max_width:
+            line.append(word)
+            line_width += 1 + word_width
+            continue
+
+        # 현재 줄을 완성하고 새 줄 시작
+        if line:
+            yield " ".join(line)
+
+        if word_width <= max_width:
+            line = [word]
+            line_width = word_width
         else:
-            # 현재 줄을 완성하고 새 줄 시작
-            if current_line:
-                lines.append(current_line)
-            current_line = word
-            current_width = word_width
-    
-    # 마지막 줄 추가
-    if current_line:
-        lines.append(current_line)
-    
-    return lines
+            # 한 줄보다 긴 단어는 강제로 자르고 마지막 조각부터 이어서 채움
+            *pieces, last = _split_long_word(word, max_width)
+            yield from pieces
+            line = [last]
+            line_width = get_text_width(last)
 
+    yield " ".join(line)
 
-def prepare_print_content(text, min_lines=6):
+
+def wrap_text(text, max_width=40):
+    """텍스트를 지정된 폭으로 줄바꿈"""
+    return list(iter_wrapped_lines(text, max_width))
+
+
+def prepare_print_content(text, min_lines=6, width=PAPER_WIDTH):
     """출력할 내용 준비"""
+    lines = [""]  # 위에 1줄 여백
+
     # 텍스트를 줄바꿈
-    lines = wrap_text(text, max_width=40)
-    
-    lines.insert(0, "")  # 위에 1줄 여백
-    
-    # 아래 여백 계산
-    text_line_count = len(lines) - 1  # 위 여백 제외한 실제 텍스트 줄 수
+    lines.extend(iter_wrapped_lines(text, max_width=width))
+
+    # 아래 여백 추가 (위 여백 제외한 실제 텍스트 줄 수 기준)
+    lines.extend([""] * _bottom_padding(len(lines) - 1))
+
+    return lines
+
+
+def _bottom_padding(text_line_count):
+    """본문 줄 수에 따른 아래 여백 줄 수 (짧은 메모일수록 여백을 더 둠)"""
     if text_line_count == 1:
-        bottom_padding = 3
+        return 3
     elif text_line_count == 2:
-        bottom_padding = 2
-    else:
-        bottom_padding = 1
-    
-    # 아래 여백 추가
-    for _ in range(bottom_padding):
-        lines.append("")
-    
-    return lines
+        return 2
+    return 1
 
-def printer_preview(text):
-    """텍스트 출력 미리보기 생성"""
-    lines = prepare_print_content(text)
-    preview_text = "\n".join(f"|{line:<40}|" for line in lines)
-    return f"{'=' * 42}\n{preview_text}\n{'=' * 42}\n총 {len(lines)}줄"
+def _format_preview(lines, width=PAPER_WIDTH):
+    """출력 줄 목록을 미리보기 문자열로 변환"""
+    preview_text = "\n".join(f"|{line:<{width}}|" for line in lines)
+    return f"{'=' * (width + 2)}\n{preview_text}\n{'=' * (width + 2)}\n총 {len(lines)}줄"
 
-def create_esc_pos_content(lines):
-    """ESC/POS 명령어가 포함된 출력 내용 생성"""
-    content = []
-    
-    # 프린터 초기화
-    content.append(b'\x1B\x40')  # ESC @
-    
-    # 한글 지원을 위한 코드페이지 설정
-    content.append(b'\x1B\x74\x12')  # ESC t 18 (CP949/EUC-KR)
-    content.append(b'\x1C\x26')      # FS & (한글 모드)
-    content.append(b'\x1C\x2E')      # FS . (취소 후 설정)
-    
-    # 가운데 정렬 설정
-    content.append(b'\x1B\x61\x01')  # ESC a 1
-    
-    # 각 줄 추가
-    for line in lines:
+
+def printer_preview(text, printer_name=None, markup=False):
+    """텍스트 출력 미리보기 생성 (printer_name의 프로필 폭 기준, markup: 마크업 해석)"""
+    return render_cache.preview(text, get_printer_profile(printer_name), markup)
+
+# 인코딩 가능 여부 표: 인코딩별 BMP 코드 포인트 -> 0(모름)/1(가능)/2(불가)
+# 처음 본 문자만 실제로 인코딩해 보고 결과를 기억하므로 문서당 고유 문자 수만큼만 확인한다.
+_ENCODABLE, _UNENCODABLE = 1, 2
+_encodability_indexes = {}
+
+
+def unencodable_chars(text, encoding=TEXT_ENCODING):
+    """text에서 encoding으로 표현할 수 없는 문자 집합"""
+    index = _encodability_indexes.get(encoding)
+    if index is None:
+        index = _encodability_indexes.setdefault(encoding, bytearray(0x10000))
+    offending = set()
+    for char in set(text):
+        code = ord(char)
+        flag = index[code] if code < 0x10000 else 0
+        if not flag:
+            try:
+                char.encode(encoding)
+                flag = _ENCODABLE
+            except UnicodeEncodeError:
+                flag = _UNENCODABLE
+            if code < 0x10000:
+                index[code] = flag
+        if flag == _UNENCODABLE:
+            offending.add(char)
+    return offending
+
+
+UNENCODABLE_REPLACE = "replace"  # 대체 문자(기본 '?')로 바꿈
+UNENCODABLE_ESCAPE = "escape"    # [U+1F600] 형식 코드 포인트로 바꿈
+UNENCODABLE_RASTER = "raster"    # 그 문자가 있는 줄을 GS v 0 이미지로 출력 (raster.py)
+
+
+class PrinterProfile:
+    """프린터 기종별 설정 (용지 폭, 코드페이지, 절단 명령)
+
+    생성 시 작업 앞뒤에 붙는 고정 명령을 미리 바이트로 만들어 두므로,
+    작업마다 하는 일은 본문 텍스트 인코딩뿐이다. 너비 계산은 모든 프로필이
+    같은 한글 2바이트 코드페이지를 쓰므로 공용 표(char_width)를 사용한다.
+    """
+
+    def __init__(self, name, paper_width=PAPER_WIDTH, encoding=TEXT_ENCODING, codepage=18,
+                 kanji=b'\x1C\x26\x1C\x2E', align=1, feed_lines=3, cut=b'\x1D\x56\x00',
+                 unencodable=UNENCODABLE_REPLACE, substitute='?', raster_font=None):
+        if unencodable not in (UNENCODABLE_REPLACE, UNENCODABLE_ESCAPE, UNENCODABLE_RASTER):
+            raise ValueError(f"알 수 없는 대체 방식: {unencodable}")
+        self.name = name
+        self.paper_width = paper_width
+        self.encoding = encoding
+        self.unencodable = unencodable
+        self.substitute = substitute
+        self.align = align
+        self.raster_font = raster_font  # 래스터 글리프용 TTF/OTF 경로 (없으면 내장 글리프)
+        self._raster_renderer = None
+        self.key = (name, paper_width, encoding, codepage, kanji, align, feed_lines, cut,
+                    unencodable, substitute, raster_font)
+
+        self.prologue = b''.join((
+            b'\x1B\x40',                      # ESC @ (프린터 초기화)
+            b'\x1B\x74' + bytes((codepage,)),  # ESC t n (코드페이지, 18: CP949/EUC-KR)
+            kanji,                             # FS & (한글 모드), FS . (취소 후 설정)
+            b'\x1B\x61' + bytes((align,)),     # ESC a n (1: 가운데 정렬)
+        ))
+        self.cut = b'\n' * feed_lines + cut   # 여백 피드 후 절단 (GS V 0: 풀 컷)
+        self.epilogue = b'\x1B\x61\x00' + self.cut  # ESC a 0 (좌측 정렬로 복귀) 후 절단
+
+    def __repr__(self):
+        return f"PrinterProfile({self.name!r}, paper_width={self.paper_width}, encoding={self.encoding!r})"
+
+    def _replacement(self, char):
+        if unicodedata.category(char) in _ZERO_WIDTH_CATEGORIES:
+            return ''  # 결합/서식 문자(ZWJ, 이모지 변형 선택자 등)는 버림
+        if self.unencodable == UNENCODABLE_ESCAPE:
+            return f"[U+{ord(char):04X}]"
+        return self.substitute
+
+    def sanitize(self, text):
+        """인코딩할 수 없는 문자를 대체 방식에 따라 바꾼 텍스트 (래스터 방식은 그대로 둠)"""
+        if text.isascii() or self.unencodable == UNENCODABLE_RASTER:
+            return text
         try:
-            # EUC-KR 인코딩 시도
-            content.append(line.encode('euc-kr') + b'\n')
+            text.encode(self.encoding)
+            return text
         except UnicodeEncodeError:
-            # 실패시 UTF-8 사용
-            content.append(line.encode('utf-8') + b'\n')
-    
-    
-    # 좌측 정렬로 복귀
-    content.append(b'\x1B\x61\x00')  # ESC a 0
-    
-    # 용지 절단
-  
-    content.append(b'\n\n\n')  # GS V 0 (풀 컷)
-    content.append(b'\x1D\x56\x00')  # GS V 0 (풀 컷)
-    # content.append(b'\x1D\x56\x42\x10')  # 피드 추가 후 풀 컷
-    
-    return b''.join(content)
+            pass
+        offending = unencodable_chars(text, self.encoding)
+        return text.translate({ord(char): self._replacement(char) for char in offending})
+
+    def encode(self, text):
+        """텍스트 전체를 한 번에 인코딩 (실패 시 문제 문자만 바꾼 뒤 다시 한 번)"""
+        try:
+            return text.encode(self.encoding)
+        except UnicodeEncodeError:
+            if self.unencodable == UNENCODABLE_RASTER:
+                return self._encode_raster(text)
+            return self.sanitize(text).encode(self.encoding)
+
+    def raster_renderer(self):
+        """이 프로필의 래스터 변환기 (처음 쓸 때 raster 모듈을 불러와 만듦)"""
+        if self._raster_renderer is None:
+            import raster
+            source = raster.PillowGlyphSource(self.raster_font) if self.raster_font else None
+            self._raster_renderer = raster.RasterRenderer(self.paper_width, source)
+        return self._raster_renderer
+
+    def _encode_raster(self, text):
+        """인코딩할 수 없는 문자가 있는 줄만 래스터 띠로, 나머지 줄은 텍스트로 인코딩"""
+        renderer = self.raster_renderer()
+        offending = unencodable_chars(text, self.encoding)
+        segments = text.split('\n')
+        last = len(segments) - 1
+        parts = []
+        for i, line in enumerate(segments):
+            if offending.isdisjoint(line):
+                parts.append((line + '\n' if i < last else line).encode(self.encoding))
+            else:
+                parts.append(renderer.band(line, align=self.align))  # 이미지 높이만큼 용지가 나가므로 줄바꿈 불필요
+        return b''.join(parts)
+
+
+DEFAULT_PROFILE = PrinterProfile("80mm")                  # BIXOLON SRP-330II 등 80mm
+PROFILE_58MM = PrinterProfile("58mm", paper_width=32)     # 58mm 소형 프린터
+PROFILE_80MM_RASTER = PrinterProfile("80mm-raster", unencodable=UNENCODABLE_RASTER)  # 이모지 등은 이미지로
+
+PRINTER_PROFILES = {profile.name: profile
+                    for profile in (DEFAULT_PROFILE, PROFILE_58MM, PROFILE_80MM_RASTER)}
+_profile_patterns = [("*58MM*", PROFILE_58MM)]  # (프린터 이름 패턴, 프로필), 대소문자 무시
+_profile_by_printer = {}
+
+
+def register_printer_profile(profile, *patterns):
+    """프로필 등록 (patterns: 이 프로필을 쓸 프린터 이름 또는 fnmatch 패턴, 먼저 등록한 것이 우선)"""
+    PRINTER_PROFILES[profile.name] = profile
+    _profile_patterns.extend((pattern.upper(), profile) for pattern in patterns)
+    _profile_by_printer.clear()
+    return profile
+
+
+def get_printer_profile(printer_name=None):
+    """프린터 이름에 맞는 프로필 (일치하는 패턴이 없으면 DEFAULT_PROFILE)"""
+    if not printer_name:
+        return DEFAULT_PROFILE
+    profile = _profile_by_printer.get(printer_name)
+    if profile is None:
+        upper = printer_name.upper()
+        profile = next((p for pattern, p in _profile_patterns if fnmatchcase(upper, pattern)),
+                       DEFAULT_PROFILE)
+        _profile_by_printer[printer_name] = profile
+    return profile
+
+
+# 기본 프로필의 작업 앞뒤 고정 ESC/POS 명령
+ESC_POS_PROLOGUE = DEFAULT_PROFILE.prologue
+ESC_POS_CUT = DEFAULT_PROFILE.cut
+ESC_POS_EPILOGUE = DEFAULT_PROFILE.epilogue
+
+
+def _encode_lines(lines, profile=DEFAULT_PROFILE):
+    """줄 목록을 본문 바이트로 인코딩 (줄마다가 아니라 본문 전체를 한 번에)"""
+    if not lines:
+        return b''
+    return profile.encode('\n'.join(lines) + '\n')
+
+
+def create_esc_pos_content(lines, profile=None, symbols=()):
+    """ESC/POS 명령어가 포함된 출력 내용 생성
+
+    symbols: 본문 아래에 출력할 QR/바코드 명령 (qr_code_command, barcode_command 결과)
+    """
+    profile = profile or DEFAULT_PROFILE
+    return profile.prologue + _encode_lines(lines, profile) + _symbol_block(symbols) + profile.epilogue
+
+
+def _symbol_block(symbols):
+    """심볼 명령마다 줄바꿈을 붙여 연결"""
+    return b''.join(symbol + b'\n' for symbol in symbols)
+
+
+# 마크업: 줄 앞 ">>"(오른쪽 정렬), "<<"(왼쪽 정렬), "# "(가로세로 2배), "## "(세로 2배), 줄 안 **굵게**
+MARKUP_ALIGN = {">>": 2, "<<": 0}
+MARKUP_HEADINGS = {"#": 0x11, "##": 0x01}  # GS ! n (상위 4비트: 가로 배율-1, 하위 4비트: 세로 배율-1)
+_MARKUP_HEADING_RE = re.compile(r"(#{1,2})\s+")
+_MARKUP_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+
+
+def _parse_markup_line(line):
+    """마크업 한 줄 -> (정렬 또는 None, GS ! 크기, 표시 텍스트, 공백이 아닌 글자별 굵게 여부)"""
+    align = MARKUP_ALIGN.get(line[:2])
+    if align is not None:
+        line = line[2:].lstrip()
+    size = 0
+    match = _MARKUP_HEADING_RE.match(line)
+    if match:
+        size = MARKUP_HEADINGS[match.group(1)]
+        line = line[match.end():]
+
+    # 줄바꿈은 공백을 정리하므로 굵게 여부는 공백이 아닌 글자 순서로 기록해 둔다
+    parts, bold = [], []
+    position = 0
+    for match in _MARKUP_BOLD_RE.finditer(line):
+        for chunk, flag in ((line[position:match.start()], bool(size)), (match.group(1), True)):
+            parts.append(chunk)
+            bold.extend(flag for char in chunk if not char.isspace())
+        position = match.end()
+    rest = line[position:]
+    parts.append(rest)
+    bold.extend(bool(size) for char in rest if not char.isspace())
+    return align, size, "".join(parts), bold
+
+
+def compile_markup(text, profile=None):
+    """마크업 텍스트를 (줄 목록, ESC/POS 본문 바이트)로 한 번에 컴파일
+
+    가로 2배 크기 줄은 한 글자가 두 칸을 차지하므로 용지 폭의 절반으로 줄바꿈한다.
+    모드 명령은 값이 바뀔 때만 넣고, 여백 줄 앞에서 굵게/크기를 기본값으로 되돌린다.
+    래스터 띠는 용지 폭 전체 이미지라 GS !/ESC a의 영향을 받지 않으므로, 래스터로 보내는 줄은
+    크기와 정렬을 이미지에 직접 반영한다 (굵게는 반영하지 않음).
+    """
+    profile = profile or DEFAULT_PROFILE
+    raster = profile.unencodable == UNENCODABLE_RASTER
+    state = {"align": profile.align, "size": 0, "bold": 0}
+    out = bytearray(b'\n')  # 위에 1줄 여백
+    lines = [""]
+
+    def set_mode(mode, value, command):
+        if state[mode] != value:
+            out.extend(command + bytes((value,)))
+            state[mode] = value
+
+    for source in text.splitlines():
+        align, size, plain, bold = _parse_markup_line(source)
+        marks = iter(bold)
+        wrapped = iter_wrapped_lines(plain, profile.paper_width // ((size >> 4) + 1)) if plain.strip() else ("",)
+        for line in wrapped:
+            lines.append(line)
+            set_mode("align", profile.align if align is None else align, b'\x1B\x61')
+            set_mode("size", size, b'\x1D\x21')
+            if raster and unencodable_chars(line, profile.encoding):
+                for char in line:
+                    if not char.isspace():
+                        next(marks)
+                out.extend(profile.raster_renderer().band(
+                    line, (size >> 4) + 1, (size & 0x0F) + 1, state["align"]))
+                continue
+            flag = state["bold"]
+            run_start = 0
+            for i, char in enumerate(line):
+                if not char.isspace():
+                    flag = next(marks)
+                if flag != state["bold"]:
+                    out.extend(profile.encode(line[run_start:i]))
+                    set_mode("bold", flag, b'\x1B\x45')
+                    run_start = i
+            out.extend(profile.encode(line[run_start:]) + b'\n')
+
+    set_mode("bold", 0, b'\x1B\x45')
+    set_mode("size", 0, b'\x1D\x21')
+    padding = _bottom_padding(len(lines) - 1)
+    lines.extend([""] * padding)
+    out.extend(b'\n' * padding)
+    return lines, bytes(out)
+
+
+def with_symbols(content, symbols, profile=None):
+    """이미 만든 작업 바이트(create_esc_pos_content 결과)의 절단 직전에 심볼 추가"""
+    if not symbols:
+        return content
+    epilogue = (profile or DEFAULT_PROFILE).epilogue
+    return content[:-len(epilogue)] + _symbol_block(symbols) + epilogue
+
+
+# 프린터가 직접 그리는 2차원/1차원 심볼 (호스트에서 이미지로 만들지 않으므로 작업이 수백 바이트)
+
+QR_ERROR_CORRECTION = {"L": 48, "M": 49, "Q": 50, "H": 51}
+# 오류 정정 수준별 QR 모델 2(버전 40) 바이트 모드 최대 데이터 크기
+# (프린터에 넘기는 데이터는 UTF-8 바이트 그대로이므로 숫자/영숫자 모드 한도가 아닌 바이트 모드 한도)
+QR_MAX_BYTES = {"L": 2953, "M": 2331, "Q": 1663, "H": 1273}
+
+
+def _gs_k_function(function, parameters):
+    """GS ( k pL pH cn fn [parameters] (cn=49: QR 코드)"""
+    size = len(parameters) + 2
+    return b'\x1D\x28\x6B' + bytes((size & 0xFF, size >> 8, 49, function)) + parameters
+
+
+def qr_code_command(data, module_size=6, error_correction="M"):
+    """GS ( k 로 QR 코드(모델 2)를 저장하고 출력하는 명령"""
+    payload = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+    if not payload:
+        raise ValueError("QR 코드 데이터가 비어있습니다")
+    if error_correction not in QR_ERROR_CORRECTION:
+        raise ValueError(f"알 수 없는 QR 오류 정정 수준: {error_correction}")
+    max_bytes = QR_MAX_BYTES[error_correction]
+    if len(payload) > max_bytes:
+        raise ValueError(f"QR 코드 데이터가 너무 깁니다 ({len(payload)}/{max_bytes}바이트, 오류 정정 {error_correction})")
+    if not 1 <= module_size <= 16:
+        raise ValueError(f"QR 모듈 크기는 1~16이어야 합니다: {module_size}")
+    return b''.join((
+        _gs_k_function(65, b'\x32\x00'),                                # 모델 2
+        _gs_k_function(67, bytes((module_size,))),                      # 모듈 크기
+        _gs_k_function(69, bytes((QR_ERROR_CORRECTION[error_correction],))),  # 오류 정정 수준
+        _gs_k_function(80, b'\x30' + payload),                          # 데이터 저장
+        _gs_k_function(81, b'\x30'),                                    # 저장한 심볼 출력
+    ))
+
+
+# 바코드 종류 -> (GS k m 값, 허용 문자 정규식)
+BARCODE_TYPES = {
+    "CODE128": (73, re.compile(r'[\x20-\x7E]+')),  # 길이는 이스케이프 후 데이터로 확인
+    "EAN13": (67, re.compile(r'\d{12,13}')),
+    "CODE39": (69, re.compile(r'[0-9A-Z $%+\-./]{1,255}')),
+}
+
+
+def barcode_command(data, symbology="CODE128", height=80, module_width=2, hri=True):
+    """GS k 로 1차원 바코드를 출력하는 명령 (HRI 문자는 바코드 아래)"""
+    if symbology not in BARCODE_TYPES:
+        raise ValueError(f"지원하지 않는 바코드 종류: {symbology}")
+    m, pattern = BARCODE_TYPES[symbology]
+    if not pattern.fullmatch(data):
+        raise ValueError(f"{symbology} 바코드로 표현할 수 없는 데이터: {data!r}")
+    if not 1 <= height <= 255 or not 2 <= module_width <= 6:
+        raise ValueError(f"바코드 크기 범위 오류: 높이 {height}, 모듈 폭 {module_width}")
+    payload = data.encode('ascii')
+    if symbology == "CODE128":
+        # '{'는 코드 세트 전환 문자이므로 데이터의 '{'는 '{{'로 보내고 항상 코드 세트 B로 시작
+        payload = b'{B' + payload.replace(b'{', b'{{')
+        if len(payload) > 255:
+            raise ValueError(f"CODE128 바코드 데이터가 너무 깁니다 ({len(payload)}/255바이트, 코드 세트 지정 포함)")
+    return b''.join((
+        b'\x1D\x48' + bytes((2 if hri else 0,)),  # GS H n (HRI 위치)
+        b'\x1D\x68' + bytes((height,)),           # GS h n (높이, 도트)
+        b'\x1D\x77' + bytes((module_width,)),     # GS w n (모듈 폭)
+        b'\x1D\x6B' + bytes((m, len(payload))) + payload,  # GS k m n d1...dn
+    ))
+
+
+def create_esc_pos_document(bodies, cut_each=True, profile=None):
+    """여러 메모 본문(ESC/POS 바이트)을 작업 하나로 연결
+
+    초기화/코드페이지 설정은 맨 앞에 한 번만 보낸다. cut_each가 참이면
+    메모마다 용지를 자르고, 거짓이면 마지막에 한 번만 자른다.
+    """
+    profile = profile or DEFAULT_PROFILE
+    parts = [profile.prologue]
+    for index, body in enumerate(bodies):
+        if index and cut_each:
+            parts.append(profile.cut)
+        parts.append(body)
+    parts.append(profile.epilogue)
+    return b''.join(parts)
+
+
+STREAM_CHUNK_SIZE = 8192  # 스트리밍 출력에서 한 번에 만들어 보내는 바이트 수 (대략)
+
+
+# str.splitlines()가 줄 경계로 보는 문자 (prepare_print_content와 같은 기준으로 줄을 나눔)
+_LINE_BOUNDARY = re.compile(r'\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+
+def _iter_source_lines(source):
+    """문자열 또는 줄 단위 이터러블(파일 등)에서 원문 줄을 하나씩 (str.splitlines()와 같은 규칙)
+
+    목록을 만들지 않고 줄 경계를 차례로 찾아 나눈다. 이터러블의 각 항목도 같은
+    규칙으로 나누므로 \x0c(용지 넘김) 등이 섞인 파일도 문자열과 같은 줄로 나뉜다.
+    """
+    for text in (source,) if isinstance(source, str) else source:
+        start = 0
+        for boundary in _LINE_BOUNDARY.finditer(text):
+            yield text[start:boundary.start()]
+            start = boundary.end()
+        if start < len(text):
+            yield text[start:]
+
+
+def _iter_sanitized_words(line, profile, piece_size=STREAM_CHUNK_SIZE):
+    """원문 한 줄을 piece_size 글자씩 대체 처리(sanitize)하며 단어를 하나씩 생성
+
+    sanitize는 글자 단위 치환이므로 조각별로 적용해도 줄 전체에 적용한 것과 같다.
+    조각 경계에 걸린 단어만 다음 조각으로 넘긴다.
+    """
+    carry = ""
+    for start in range(0, len(line), piece_size):
+        piece = carry + profile.sanitize(line[start:start + piece_size])
+        words = piece.split()
+        carry = words.pop() if words and not piece[-1].isspace() else ""
+        yield from words
+    if carry:
+        yield carry
+
+
+def iter_esc_pos_chunks(source, profile=None, chunk_size=STREAM_CHUNK_SIZE, stats=None):
+    """긴 문서를 줄바꿈 -> 인코딩 -> 약 chunk_size 바이트 조각 순으로 흘려보내는 생성기
+
+    원문 전체의 줄 목록이나 작업 바이트를 만들지 않으므로 문서 크기와 관계없이
+    메모리 사용량이 일정하다. 출력 결과는 create_esc_pos_content(prepare_print_content(...))와
+    같다. stats 딕셔너리를 주면 줄/바이트/조각 수를 기록한다.
+    """
+    profile = profile or DEFAULT_PROFILE
+    stats = {} if stats is None else stats
+    stats.update(lines=0, bytes=0, chunks=0)
+    pending = [""]  # 위에 1줄 여백
+    pending_chars = 0
+    head = profile.prologue
+
+    def flush(tail=b''):
+        nonlocal head, pending_chars
+        chunk = head + _encode_lines(pending, profile) + tail
+        head = b''
+        pending.clear()
+        pending_chars = 0
+        stats["bytes"] += len(chunk)
+        stats["chunks"] += 1
+        return chunk
+
+    text_lines = 0
+    leading_blanks = 0  # 공백뿐인 문서는 빈 줄도 출력하지 않으므로 첫 글자가 나올 때까지 보류
+    for source_line in _iter_source_lines(source):
+        # 줄 하나가 아무리 길어도 대체 처리/단어 분리/줄바꿈을 모두 지연 평가한다
+        words = _iter_sanitized_words(source_line, profile)
+        first_word = next(words, None)
+        if first_word is not None:
+            wrapped = _wrap_words(chain((first_word,), words), profile.paper_width)
+            if leading_blanks > 0:
+                wrapped = chain(repeat("", leading_blanks), wrapped)
+            leading_blanks = -1
+        elif leading_blanks >= 0:
+            leading_blanks += 1
+            continue
+        else:
+            wrapped = ("",)
+        for line in wrapped:
+            pending.append(line)
+            pending_chars += len(line) + 1
+            text_lines += 1
+            # CP949는 글자당 최대 2바이트
+            if pending_chars * 2 >= chunk_size:
+                yield flush()
+
+    pending.extend([""] * _bottom_padding(text_lines))
+    stats["lines"] = text_lines
+    yield flush(profile.epilogue)
+
+# ESC/POS 스트림 최적화 (peephole)
+# 출력 결과는 그대로 두고 보내는 바이트만 줄인다. 알 수 없는 명령을 만나면
+# 그 뒤는 손대지 않고 그대로 보낸다.
+
+_LF = 0x0A
+_ESC, _FS, _GS = 0x1B, 0x1C, 0x1D
+_COMMAND_START = re.compile(rb'[\x0A\x1B\x1C\x1D]')
+
+# 인자 1바이트로 모드를 설정하는 명령 -> 모드 이름
+_MODE_COMMANDS = {
+    b'\x1B\x61': "align",     # ESC a n (정렬)
+    b'\x1B\x74': "codepage",  # ESC t n (코드페이지)
+    b'\x1B\x45': "bold",      # ESC E n (강조)
+    b'\x1D\x21': "size",      # GS ! n (문자 크기)
+}
+_KANJI_COMMANDS = {b'\x1C\x26': 1, b'\x1C\x2E': 0}  # FS & (한글 모드) / FS . (해제)
+# SRP-330II 한글 처리 우회: FS & 직후 FS . (docs/bixolon-srp330ii-control-chars.md).
+# 상태 값으로는 아무 효과가 없어 보이지만 실기기에서 필요하므로 한 덩어리로 그대로 보낸다.
+_KANJI_WORKAROUND = b'\x1C\x26\x1C\x2E'
+# ESC @ 직후 모드 값 (한글 모드 기본값은 기종/DIP 설정에 따라 다르므로 제외)
+_RESET_DEFAULTS = {"align": 0, "codepage": 0, "bold": 0, "size": 0}
+MAX_FEED_LINES = 255  # ESC d n 한 번에 보낼 수 있는 줄 수
+
+# 출력에는 영향이 없지만 ESC @ 전까지 유지되는 바코드 설정 명령 (GS H / GS h / GS w, 인자 1바이트)
+_SETTING_COMMANDS = frozenset((b'\x1D\x48', b'\x1D\x68', b'\x1D\x77'))
+
+# 토큰 종류 (_OPAQUE: 지우거나 순서를 바꾸지 않고 그대로 보내는 명령)
+_TEXT, _FEED, _MODE, _RESET, _CUT, _SYMBOL, _RAW, _SETTING, _OPAQUE = range(9)
+
+
+def _mode_value(mode, n):
+    """같은 효과를 내는 인자를 하나로 정규화 (ESC a 0/48, ESC E 짝수/홀수 등)"""
+    if mode == "align":
+        return n - 48 if n >= 48 else n
+    if mode == "bold":
+        return n & 1
+    return n
+
+
+def _tokenize_esc_pos(data):
+    """ESC/POS 바이트를 (종류, 바이트, 값) 토큰으로 분해"""
+    end = len(data)
+    position = 0
+    while position < end:
+        match = _COMMAND_START.search(data, position)
+        start = match.start() if match else end
+        if start > position:
+            yield _TEXT, data[position:start], None
+            position = start
+            continue
+
+        byte = data[position]
+        if byte == _LF:
+            yield _FEED, data[position:position + 1], 1
+            position += 1
+            continue
+
+        prefix = data[position:position + 2]
+        size = None
+        if prefix in _MODE_COMMANDS and position + 2 < end:
+            yield _MODE, data[position:position + 3], (_MODE_COMMANDS[prefix], _mode_value(
+                _MODE_COMMANDS[prefix], data[position + 2]))
+            position += 3
+            continue
+        if data.startswith(_KANJI_WORKAROUND, position):
+            yield _OPAQUE, _KANJI_WORKAROUND, None
+            position += len(_KANJI_WORKAROUND)
+            continue
+        if prefix in _KANJI_COMMANDS:
+            yield _MODE, prefix, ("kanji", _KANJI_COMMANDS[prefix])
+            position += 2
+            continue
+        if prefix in _SETTING_COMMANDS and position + 2 < end:
+            yield _SETTING, data[position:position + 3], None
+            position += 3
+            continue
+        if prefix == b'\x1B\x40':  # ESC @
+            yield _RESET, prefix, None
+            position += 2
+            continue
+        if prefix == b'\x1B\x64' and position + 2 < end:  # ESC d n
+            yield _FEED, data[position:position + 3], data[position + 2]
+            position += 3
+            continue
+        if prefix == b'\x1D\x56' and position + 2 < end:  # GS V m [n]
+            size = 3 if data[position + 2] in (0, 1, 48, 49) else 4
+            if position + size <= end:
+                yield _CUT, data[position:position + size], None
+                position += size
+                continue
+        size = _symbol_command_size(data, position)
+        if size:
+            yield _SYMBOL, data[position:position + size], None
+            position += size
+            continue
+
+        # 모르는 명령: 인자 길이를 알 수 없으므로 나머지를 그대로 전달
+        yield _RAW, data[position:], None
+        return
+
+
+def _symbol_command_size(data, position):
+    """GS ( k / GS k / GS v 0 명령의 전체 길이 (알 수 없으면 0)"""
+    end = len(data)
+    prefix = data[position:position + 3]
+    if prefix == b'\x1D\x28\x6B' and position + 5 <= end:  # GS ( k pL pH ...
+        size = 5 + data[position + 3] + data[position + 4] * 256
+    elif prefix[:2] == b'\x1D\x6B' and position + 3 <= end:  # GS k m ...
+        m = data[position + 2]
+        if m <= 6:  # NUL로 끝나는 데이터
+            terminator = data.find(b'\x00', position + 3)
+            size = terminator - position + 1 if terminator >= 0 else 0
+        elif 65 <= m <= 79 and position + 4 <= end:  # 길이 n + 데이터
+            size = 4 + data[position + 3]
+        else:
+            size = 0
+    elif prefix == b'\x1D\x76\x30' and position + 8 <= end:  # GS v 0 m xL xH yL yH ...
+        width = data[position + 4] + data[position + 5] * 256
+        height = data[position + 6] + data[position + 7] * 256
+        size = 8 + width * height
+    else:
+        size = 0
+    return size if size and position + size <= end else 0
+
+
+def _feed_bytes(lines):
+    """줄바꿈 lines번: 4줄 이상이면 ESC d n으로 접음"""
+    parts = []
+    while lines > 0:
+        chunk = min(lines, MAX_FEED_LINES)
+        parts.append(b'\x1B\x64' + bytes((chunk,)) if chunk > 3 else b'\n' * chunk)
+        lines -= chunk
+    return b''.join(parts)
+
+
+def optimize_esc_pos(data):
+    """ESC/POS 스트림 peephole 최적화 (출력 결과는 동일)
+
+    - 연속 줄바꿈 4개 이상은 ESC d n 하나로 접는다
+    - 모드 설정(정렬/코드페이지/한글/강조/크기)은 실제로 글자를 찍기 직전까지
+      미뤄 두었다가, 그 사이 다시 설정되었거나 이미 같은 값이면 버린다
+    - ESC @ 와 그 뒤 첫 출력 전까지의 초기화 명령, FS & -> FS . 우회 쌍은
+      기종별 동작에 기대는 부분이므로 지우거나 순서를 바꾸지 않는다
+    """
+    out = []
+    state = {}    # 프린터에 적용된 것이 확실한 모드 값
+    pending = {}  # 보내지 않고 미뤄 둔 모드 설정: mode -> (값, 바이트)
+    feeds = 0
+    line_start = False  # 스트림 시작 시점의 인쇄 버퍼 상태는 알 수 없음
+    initializing = False  # ESC @ 이후 아직 아무것도 출력하지 않음 (초기화 구간)
+
+    def flush_feeds():
+        nonlocal feeds
+        if feeds:
+            out.append(_feed_bytes(feeds))
+            feeds = 0
+
+    def flush_modes(modes=None):
+        for mode in list(pending) if modes is None else [m for m in modes if m in pending]:
+            value, command = pending.pop(mode)
+            if state.get(mode) != value:
+                out.append(command)
+                state[mode] = value
+
+    for kind, chunk, value in _tokenize_esc_pos(data):
+        if initializing and kind in (_MODE, _SETTING, _OPAQUE):
+            # 초기화 구간은 받은 그대로 보내고 값만 기록
+            out.append(chunk)
+            if kind == _MODE:
+                state[value[0]] = value[1]
+            elif kind == _OPAQUE:
+                state.pop("kanji", None)
+            continue
+        initializing = False
+
+        if kind == _FEED:
+            # 빈 줄 높이는 문자 크기의 영향을 받으므로 크기 설정만 먼저 반영
+            if "size" in pending:
+                flush_feeds()
+                flush_modes(("size",))
+            feeds += value
+            line_start = True
+        elif kind == _MODE:
+            mode = value[0]
+            if mode == "align" and not line_start:
+                # 줄 중간의 정렬 명령은 프린터가 무시하므로 손대지 않고 상태를 모름으로 둠
+                flush_feeds()
+                out.append(chunk)
+                pending.pop(mode, None)
+                state.pop(mode, None)
+                continue
+            pending.pop(mode, None)  # 이전 설정은 글자를 찍기 전에 덮어써졌으므로 버림
+            pending[mode] = (value[1], chunk)
+        elif kind == _OPAQUE:
+            # 앞서 미뤄 둔 설정을 먼저 보내 순서를 지키고, 이후 한글 모드는 모름으로 둠
+            flush_feeds()
+            flush_modes()
+            out.append(chunk)
+            state.pop("kanji", None)
+        elif kind == _RESET:
+            flush_feeds()
+            pending.clear()
+            out.append(chunk)
+            state = dict(_RESET_DEFAULTS)
+            line_start = True
+            initializing = True
+        elif kind in (_CUT, _SETTING):
+            # 바코드 설정은 값을 추적하지 않으므로 그대로 보냄
+            flush_feeds()
+            out.append(chunk)
+        elif kind == _TEXT:
+            flush_feeds()
+            flush_modes()
+            out.append(chunk)
+            line_start = False
+        else:  # _SYMBOL, _RAW
+            flush_feeds()
+            flush_modes()
+            out.append(chunk)
+            line_start = False
+
+    flush_feeds()
+    flush_modes()
+    return b''.join(out)
+
+
+# 단계별 지연 시간 히스토그램과 카운터 (MCP get_metrics 도구, Prometheus 텍스트 덤프용)
+
+METRICS_PREFIX = "todo_printer"
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # 초 단위 상한
+
+
+class _StageTimer:
+    """with 블록 실행 시간을 히스토그램에 기록 (예외가 나도 기록)"""
+
+    __slots__ = ("_metrics", "_key", "_started")
+
+    def __init__(self, metrics, key):
+        self._metrics = metrics
+        self._key = key
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics._observe(self._key, time.perf_counter() - self._started)
+        return False
+
+
+class Metrics:
+    """고정 버킷 히스토그램과 카운터 모음
+
+    시계열은 (이름, 라벨)로 구분한다. 버킷 경계가 고정되어 있어 관측 한 번은
+    bisect 한 번과 정수 증가뿐이며, 메모리도 시계열 수에만 비례한다.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}  # (name, labels) -> {"counts", "sum", "count"}
+        self._counters = {}    # (name, labels) -> int
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _series(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def _observe(self, key, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    "counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0,
+                }
+            histogram["counts"][index] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def observe(self, name, seconds, **labels):
+        """히스토그램에 관측값(초) 추가"""
+        self._observe(self._series(name, labels), seconds)
+
+    def time(self, name, **labels):
+        """with 블록 실행 시간을 name 히스토그램에 기록하는 컨텍스트 관리자"""
+        return _StageTimer(self, self._series(name, labels))
+
+    def inc(self, name, amount=1, **labels):
+        """카운터 증가"""
+        key = self._series(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter(self, name, **labels):
+        """카운터 현재 값"""
+        return self._counters.get(self._series(name, labels), 0)
+
+    def histogram(self, name, **labels):
+        """히스토그램 {"count", "sum", "counts"} (없으면 None)"""
+        histogram = self._histograms.get(self._series(name, labels))
+        if histogram is None:
+            return None
+        with self._lock:
+            return {"count": histogram["count"], "sum": histogram["sum"],
+                    "counts": list(histogram["counts"])}
+
+    def _quantile(self, counts, total, fraction):
+        """버킷 상한으로 추정한 분위수 (마지막 버킷을 넘으면 inf)"""
+        rank = total * fraction
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    @staticmethod
+    def _format_series(name, labels):
+        if not labels:
+            return name
+        return name + "{" + ",".join(f"{key}={value}" for key, value in labels) + "}"
+
+    def snapshot(self):
+        """JSON으로 직렬화 가능한 현재 값 (히스토그램은 count/sum/평균/p50/p99 추정치)"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h["counts"]), h["sum"], h["count"])
+                          for key, h in self._histograms.items()}
+        result = {"counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"][self._format_series(name, labels)] = value
+        for (name, labels), (counts, total_seconds, count) in sorted(histograms.items()):
+            result["histograms"][self._format_series(name, labels)] = {
+                "count": count,
+                "sum_ms": round(total_seconds * 1000, 3),
+                "avg_ms": round(total_seconds * 1000 / count, 3) if count else 0.0,
+                "p50_le_ms": self._quantile(counts, count, 0.50) * 1000,
+                "p99_le_ms": self._quantile(counts, count, 0.99) * 1000,
+            }
+        return result
+
+    @staticmethod
+    def _prometheus_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                   for _, value in pairs)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+    def to_prometheus(self, prefix=METRICS_PREFIX):
+        """Prometheus 텍스트 노출 형식 문자열"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(h["counts"]), h["sum"], h["count"]))
+                                for key, h in self._histograms.items())
+        out = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                out.append(f"# TYPE {metric} counter")
+            out.append(f"{metric}{self._prometheus_labels(labels)} {value}")
+        bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+        for (name, labels), (counts, total_seconds, count) in histograms:
+            metric = f"{prefix}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                out.append(f"# TYPE {metric} histogram")
+            for bound, cumulative in zip(bounds, accumulate(counts)):
+                out.append(f"{metric}_bucket{self._prometheus_labels(labels, (('le', bound),))} {cumulative}")
+            out.append(f"{metric}_sum{self._prometheus_labels(labels)} {total_seconds!r}")
+            out.append(f"{metric}_count{self._prometheus_labels(labels)} {count}")
+        return "\n".join(out) + "\n"
+
+    def write_prometheus(self, path, prefix=METRICS_PREFIX):
+        """Prometheus 텍스트를 파일로 저장 (임시 파일에 쓴 뒤 교체하므로 수집기가 중간 상태를 읽지 않음)"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(temp_path, path)
+        return path
+
+    def reset(self):
+        """모든 시계열 제거"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# 프로세스 전체에서 공유하는 측정값
+metrics = Metrics()
+
+
+class RenderCache:
+    """렌더링 결과(줄 목록, 미리보기, ESC/POS 바이트) LRU 캐시
+
+    같은 텍스트를 미리보기 후 출력하거나 매일 같은 메모를 다시 출력할 때
+    줄바꿈/인코딩을 다시 하지 않는다. 키는 (텍스트, 프린터 프로필)이며
+    각 산출물은 처음 요청될 때 만들어진다. 보관 크기 합계가 max_bytes를
+    넘으면 가장 오래 사용하지 않은 항목부터 제거한다. 마크업 텍스트는
+    compile_markup 결과를 별도 키(markup=True)로 보관한다.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> {"key", "profile", "lines", "body", "preview", "content", "size"}
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry(self, text, profile=None, markup=False):
+        profile = profile or DEFAULT_PROFILE
+        key = (text, profile.key, markup)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.inc("render_cache_total", result="hit")
+                return entry
+            self.misses += 1
+        metrics.inc("render_cache_total", result="miss")
+
+        body = None
+        with metrics.time("stage_seconds", stage="wrap"):
+            # 인코딩할 수 없는 문자는 줄바꿈 전에 바꿔 두어야 폭 계산이 실제 출력과 맞음
+            if markup:
+                lines, body = compile_markup(profile.sanitize(text), profile)
+                lines = tuple(lines)
+            else:
+                lines = tuple(prepare_print_content(profile.sanitize(text), width=profile.paper_width))
+        entry = {"key": key, "profile": profile, "lines": lines, "body": body,
+                 "preview": None, "content": None, "size": 0}
+        self._store(key, entry, len(text) + sum(map(len, lines)) + len(body or b''))
+        return entry
+
+    def _store(self, key, entry, added_size):
+        """항목을 저장(또는 크기 갱신)하고 용량 초과분을 제거"""
+        with self._lock:
+            if self._entries.get(key) is not entry:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self.size -= previous["size"]
+                self._entries[key] = entry
+            entry["size"] += added_size
+            self.size += added_size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted["size"]
+                self.evictions += 1
+
+    def lines(self, text, profile=None, markup=False):
+        """prepare_print_content 결과 (markup: compile_markup 줄 목록)"""
+        return list(self._entry(text, profile, markup)["lines"])
+
+    def preview(self, text, profile=None, markup=False):
+        """printer_preview 미리보기 문자열"""
+        entry = self._entry(text, profile, markup)
+        if entry["preview"] is None:
+            entry["preview"] = _format_preview(entry["lines"], entry["profile"].paper_width)
+            self._store(entry["key"], entry, len(entry["preview"]))
+        return entry["preview"]
+
+    def _content(self, entry):
+        if entry["content"] is None:
+            profile = entry["profile"]
+            with metrics.time("stage_seconds", stage="encode"):
+                if entry["body"] is not None:
+                    entry["content"] = profile.prologue + entry["body"] + profile.epilogue
+                else:
+                    entry["content"] = create_esc_pos_content(entry["lines"], profile)
+            self._store(entry["key"], entry, len(entry["content"]))
+        return entry["content"]
+
+    def content(self, text, profile=None, markup=False):
+        """create_esc_pos_content 결과 (ESC/POS 바이트)"""
+        return self._content(self._entry(text, profile, markup))
+
+    def render(self, text, profile=None, markup=False):
+        """출력용 (줄 목록, ESC/POS 바이트)를 한 번의 조회로 반환"""
+        entry = self._entry(text, profile, markup)
+        return list(entry["lines"]), self._content(entry)
+
+    def _body(self, entry):
+        prologue, epilogue = entry["profile"].prologue, entry["profile"].epilogue
+        return self._content(entry)[len(prologue):-len(epilogue)]
+
+    def body(self, text, profile=None, markup=False):
+        """작업 앞뒤 고정 명령을 뺀 본문 바이트 (create_esc_pos_document 입력용)"""
+        return self._body(self._entry(text, profile, markup))
+
+    def render_body(self, text, profile=None, markup=False):
+        """여러 메모를 묶어 출력할 때 쓰는 (줄 수, 본문 바이트)를 한 번의 조회로 반환"""
+        entry = self._entry(text, profile, markup)
+        return len(entry["lines"]), self._body(entry)
+
+    def clear(self):
+        """모든 항목 제거"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """캐시 적중/실패/제거 카운터와 현재 크기"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size": self.size,
+            }
+
+
+# 프로세스 전체에서 공유하는 렌더링 캐시
+render_cache = RenderCache()
+
+
+RAW_URI_PREFIX = "socket://"
+DEFAULT_RAW_PORT = 9100
+
+
+def parse_raw_printer(printer_name):
+    """'socket://host[:port]' 형식의 프린터 이름이면 (host, port), 아니면 None"""
+    if not printer_name.startswith(RAW_URI_PREFIX):
+        return None
+    address = printer_name[len(RAW_URI_PREFIX):].rstrip('/')
+    host, sep, port = address.rpartition(':')
+    if not sep or not port.isdigit():
+        return address.strip('[]'), DEFAULT_RAW_PORT
+    return host.strip('[]'), int(port)
+
+
+class RawConnectionPool:
+    """네트워크 프린터 raw 포트(9100)용 keep-alive 연결 풀
+
+    프린터별로 유휴 소켓을 보관했다가 다음 작업에 재사용한다.
+    재사용 전 상대가 연결을 끊었는지 확인하고, 재사용한 유휴 연결에서 전송
+    오류가 나면(확인 직후 끊긴 경우) 새 연결로 한 번 재시도한다. 새로 연 연결의
+    오류는 프린터에 일부가 이미 출력됐을 수 있으므로 재시도하지 않는다.
+    """
+
+    def __init__(self, connect_timeout=3.0, idle_timeout=30.0, max_idle_per_printer=2):
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_printer = max_idle_per_printer
+        self._idle = {}  # (host, port) -> [(socket, 반납 시각), ...]
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reuses = 0
+
+    def _connect(self, address):
+        sock = socket.create_connection(address, timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self.connects += 1
+        return sock
+
+    @staticmethod
+    def _is_alive(sock):
+        """유휴 소켓이 아직 살아있는지 확인 (프린터가 보낸 상태 바이트는 버림)"""
+        try:
+            while select.select([sock], [], [], 0)[0]:
+                if not sock.recv(4096):
+                    return False  # 상대가 연결을 닫음
+            return True
+        except OSError:
+            return False
+
+    def _acquire(self, address):
+        """(소켓, 유휴 연결 재사용 여부)"""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(address, [])
+            while idle:
+                sock, released_at = idle.pop()
+                if now - released_at < self.idle_timeout and self._is_alive(sock):
+                    self.reuses += 1
+                    return sock, True
+                sock.close()
+        return self._connect(address), False
+
+    def _release(self, address, sock):
+        with self._lock:
+            idle = self._idle.setdefault(address, [])
+            if len(idle) < self.max_idle_per_printer:
+                idle.append((sock, time.monotonic()))
+                return
+        sock.close()
+
+    def send(self, host, port, data):
+        """ESC/POS 바이트를 프린터로 전송 (재사용한 연결이 끊겨 있었으면 새 연결로 1회 재시도)"""
+        address = (host, port)
+        sock, reused = self._acquire(address)
+        try:
+            sock.sendall(data)
+        except OSError:
+            sock.close()
+            if not reused:
+                raise
+            sock = self._connect(address)
+            try:
+                sock.sendall(data)
+            except OSError:
+                sock.close()
+                raise
+        self._release(address, sock)
+
+    def send_stream(self, host, port, chunks):
+        """조각 이터러블을 연결 하나로 차례로 전송 (sendall이 막히면 생성도 멈춤)
+
+        이미 보낸 조각은 다시 만들 수 없으므로 전송 중 오류는 재시도하지 않는다.
+        """
+        address = (host, port)
+        sock, _ = self._acquire(address)
+        try:
+            for chunk in chunks:
+                sock.sendall(chunk)
+        except BaseException:
+            sock.close()
+            raise
+        self._release(address, sock)
+
+    def close(self):
+        """보관 중인 모든 연결 종료"""
+        with self._lock:
+            for idle in self._idle.values():
+                for sock, _ in idle:
+                    sock.close()
+            self._idle.clear()
+
+
+# 프로세스 전체에서 공유하는 raw 전송 연결 풀
+raw_pool = RawConnectionPool()
+
+
+def _parse_printer_names(lpstat_output):
+    """lpstat -p 출력에서 프린터 이름 목록 추출"""
+    printers = []
+    for line in lpstat_output.split('\n'):
+        if line.startswith('printer '):
+            printers.append(line.split()[1])
+    return printers
+
 
 def printer_list():
     """사용 가능한 프린터 목록 가져오기"""
     try:
         result = subprocess.run(['lpstat', '-p'], capture_output=True, text=True)
         if result.returncode == 0:
-            printers = []
-            for line in result.stdout.split('\n'):
-                if line.startswith('printer '):
-                    printer_name = line.split()[1]
-                    printers.append(printer_name)
-            return printers
+            return _parse_printer_names(result.stdout)
         return []
     except Exception:
         return []
 
-def printer_print(text, printer_name="BIXOLON_SRP_330II", isFromMCP=False):
-    """CUPS를 통해 프린터로 출력"""
-    try:
-        # 출력할 내용 준비
-        lines = prepare_print_content(text)
-        
-        # ESC/POS 명령어 포함한 내용 생성
-        print_content = create_esc_pos_content(lines)
-        
-        # 임시 파일 생성
+SPOOL_STDIN = "stdin"        # 작업 바이트를 lp 표준입력으로 전달
+SPOOL_TEMPFILE = "tempfile"  # 임시 파일에 쓴 뒤 lp에 경로 전달
+SPOOL_MODES = (SPOOL_STDIN, SPOOL_TEMPFILE)
+OPTIMIZE_ESC_POS = True  # 전송 전 optimize_esc_pos 적용 여부 (기종 문제 확인 시 False, CLI --no-optimize)
+
+
+def _spool_with_lp(print_content, printer_name, spool=SPOOL_STDIN):
+    """lp 명령어로 CUPS 작업 제출 (stdout/stderr는 bytes)"""
+    cmd = ['lp', '-d', printer_name, '-o', 'raw']
+
+    if spool == SPOOL_STDIN:
+        # 파일 시스템을 거치지 않고 파이프로 바로 전달
+        with metrics.time("stage_seconds", stage="lp"):
+            return subprocess.run(cmd, input=print_content, capture_output=True)
+
+    if spool != SPOOL_TEMPFILE:
+        raise ValueError(f"알 수 없는 스풀 방식: {spool}")
+
+    import tempfile  # 임시 파일 방식에서만 필요 (기동 시 import 생략)
+
+    # 임시 파일 생성
+    with metrics.time("stage_seconds", stage="tempfile"):
         with tempfile.NamedTemporaryFile(delete=False, suffix='.bin') as temp_file:
             temp_file.write(print_content)
             temp_file_path = temp_file.name
-        
-        # lp 명령어로 출력
-        cmd = ['lp', '-d', printer_name, '-o', 'raw', temp_file_path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        # 임시 파일 삭제
-        import os
+    try:
+        with metrics.time("stage_seconds", stage="lp"):
+            return subprocess.run(cmd + [temp_file_path], capture_output=True)
+    finally:
+        # 임시 파일 삭제 (lp 실패 시에도)
         os.unlink(temp_file_path)
+
+
+def _submit_job(print_content, printer_name, spool=SPOOL_STDIN, optimize=None):
+    """작업 바이트를 최적화해 프린터로 전송하고 (returncode, stdout, stderr) 반환
+
+    optimize가 None이면 OPTIMIZE_ESC_POS를 따르고, False면 받은 바이트를 그대로 보낸다.
+    """
+    if OPTIMIZE_ESC_POS if optimize is None else optimize:
+        print_content = optimize_esc_pos(print_content)
+    # socket://host:port 프린터는 CUPS를 거치지 않고 raw 소켓으로 직접 전송
+    raw_target = parse_raw_printer(printer_name)
+    if raw_target:
+        with metrics.time("stage_seconds", stage="raw_send"):
+            raw_pool.send(*raw_target, print_content)
+        return 0, b'', b''
+
+    result = _spool_with_lp(print_content, printer_name, spool)
+    return result.returncode, result.stdout, result.stderr
+
+
+def printer_print(text, printer_name="BIXOLON_SRP_330II", isFromMCP=False, spool=SPOOL_STDIN,
+                  symbols=(), markup=False):
+    """CUPS를 통해 프린터로 출력 (symbols: 본문 아래 QR/바코드 명령, markup: 마크업 해석)"""
+    try:
+        # 출력할 내용 준비 및 ESC/POS 명령어 포함한 내용 생성
+        # (미리보기 등으로 이미 렌더링했다면 캐시 재사용)
+        profile = get_printer_profile(printer_name)
+        lines, print_content = render_cache.render(text, profile, markup)
+        print_content = with_symbols(print_content, symbols, profile)
+
+        returncode, stdout, stderr = _submit_job(print_content, printer_name, spool)
+        metrics.inc("print_jobs_total", result="success" if returncode == 0 else "failure")
         
-        if result.returncode == 0:
+        if returncode == 0:
             if not isFromMCP:
                 print(f"✅ 출력 완료: {len(lines)}줄 → {printer_name}")
-                if result.stdout.strip():
-                    print(f"📝 작업 ID: {result.stdout.strip()}")
+                job_id = stdout.decode(errors='replace').strip()
+                if job_id:
+                    print(f"📝 작업 ID: {job_id}")
             return True
         else:
             if not isFromMCP:
-                print(f"❌ 출력 실패: {result.stderr}")
+                print(f"❌ 출력 실패: {stderr.decode(errors='replace')}")
             return False
             
     except Exception as e:
+        metrics.inc("print_jobs_total", result="failure")
         if not isFromMCP:
             print(f"❌ 출력 오류: {e}")
         return False
 
+def _render_many(texts, cut_each=True, profile=None):
+    """여러 텍스트를 작업 하나로 렌더링 → (항목별 결과, ESC/POS 바이트 또는 None)"""
+    results = []
+    bodies = []
+    for index, text in enumerate(texts):
+        try:
+            line_count, body = render_cache.render_body(text, profile)
+            bodies.append(body)
+            results.append({"index": index, "success": True, "lines": line_count, "error": None})
+        except Exception as e:
+            results.append({"index": index, "success": False, "lines": 0, "error": str(e)})
+    if not bodies:
+        return results, None
+    return results, create_esc_pos_document(bodies, cut_each, profile)
+
+
+def _fail_rendered(results, error):
+    """작업 제출이 실패하면 렌더링에 성공했던 항목도 실패로 표시"""
+    for result in results:
+        if result["success"]:
+            result["success"] = False
+            result["error"] = error
+    return results
+
+
+def printer_print_many(texts, printer_name="BIXOLON_SRP_330II", isFromMCP=False,
+                       cut_each=True, spool=SPOOL_STDIN):
+    """여러 텍스트를 ESC/POS 스트림 하나, CUPS 작업 하나로 출력
+
+    항목별 결과 목록({"index", "success", "lines", "error"})을 반환한다.
+    """
+    results, print_content = _render_many(texts, cut_each, get_printer_profile(printer_name))
+    if print_content is None:
+        return results
+    try:
+        returncode, _, stderr = _submit_job(print_content, printer_name, spool)
+    except Exception as e:
+        metrics.inc("print_jobs_total", result="failure")
+        return _fail_rendered(results, f"출력 오류: {e}")
+
+    metrics.inc("print_jobs_total", result="success" if returncode == 0 else "failure")
+    if returncode != 0:
+        return _fail_rendered(results, f"출력 실패: {stderr.decode(errors='replace').strip()}")
+    if not isFromMCP:
+        printed = sum(result["success"] for result in results)
+        print(f"✅ 출력 완료: 메모 {printed}개 → {printer_name}")
+    return results
+
+
+def _stream_failed(isFromMCP, message, result="failure"):
+    metrics.inc("print_jobs_total", result=result)
+    if not isFromMCP:
+        print(f"❌ {message}")
+    return False
+
+
+def printer_print_stream(source, printer_name="BIXOLON_SRP_330II", isFromMCP=False,
+                         chunk_size=STREAM_CHUNK_SIZE, stats=None):
+    """길이 제한 없는 문서를 조각 단위로 렌더링하며 바로 전송 (메모리 사용량 일정)
+
+    source: 문자열 또는 줄 이터러블(열린 파일, sys.stdin 등). 파이프/소켓이 가득 차면
+    쓰기가 막히므로 렌더링도 프린터 속도에 맞춰 멈춘다. raw 소켓 프린터는 첫 조각이
+    도착하자마자 출력을 시작하고, CUPS는 작업을 다 받은 뒤 출력한다.
+    """
+    stats = {} if stats is None else stats
+    profile = get_printer_profile(printer_name)
+    chunks = iter_esc_pos_chunks(source, profile, chunk_size, stats)
+    raw_target = parse_raw_printer(printer_name)
+    try:
+        if raw_target:
+            with metrics.time("stage_seconds", stage="raw_send"):
+                raw_pool.send_stream(*raw_target, chunks)
+        else:
+            with metrics.time("stage_seconds", stage="lp"):
+                process = subprocess.Popen(['lp', '-d', printer_name, '-o', 'raw'], stdin=subprocess.PIPE,
+                                           stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                try:
+                    for chunk in chunks:
+                        process.stdin.write(chunk)
+                    _, stderr = process.communicate(timeout=LP_TIMEOUT)
+                except BaseException:
+                    process.kill()
+                    process.wait()
+                    raise
+            if process.returncode != 0:
+                return _stream_failed(isFromMCP, f"출력 실패: {stderr.decode(errors='replace')}")
+    except Exception as e:
+        return _stream_failed(isFromMCP, f"출력 오류: {e}")
+
+    metrics.inc("print_jobs_total", result="success")
+    if not isFromMCP:
+        print(f"✅ 출력 완료: {stats['lines']}줄, {stats['bytes']}바이트({stats['chunks']}조각) → {printer_name}")
+    return True
+
 def printer_status(printer_name):
     """프린터 상태 확인"""
+    raw_target = parse_raw_printer(printer_name)
+    if raw_target:
+        try:
+            socket.create_connection(raw_target, timeout=raw_pool.connect_timeout).close()
+            return f"raw 프린터 {printer_name} is idle (연결 가능)"
+        except OSError as e:
+            return f"상태 확인 실패: {e}"
+
     try:
         result = subprocess.run(['lpstat', '-p', printer_name], capture_output=True, text=True)
         if result.returncode == 0:
@@ -180,25 +1483,340 @@ def printer_status(printer_name):
     except Exception as e:
         return f"상태 확인 실패: {e}"
 
+# lpstat -l 긴 형식에서 프린터 줄 아래에 붙는 속성 줄의 키
+_LPSTAT_DETAIL_KEYS = (
+    'Form mounted', 'Content types', 'Printer types', 'Description', 'Alerts',
+    'Location', 'Connection', 'Interface', 'On fault', 'After fault',
+    'Users allowed', 'Users denied', 'Forms allowed', 'Banner required',
+    'Charset sets', 'Default pitch', 'Default page size', 'Default port settings',
+)
+# 여러 옵션을 한 번에 넘겨 프린터 상태(-p)와 작업 수락 여부(-a)를 한 프로세스로 조회
+LPSTAT_INVENTORY_CMD = ['lpstat', '-l', '-p', '-a']
+
+
+def _lpstat_env():
+    """lpstat 출력 파싱을 위해 메시지 번역을 끈 환경변수"""
+    return {**os.environ, 'LC_ALL': 'C'}
+
+
+def parse_lpstat_inventory(lpstat_output):
+    """lpstat -l -p -a 출력을 프린터별 레코드 목록으로 변환
+
+    각 레코드는 다음 키를 가진 딕셔너리:
+    name, state('idle'|'printing'|'stopped'), enabled, accepting,
+    reason(상태 사유 메시지, 없으면 ''), status(lpstat 원문 첫 줄)
+    """
+    records = {}
+    current = None  # 들여쓰기 줄이 붙을 레코드 (-a 섹션이면 None)
+    reason_line = False  # 다음 줄이 printer 줄 바로 아래 첫 속성 줄인지 (상태 사유 자리)
+
+    for line in lpstat_output.splitlines():
+        if not line.strip():
+            continue
+
+        if line.startswith('printer '):
+            name = line.split()[1]
+            if ' now printing ' in line:
+                state = 'printing'
+            elif ' disabled ' in line or line.endswith(' disabled'):
+                state = 'stopped'
+            else:
+                state = 'idle'
+            current = records.setdefault(name, {'name': name, 'accepting': True})
+            current.update(state=state, enabled=state != 'stopped', reason='', status=line.strip())
+            reason_line = True
+            continue
+
+        if line[0].isspace():
+            # 사유는 printer 줄 바로 다음의 한 단계 들여쓴 줄뿐이다. 'Users allowed:' 아래의
+            # '\t\t(all)' 같은 두 단계 들여쓴 값 줄이나 그 뒤의 속성 줄은 사유가 아님.
+            detail = line.strip()
+            if (reason_line and current is not None and not line.startswith('\t\t')
+                    and not detail.startswith(_LPSTAT_DETAIL_KEYS)):
+                current['reason'] = detail
+            reason_line = False
+            continue
+
+        # -a 섹션: "NAME accepting requests since ..." / "NAME not accepting requests since ..."
+        name, _, rest = line.partition(' ')
+        if rest.startswith(('accepting', 'not accepting')):
+            records.setdefault(name, {
+                'name': name, 'state': 'unknown', 'enabled': False, 'reason': '', 'status': ''
+            })['accepting'] = rest.startswith('accepting')
+        current = None
+        reason_line = False
+
+    return list(records.values())
+
+
+def describe_printer(record):
+    """인벤토리 레코드를 한 줄 상태 설명으로 변환"""
+    description = record['status'] or f"printer {record['name']}"
+    if record['reason']:
+        description += f" - {record['reason']}"
+    if not record['accepting']:
+        description += " (작업 거부 중)"
+    return description
+
+
+def printer_inventory():
+    """모든 프린터 상태를 lpstat 한 번 실행으로 조회"""
+    try:
+        result = subprocess.run(LPSTAT_INVENTORY_CMD, capture_output=True, text=True, env=_lpstat_env())
+        if result.returncode == 0:
+            return parse_lpstat_inventory(result.stdout)
+        return []
+    except Exception:
+        return []
+
+# asyncio 서브프로세스 기반 비동기 버전 (MCP 서버용)
+# 스레드 풀을 거치지 않으므로 동시에 실행할 수 있는 lp/lpstat 수에 제한이 없다.
+
+LP_TIMEOUT = 30.0       # lp 작업 제출 최대 대기 시간 (초)
+LPSTAT_TIMEOUT = 10.0   # lpstat 조회 최대 대기 시간 (초)
+
+
+async def _run_command_async(cmd, input_data=None, timeout=None, env=None):
+    """명령 실행 후 (returncode, stdout, stderr) 반환
+
+    시간 초과 시 asyncio.TimeoutError, 작업 취소 시 CancelledError를 올리며
+    두 경우 모두 자식 프로세스 그룹 전체를 종료시킨다 (손자 프로세스가
+    파이프를 붙잡고 있으면 wait()가 끝나지 않으므로).
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+        env=env,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(input_data), timeout)
+    except BaseException:
+        if process.returncode is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        raise
+    return process.returncode, stdout, stderr
+
+
+async def printer_list_async(timeout=LPSTAT_TIMEOUT):
+    """printer_list의 비동기 버전"""
+    try:
+        returncode, stdout, _ = await _run_command_async(['lpstat', '-p'], timeout=timeout)
+        if returncode == 0:
+            return _parse_printer_names(stdout.decode(errors='replace'))
+        return []
+    except (OSError, asyncio.TimeoutError):
+        return []
+
+
+async def printer_inventory_async(timeout=LPSTAT_TIMEOUT):
+    """printer_inventory의 비동기 버전"""
+    try:
+        returncode, stdout, _ = await _run_command_async(
+            LPSTAT_INVENTORY_CMD, timeout=timeout, env=_lpstat_env()
+        )
+        if returncode == 0:
+            return parse_lpstat_inventory(stdout.decode(errors='replace'))
+        return []
+    except (OSError, asyncio.TimeoutError):
+        return []
+
+
+async def printer_status_async(printer_name, timeout=LPSTAT_TIMEOUT):
+    """printer_status의 비동기 버전"""
+    raw_target = parse_raw_printer(printer_name)
+    if raw_target:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(*raw_target), timeout)
+            writer.close()
+            return f"raw 프린터 {printer_name} is idle (연결 가능)"
+        except (OSError, asyncio.TimeoutError) as e:
+            return f"상태 확인 실패: {str(e) or '시간 초과'}"
+
+    try:
+        returncode, stdout, _ = await _run_command_async(['lpstat', '-p', printer_name], timeout=timeout)
+        if returncode == 0:
+            return stdout.decode(errors='replace').strip()
+        return f"프린터 '{printer_name}'을 찾을 수 없습니다."
+    except asyncio.TimeoutError:
+        return f"상태 확인 실패: lpstat 응답 시간 초과 ({timeout}초)"
+    except OSError as e:
+        return f"상태 확인 실패: {e}"
+
+
+async def _submit_job_async(print_content, printer_name, spool=SPOOL_STDIN, timeout=LP_TIMEOUT,
+                            optimize=None):
+    """_submit_job의 비동기 버전 → (returncode, stderr), 시간 초과 시 asyncio.TimeoutError"""
+    if OPTIMIZE_ESC_POS if optimize is None else optimize:
+        print_content = optimize_esc_pos(print_content)
+    raw_target = parse_raw_printer(printer_name)
+    if raw_target:
+        loop = asyncio.get_running_loop()
+        with metrics.time("stage_seconds", stage="raw_send"):
+            await asyncio.wait_for(
+                loop.run_in_executor(None, raw_pool.send, *raw_target, print_content), timeout
+            )
+        return 0, b''
+
+    cmd = ['lp', '-d', printer_name, '-o', 'raw']
+    if spool == SPOOL_STDIN:
+        with metrics.time("stage_seconds", stage="lp"):
+            returncode, _, stderr = await _run_command_async(cmd, print_content, timeout)
+    elif spool == SPOOL_TEMPFILE:
+        import tempfile  # 임시 파일 방식에서만 필요 (기동 시 import 생략)
+
+        with metrics.time("stage_seconds", stage="tempfile"):
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.bin') as temp_file:
+                temp_file.write(print_content)
+                temp_file_path = temp_file.name
+        try:
+            with metrics.time("stage_seconds", stage="lp"):
+                returncode, _, stderr = await _run_command_async(cmd + [temp_file_path], timeout=timeout)
+        finally:
+            os.unlink(temp_file_path)
+    else:
+        raise ValueError(f"알 수 없는 스풀 방식: {spool}")
+    return returncode, stderr
+
+
+async def printer_print_async(text, printer_name="BIXOLON_SRP_330II", isFromMCP=False,
+                              spool=SPOOL_STDIN, timeout=LP_TIMEOUT, symbols=(), markup=False):
+    """printer_print의 비동기 버전 (취소되면 lp 프로세스도 종료)"""
+    try:
+        profile = get_printer_profile(printer_name)
+        print_content = with_symbols(render_cache.content(text, profile, markup), symbols, profile)
+        returncode, stderr = await _submit_job_async(print_content, printer_name, spool, timeout)
+        metrics.inc("print_jobs_total", result="success" if returncode == 0 else "failure")
+        if returncode != 0 and not isFromMCP:
+            print(f"❌ 출력 실패: {stderr.decode(errors='replace')}")
+        return returncode == 0
+
+    except asyncio.TimeoutError:
+        metrics.inc("print_jobs_total", result="timeout")
+        if not isFromMCP:
+            print(f"❌ 출력 시간 초과: {timeout}초")
+        return False
+    except Exception as e:
+        metrics.inc("print_jobs_total", result="failure")
+        if not isFromMCP:
+            print(f"❌ 출력 오류: {e}")
+        return False
+
+async def printer_print_many_async(texts, printer_name="BIXOLON_SRP_330II", isFromMCP=False,
+                                   cut_each=True, spool=SPOOL_STDIN, timeout=LP_TIMEOUT):
+    """printer_print_many의 비동기 버전"""
+    results, print_content = _render_many(texts, cut_each, get_printer_profile(printer_name))
+    if print_content is None:
+        return results
+    try:
+        returncode, stderr = await _submit_job_async(print_content, printer_name, spool, timeout)
+    except asyncio.TimeoutError:
+        metrics.inc("print_jobs_total", result="timeout")
+        return _fail_rendered(results, f"출력 시간 초과: {timeout}초")
+    except Exception as e:
+        metrics.inc("print_jobs_total", result="failure")
+        return _fail_rendered(results, f"출력 오류: {e}")
+
+    metrics.inc("print_jobs_total", result="success" if returncode == 0 else "failure")
+    if returncode != 0:
+        return _fail_rendered(results, f"출력 실패: {stderr.decode(errors='replace').strip()}")
+    if not isFromMCP:
+        printed = sum(result["success"] for result in results)
+        print(f"✅ 출력 완료: 메모 {printed}개 → {printer_name}")
+    return results
+
+
+async def printer_print_stream_async(source, printer_name="BIXOLON_SRP_330II", isFromMCP=False,
+                                     chunk_size=STREAM_CHUNK_SIZE, timeout=LP_TIMEOUT, stats=None):
+    """printer_print_stream의 비동기 버전
+
+    조각마다 drain()으로 lp 파이프가 비워지기를 기다리므로 전송 버퍼가 일정 크기를
+    넘지 않는다. timeout은 문서 전체가 아니라 조각 하나를 넘기는 데 허용하는 시간이다.
+    """
+    stats = {} if stats is None else stats
+    profile = get_printer_profile(printer_name)
+    chunks = iter_esc_pos_chunks(source, profile, chunk_size, stats)
+    raw_target = parse_raw_printer(printer_name)
+    try:
+        if raw_target:
+            loop = asyncio.get_running_loop()
+            with metrics.time("stage_seconds", stage="raw_send"):
+                await loop.run_in_executor(None, raw_pool.send_stream, *raw_target, chunks)
+        else:
+            with metrics.time("stage_seconds", stage="lp"):
+                process = await asyncio.create_subprocess_exec(
+                    'lp', '-d', printer_name, '-o', 'raw',
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True,
+                )
+                try:
+                    for chunk in chunks:
+                        process.stdin.write(chunk)
+                        await asyncio.wait_for(process.stdin.drain(), timeout)
+                    process.stdin.close()  # communicate()는 입력이 없으면 stdin을 닫지 않음
+                    _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                except BaseException:
+                    if process.returncode is None:
+                        try:
+                            os.killpg(process.pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                        await process.wait()
+                    raise
+            if process.returncode != 0:
+                return _stream_failed(isFromMCP, f"출력 실패: {stderr.decode(errors='replace')}")
+    except asyncio.TimeoutError:
+        return _stream_failed(isFromMCP, f"출력 시간 초과: {timeout}초", result="timeout")
+    except Exception as e:
+        return _stream_failed(isFromMCP, f"출력 오류: {e}")
+
+    metrics.inc("print_jobs_total", result="success")
+    return True
+
+
 def main():
+    import argparse  # CLI 전용 (MCP 서버 기동 시 import 생략)
+
     parser = argparse.ArgumentParser(description='빅솔론 프린터 텍스트 출력 (CUPS 사용)')
     parser.add_argument('text', nargs='?', help='출력할 텍스트')
     parser.add_argument('-p', '--printer', default='BIXOLON_SRP_330II', help='프린터 이름 (기본값: BIXOLON_SRP_330II)')
     parser.add_argument('--preview', action='store_true', help='출력 미리보기만 표시')
     parser.add_argument('--list-printers', action='store_true', help='사용 가능한 프린터 목록 표시')
     parser.add_argument('--status', action='store_true', help='프린터 상태 확인')
+    parser.add_argument('--spool', choices=SPOOL_MODES, default=SPOOL_STDIN,
+                        help='lp 작업 전달 방식 (기본값: stdin)')
+    parser.add_argument('--qr', help='본문 아래에 출력할 QR 코드 데이터 (URL 등)')
+    parser.add_argument('--barcode', help='본문 아래에 출력할 바코드 데이터')
+    parser.add_argument('--markup', action='store_true',
+                        help='마크업 해석 (# 제목, ## 세로 2배, **굵게**, >> 오른쪽 정렬, << 왼쪽 정렬)')
+    parser.add_argument('--barcode-type', choices=sorted(BARCODE_TYPES), default='CODE128',
+                        help='바코드 종류 (기본값: CODE128)')
+    parser.add_argument('--stream', action='store_true',
+                        help='긴 문서를 조각 단위로 출력 (텍스트를 생략하거나 -이면 표준입력에서 읽음)')
+    parser.add_argument('--no-optimize', action='store_true',
+                        help='ESC/POS 최적화 없이 만든 바이트 그대로 전송 (기종별 문제 확인용)')
     
     args = parser.parse_args()
+    if args.no_optimize:
+        global OPTIMIZE_ESC_POS
+        OPTIMIZE_ESC_POS = False
     
     # 프린터 목록 표시
     if args.list_printers:
-        printers = printer_list()
+        printers = printer_inventory()
         if printers:
             print("🖨️  사용 가능한 프린터:")
-            for printer in printers:
-                status = printer_status(printer)
-                print(f"  - {printer}")
-                print(f"    {status}")
+            for record in printers:
+                print(f"  - {record['name']}")
+                print(f"    {describe_printer(record)}")
         else:
             print("❌ CUPS에 등록된 프린터가 없습니다.")
             print("💡 다음 명령으로 프린터를 확인하세요: lpstat -p")
@@ -211,25 +1829,35 @@ def main():
         print(status)
         return
     
+    # 긴 문서 스트리밍 출력 (길이 제한 없음)
+    if args.stream:
+        source = sys.stdin if args.text in (None, '-') else args.text
+        success = printer_print_stream(source, args.printer)
     # 텍스트가 없으면 에러
-    if not args.text:
+    elif not args.text:
         print("❌ 출력할 텍스트를 입력하세요.")
         print("💡 사용법: python3 print_text.py \"출력할 텍스트\"")
         return
     
     # 출력 미리보기
-    if args.preview:
-        lines = prepare_print_content(args.text)
+    elif args.preview:
         print("📄 출력 미리보기:")
-        print("=" * 42)
-        for line in lines:
-            print(f"|{line:<40}|")
-        print("=" * 42)
-        print(f"총 {len(lines)}줄")
+        print(printer_preview(args.text, args.printer, args.markup))
         return
     
     # 실제 출력
-    success = printer_print(args.text, args.printer)
+    else:
+        try:
+            symbols = []
+            if args.qr:
+                symbols.append(qr_code_command(args.qr))
+            if args.barcode:
+                symbols.append(barcode_command(args.barcode, args.barcode_type))
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        success = printer_print(args.text, args.printer, spool=args.spool, symbols=symbols,
+                                markup=args.markup)
     
     if not success:
         print("\n🔧 문제 해결 방법:")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+래스터 출력 (GS v 0)
+EUC-KR/CP949로 표현할 수 없는 문자(이모지 등)가 있는 줄을 1비트 이미지로 출력한다.
+printer.PrinterProfile(unencodable="raster")일 때만 import된다.
+"""
+
+from collections import OrderedDict
+import threading
+
+from printer import char_width
+
+CELL_WIDTH = 12   # 반각 한 칸 폭 (도트, 프린터 Font A 12x24와 같음)
+LINE_HEIGHT = 24  # 한 줄 높이 (도트)
+
+# 5x7 ASCII 글꼴 (' '~'~', 글자당 세로 5열, 각 열의 LSB가 맨 위)
+_FONT_5X7 = bytes.fromhex(
+    "0000000000" "00005f0000" "0007000700" "147f147f14" "242a7f2a12" "2313086462" "3649552250" "0005030000"
+    "001c224100" "0041221c00" "082a1c2a08" "08083e0808" "0050300000" "0808080808" "0060600000" "2010080402"
+    "3e5149453e" "00427f4000" "4261514946" "2141454b31" "1814127f10" "2745454539" "3c4a494930" "0171090503"
+    "3649494936" "064949291e" "0036360000" "0056360000" "0814224100" "1414141414" "0041221408" "0201510906"
+    "3249794136" "7e1111117e" "7f49494936" "3e41414122" "7f4141221c" "7f49494941" "7f09090101" "3e41415132"
+    "7f0808087f" "00417f4100" "2040413f01" "7f08142241" "7f40404040" "7f0204027f" "7f0408107f" "3e4141413e"
+    "7f09090906" "3e4151215e" "7f09192946" "4649494931" "01017f0101" "3f4040403f" "1f2040201f" "7f2018207f"
+    "6314081463" "0304780403" "6151494543" "00007f4141" "0204081020" "41417f0000" "0402010204" "4040404040"
+    "0001020400" "2054545478" "7f48444438" "3844444420" "384444487f" "3854545418" "087e090102" "081454543c"
+    "7f08040478" "00447d4000" "2040443d00" "007f102844" "00417f4000" "7c04180478" "7c08040478" "3844444438"
+    "7c14141408" "081414187c" "7c08040408" "4854545420" "043f444020" "3c4040207c" "1c2040201c" "3c4030403c"
+    "4428102844" "0c5050503c" "4464544c44" "0008364100" "00007f0000" "0041360800" "0201020402"
+)
+
+# 3x5 16진수 숫자 (코드 포인트 상자용, 행마다 3비트)
+_HEX_DIGITS_3X5 = {
+    "0": (7, 5, 5, 5, 7), "1": (2, 6, 2, 2, 7), "2": (7, 1, 7, 4, 7), "3": (7, 1, 7, 1, 7),
+    "4": (5, 5, 7, 1, 1), "5": (7, 4, 7, 1, 7), "6": (7, 4, 7, 5, 7), "7": (7, 1, 1, 1, 1),
+    "8": (7, 5, 7, 5, 7), "9": (7, 5, 7, 1, 7), "A": (7, 5, 7, 5, 5), "B": (6, 5, 6, 5, 6),
+    "C": (7, 4, 4, 4, 7), "D": (6, 5, 5, 5, 6), "E": (7, 4, 7, 4, 7), "F": (7, 4, 7, 4, 4),
+}
+
+
+def _scale(rows, width, x_factor, y_factor=None):
+    """행 비트맵(정수, 왼쪽이 MSB)을 가로 x_factor배, 세로 y_factor배(기본: 가로와 같음)로 확대"""
+    y_factor = x_factor if y_factor is None else y_factor
+    if x_factor == 1 and y_factor == 1:
+        return rows, width
+    scaled = []
+    for row in rows:
+        wide = row
+        if x_factor > 1:
+            wide = 0
+            for x in range(width):
+                bit = (row >> (width - 1 - x)) & 1
+                wide = (wide << x_factor) | (((1 << x_factor) - 1) if bit else 0)
+        scaled.extend([wide] * y_factor)
+    return scaled, width * x_factor
+
+
+class BuiltinGlyphSource:
+    """의존성 없는 기본 글리프
+
+    ASCII는 5x7 글꼴을 2배로 키워 12x24 칸에, 그 밖의 문자는 코드 포인트를
+    16진수로 적은 상자(Unifont의 누락 글리프 방식)로 그린다.
+    """
+
+    name = "builtin"
+
+    def glyph(self, char, width_scale=1, height_scale=1):
+        """(폭, 높이, 행 비트맵 목록) 반환 (행은 폭 비트 정수, 왼쪽 픽셀이 MSB)
+
+        width_scale/height_scale은 GS ! 문자 크기처럼 가로/세로 배율을 따로 준다.
+        """
+        columns = char_width(char)
+        if columns == 0:
+            return 0, LINE_HEIGHT * height_scale, []
+        code = ord(char)
+        if 0x20 <= code <= 0x7E:
+            rows, width = self._ascii(code)
+        else:
+            rows, width = self._hex_box(code, columns)
+        rows, width = _scale(rows, width, width_scale, height_scale)
+        return width, LINE_HEIGHT * height_scale, rows
+
+    @staticmethod
+    def _ascii(code):
+        font_columns = _FONT_5X7[(code - 0x20) * 5:(code - 0x20) * 5 + 5]
+        # 6x8 칸(오른쪽/아래 1도트 간격) -> 2배 확대 12x16 -> 위아래 4도트 여백으로 12x24
+        rows = [
+            sum(((font_columns[x] >> y) & 1) << (5 - x) for x in range(5))
+            for y in range(8)
+        ]
+        rows, width = _scale(rows, 6, 2)
+        return [0] * 4 + rows + [0] * 4, width
+
+    @staticmethod
+    def _hex_box(code, columns):
+        width = CELL_WIDTH * columns
+        box = [(1 << (width - 1)) | 1] * LINE_HEIGHT
+        box[0] = box[-1] = (1 << width) - 1
+        digits = f"{code:06X}" if columns > 1 else ""
+        # 3자리씩 두 줄 (숫자 3도트 + 간격 1도트), 상자 가운데
+        for line, text in enumerate((digits[:3], digits[3:])):
+            top = 6 + line * 7
+            left = (width - 11) // 2
+            for x_index, digit in enumerate(text):
+                shift = width - left - 3 - x_index * 4
+                for y, bits in enumerate(_HEX_DIGITS_3X5[digit]):
+                    box[top + y] |= bits << shift
+        return box, width
+
+
+class PillowGlyphSource:
+    """TrueType/OpenType 글꼴 글리프 (Pillow 필요, 선택 기능)"""
+
+    def __init__(self, font_path):
+        try:
+            from PIL import Image, ImageDraw, ImageFont
+        except ImportError as e:
+            raise RuntimeError("글꼴 파일로 래스터 출력을 하려면 Pillow가 필요합니다: pip install Pillow") from e
+        self._image, self._draw, self._font_module = Image, ImageDraw, ImageFont
+        self.font_path = font_path
+        self.name = f"pillow:{font_path}"
+        self._fonts = {}
+
+    def glyph(self, char, width_scale=1, height_scale=1):
+        columns = char_width(char)
+        width, height = CELL_WIDTH * columns * width_scale, LINE_HEIGHT * height_scale
+        if width == 0:
+            return 0, height, []
+        # 글꼴은 세로 배율 크기로 그린 뒤 가로 배율이 다르면 이미지를 늘이거나 줄임
+        font = self._fonts.get(height_scale)
+        if font is None:
+            font = self._fonts[height_scale] = self._font_module.truetype(self.font_path, height - 2 * height_scale)
+        image = self._image.new("1", (CELL_WIDTH * columns * height_scale, height), 0)
+        self._draw.Draw(image).text((image.width // 2, height // 2), char, font=font, fill=1, anchor="mm")
+        if image.width != width:
+            image = image.resize((width, height))
+        stride = (width + 7) // 8
+        data = image.tobytes()  # 모드 "1": 행마다 바이트 경계로 채운 1비트, 왼쪽이 MSB
+        padding = stride * 8 - width
+        rows = [int.from_bytes(data[y * stride:(y + 1) * stride], "big") >> padding for y in range(height)]
+        return width, height, rows
+
+
+class GlyphCache:
+    """(문자, 가로 배율, 세로 배율) -> 띠(band) 좌표계에 미리 배치해 둔 1비트 비트맵 캐시
+
+    글리프를 띠 한 장(폭 band_width, 높이 LINE_HEIGHT*세로 배율) 크기의 정수 하나로
+    저장해 두므로, 줄을 조립할 때는 글리프마다 시프트와 OR 한 번이면 된다.
+    """
+
+    def __init__(self, source, band_width, max_entries=4096):
+        self.source = source
+        self.band_width = band_width
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, char, width_scale=1, height_scale=1):
+        """(글리프 폭, 띠 왼쪽 끝에 놓인 글리프 비트맵 정수)"""
+        key = (char, width_scale, height_scale)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        width, height, rows = self.source.glyph(char, width_scale, height_scale)
+        packed = 0
+        for row in rows:
+            packed = (packed << self.band_width) | (row << (self.band_width - width))
+        entry = (width, packed)
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+def raster_command(width_bytes, height, data):
+    """GS v 0 m xL xH yL yH d1...dk (보통 크기 래스터 이미지)"""
+    return b'\x1D\x76\x30\x00' + bytes((width_bytes & 0xFF, width_bytes >> 8, height & 0xFF, height >> 8)) + data
+
+
+class RasterRenderer:
+    """텍스트 줄을 GS v 0 래스터 띠로 변환 (완성된 띠도 캐시해 작업 간 재사용)
+
+    띠 폭은 용지 칸 수 x CELL_WIDTH로 고정하고 줄을 align(ESC a 값과 같음, 0: 왼쪽,
+    1: 가운데, 2: 오른쪽)에 맞춰 배치한다. 가로/세로 배율은 GS ! 문자 크기와 같은 뜻이다.
+    넘치는 글자는 잘라낸다 (줄바꿈은 호출하는 쪽에서 폭에 맞게 해 둠).
+    """
+
+    def __init__(self, columns, source=None, max_bands=256):
+        self.columns = columns
+        self.band_width = (columns * CELL_WIDTH + 7) // 8 * 8
+        self.source = source or BuiltinGlyphSource()
+        self.glyphs = GlyphCache(self.source, self.band_width)
+        self.max_bands = max_bands
+        self._bands = OrderedDict()
+        self._lock = threading.Lock()
+        self.band_hits = 0
+
+    def bitmap(self, line, width_scale=1, height_scale=1, align=1):
+        """줄의 (행당 바이트 수, 높이, 1비트 이미지 바이트)"""
+        glyphs = [self.glyphs.get(char, width_scale, height_scale) for char in line]
+        line_width = min(sum(width for width, _ in glyphs), self.band_width)
+        x = (self.band_width - line_width) * align // 2
+        band = 0
+        for width, packed in glyphs:
+            if x + width > self.band_width:
+                break
+            if packed:
+                band |= packed >> x
+            x += width
+        height = LINE_HEIGHT * height_scale
+        width_bytes = self.band_width // 8
+        return width_bytes, height, band.to_bytes(width_bytes * height, "big")
+
+    def band(self, line, width_scale=1, height_scale=1, align=1):
+        """줄 하나를 출력하는 GS v 0 명령"""
+        key = (line, width_scale, height_scale, align)
+        with self._lock:
+            command = self._bands.get(key)
+            if command is not None:
+                self._bands.move_to_end(key)
+                self.band_hits += 1
+                return command
+        command = raster_command(*self.bitmap(line, width_scale, height_scale, align))
+        with self._lock:
+            self._bands[key] = command
+            while len(self._bands) > self.max_bands:
+                self._bands.popitem(last=False)
+        return command
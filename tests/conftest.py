@@ -0,0 +1,124 @@
+"""
+테스트 공용 fixture: PATH에 올리는 가짜 CUPS 명령어(lp, lpstat)
+"""
+
+import os
+import textwrap
+
+import pytest
+
+
+FAKE_LP = textwrap.dedent("""\
+    #!/bin/sh
+    # 가짜 lp: 받은 작업 바이트를 spool.bin에 이어 붙이고 작업 ID 출력
+    [ -n "$FAKE_LP_DELAY" ] && sleep "$FAKE_LP_DELAY"
+    for last; do :; done
+    if [ -f "$last" ]; then cat "$last"; else cat; fi >> "$FAKE_CUPS_DIR/spool.bin"
+    echo "lp $*" >> "$FAKE_CUPS_DIR/calls.log"
+    echo "request id is FAKE-1 (1 file(s))"
+""")
+
+FAKE_LPSTAT = textwrap.dedent("""\
+    #!/bin/sh
+    # 가짜 lpstat: printers.txt 내용을 출력 (-p 이름 지정 시 해당 프린터만)
+    [ -n "$FAKE_LPSTAT_DELAY" ] && sleep "$FAKE_LPSTAT_DELAY"
+    echo "lpstat $*" >> "$FAKE_CUPS_DIR/calls.log"
+    if [ "$1" = "-p" ] && [ -n "$2" ]; then
+        grep "^printer $2 " "$FAKE_CUPS_DIR/printers.txt" || exit 1
+    else
+        cat "$FAKE_CUPS_DIR/printers.txt"
+    fi
+""")
+
+
+# lpstat -l -p -a 형식 샘플 (-p 만 요청해도 printer 줄만 파싱되므로 그대로 사용)
+LPSTAT_SAMPLE = textwrap.dedent("""\
+    printer BIXOLON_SRP_330II is idle.  enabled since Mon 01 Jan 2024 10:00:00 AM KST
+    \tForm mounted:
+    \tContent types: any
+    \tPrinter types: unknown
+    \tDescription: BIXOLON SRP-330II
+    \tAlerts: none
+    \tLocation:
+    \tConnection: direct
+    \tInterface: /etc/cups/ppd/BIXOLON_SRP_330II.ppd
+    \tOn fault: no alert
+    \tAfter fault: continue
+    \tUsers allowed:
+    \t\t(all)
+    \tForms allowed:
+    \t\t(none)
+    \tBanner required
+    \tCharset sets:
+    \t\t(none)
+    \tDefault pitch:
+    \tDefault page size:
+    \tDefault port settings:
+    printer HP_LaserJet disabled since Mon 01 Jan 2024 09:00:00 AM KST -
+    \tPaused
+    \tForm mounted:
+    \tContent types: any
+    \tPrinter types: unknown
+    \tDescription: HP LaserJet
+    \tAlerts: paused
+    \tLocation:
+    \tConnection: direct
+    \tInterface: /etc/cups/ppd/HP_LaserJet.ppd
+    \tOn fault: no alert
+    \tAfter fault: continue
+    \tUsers allowed:
+    \t\t(all)
+    \tForms allowed:
+    \t\t(none)
+    \tBanner required
+    \tCharset sets:
+    \t\t(none)
+    \tDefault pitch:
+    \tDefault page size:
+    \tDefault port settings:
+    BIXOLON_SRP_330II accepting requests since Mon 01 Jan 2024 10:00:00 AM KST
+    HP_LaserJet not accepting requests since Mon 01 Jan 2024 09:00:00 AM KST -
+    \tRejecting Jobs
+""")
+
+
+class FakeCups:
+    """가짜 CUPS 환경 상태 조회/설정 도우미"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def set_printers(self, lpstat_output):
+        with open(self._path("printers.txt"), "w") as f:
+            f.write(lpstat_output)
+
+    @property
+    def spooled(self):
+        if not os.path.exists(self._path("spool.bin")):
+            return b""
+        with open(self._path("spool.bin"), "rb") as f:
+            return f.read()
+
+    @property
+    def calls(self):
+        if not os.path.exists(self._path("calls.log")):
+            return []
+        with open(self._path("calls.log")) as f:
+            return f.read().splitlines()
+
+
+@pytest.fixture
+def fake_cups(tmp_path, monkeypatch):
+    """lp/lpstat을 가짜 스크립트로 대체한 PATH 환경"""
+    for name, script in (("lp", FAKE_LP), ("lpstat", FAKE_LPSTAT)):
+        path = tmp_path / name
+        path.write_text(script)
+        path.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_CUPS_DIR", str(tmp_path))
+    cups = FakeCups(str(tmp_path))
+    cups.set_printers(LPSTAT_SAMPLE)
+    return cups
@@ -0,0 +1,733 @@
+"""
+MCP 서버(mcp_wrapper.MCPServer) 테스트 - 가짜 lp/lpstat 사용
+"""
+
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from unittest.mock import patch
+
+# 테스트를 위해 상위 디렉터리의 모듈들을 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import printer
+from mcp_wrapper import (
+    MCPServer, StatusCache, ResponseTemplate, RequestProfiler, PrintCoalescer, PrinterScheduler,
+    serialize_response
+)
+
+
+def call_tool(server, name, arguments, request_id=1):
+    """tools/call 요청 딕셔너리 생성"""
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": name, "arguments": arguments},
+    }
+
+
+class TestToolHandlers:
+    """도구 처리 테스트"""
+
+    def test_print_memo(self, fake_cups):
+        """print_memo가 lp로 작업을 제출하는지 테스트"""
+        server = MCPServer()
+        response = asyncio.run(server.handle_request(call_tool(server, "print_memo", {"text": "우유 사오기"})))
+        assert response["result"]["content"][0]["text"] == "✅ 출력 완료: 6자"
+        assert fake_cups.spooled == printer.optimize_esc_pos(
+            printer.create_esc_pos_content(printer.prepare_print_content("우유 사오기")))
+
+    def test_preview_then_print_uses_render_cache(self, fake_cups):
+        """미리보기 후 같은 텍스트를 출력하면 렌더링 캐시 적중"""
+        printer.render_cache.clear()
+        server = MCPServer()
+        hits_before = printer.render_cache.hits
+
+        async def scenario():
+            await server.handle_request(call_tool(server, "print_memo", {"text": "미리보기 후 출력", "preview": True}))
+            await server.handle_request(call_tool(server, "print_memo", {"text": "미리보기 후 출력"}))
+
+        asyncio.run(scenario())
+        assert printer.render_cache.hits == hits_before + 1
+        assert fake_cups.spooled == printer.optimize_esc_pos(
+            printer.create_esc_pos_content(printer.prepare_print_content("미리보기 후 출력")))
+
+    def test_print_memo_preview(self, fake_cups):
+        """미리보기는 lp를 호출하지 않음"""
+        server = MCPServer()
+        response = asyncio.run(server.handle_request(
+            call_tool(server, "print_memo", {"text": "미리보기", "preview": True})
+        ))
+        assert "출력 미리보기" in response["result"]["content"][0]["text"]
+        assert fake_cups.calls == []
+
+    def test_print_memo_with_qr_and_barcode(self, fake_cups):
+        """print_memo의 QR/바코드는 네이티브 심볼 명령으로 전달"""
+        server = MCPServer(coalesce_window=0.05)
+        response = asyncio.run(server.handle_request(call_tool(server, "print_memo", {
+            "text": "주문 123", "qr": "https://example.com/o/123", "barcode": "123", "barcode_type": "CODE39",
+        })))
+        assert response["result"]["content"][0]["text"] == "✅ 출력 완료: 6자"
+        assert b"1P0https://example.com/o/123" in fake_cups.spooled
+        assert b"\x1dkE\x03123" in fake_cups.spooled
+        assert len(fake_cups.spooled) < 300
+
+    def test_print_memo_symbol_preview_and_error(self, fake_cups):
+        """미리보기에 심볼 표시, 잘못된 바코드는 오류"""
+        server = MCPServer()
+        preview = asyncio.run(server.handle_request(call_tool(
+            server, "print_memo", {"text": "메모", "qr": "https://a.b", "preview": True}
+        )))
+        assert "QR 코드: https://a.b" in preview["result"]["content"][0]["text"]
+        error = asyncio.run(server.handle_request(call_tool(
+            server, "print_memo", {"text": "메모", "barcode": "abc", "barcode_type": "EAN13"}
+        )))
+        assert error["result"]["isError"] is True
+        assert fake_cups.calls == []
+
+    def test_print_memo_qr_length_limit(self, fake_cups):
+        """qr 스키마의 maxLength와 실제 한도(오류 정정 M, 바이트 모드)가 같음"""
+        server = MCPServer()
+        tools = asyncio.run(server.handle_request({"id": 1, "method": "tools/list"}))["result"]["tools"]
+        schema = next(tool for tool in tools if tool["name"] == "print_memo")["inputSchema"]
+        limit = schema["properties"]["qr"]["maxLength"]
+        assert limit == 2331
+        error = asyncio.run(server.handle_request(call_tool(
+            server, "print_memo", {"text": "메모", "qr": "x" * (limit + 1)}
+        )))
+        assert error["result"]["isError"] is True
+        assert fake_cups.calls == []
+
+    def test_print_memo_markup(self, fake_cups):
+        """markup=true면 컴파일된 마크업을 출력하고 미리보기도 마크업 기준"""
+        server = MCPServer(coalesce_window=0.05)
+        text = "# 장보기\n**우유** 2개"
+        preview = asyncio.run(server.handle_request(call_tool(
+            server, "print_memo", {"text": text, "markup": True, "preview": True}
+        )))
+        assert "|장보기" in preview["result"]["content"][0]["text"]
+        asyncio.run(server.handle_request(call_tool(server, "print_memo", {"text": text, "markup": True})))
+        assert fake_cups.spooled == printer.optimize_esc_pos(printer.render_cache.content(text, markup=True))
+        assert b"\x1d!\x11" in fake_cups.spooled and b"\x1bE\x01" in fake_cups.spooled
+
+    def test_print_document_beyond_memo_limit(self, fake_cups):
+        """print_document는 500자 제한 없이 스트리밍으로 출력"""
+        server = MCPServer()
+        text = "회의록: 결정 사항과 후속 조치 항목\n" * 100
+        response = asyncio.run(server.handle_request(call_tool(server, "print_document", {"text": text})))
+        assert response["result"]["content"][0]["text"].startswith(f"✅ 출력 완료: {len(text)}자, 100줄")
+        assert fake_cups.spooled == printer.create_esc_pos_content(printer.prepare_print_content(text))
+        empty = asyncio.run(server.handle_request(call_tool(server, "print_document", {"text": " "})))
+        assert empty["result"]["isError"] is True
+
+    def test_print_memos_single_job(self, fake_cups):
+        """print_memos가 유효한 메모만 lp 한 번으로 출력하고 항목별 결과를 보고하는지 테스트"""
+        server = MCPServer()
+        response = asyncio.run(server.handle_request(call_tool(
+            server, "print_memos", {"memos": ["우유 사오기", "  ", "운동"], "cut_each": False}
+        )))
+        text = response["result"]["content"][0]["text"]
+        assert "isError" not in response["result"]
+        assert "2/3개 (작업 1개)" in text
+        assert "1. ✅ 우유 사오기" in text
+        assert "2. ❌" in text and "비어있습니다" in text
+        assert fake_cups.calls == ["lp -d BIXOLON_SRP_330II -o raw"]
+
+    def test_print_memos_rejects_empty_list(self, fake_cups):
+        """빈 목록은 오류"""
+        server = MCPServer()
+        response = asyncio.run(server.handle_request(call_tool(server, "print_memos", {"memos": []})))
+        assert response["result"]["isError"] is True
+        assert fake_cups.calls == []
+
+    def test_list_printers_single_lpstat_call(self, fake_cups):
+        """프린터 목록 도구가 lpstat 한 번으로 모든 상태를 보여주는지 테스트"""
+        server = MCPServer()
+        response = asyncio.run(server.handle_request(call_tool(server, "list_printers", {})))
+        text = response["result"]["content"][0]["text"]
+        assert "✅ BIXOLON_SRP_330II" in text
+        assert "❌ HP_LaserJet" in text
+        assert "Paused" in text
+        assert "총 2개 프린터" in text
+        assert fake_cups.calls == ["lpstat -l -p -a"]
+
+    def test_get_printer_status(self, fake_cups):
+        """프린터 상태 도구 테스트"""
+        server = MCPServer()
+        response = asyncio.run(server.handle_request(
+            call_tool(server, "get_printer_status", {"printer_name": "BIXOLON_SRP_330II"})
+        ))
+        text = response["result"]["content"][0]["text"]
+        assert "✅" in text and "BIXOLON_SRP_330II" in text
+
+    def test_get_metrics(self, fake_cups, tmp_path):
+        """출력 후 get_metrics가 단계별 시간과 카운터를 보여주고 Prometheus 파일을 쓰는지 테스트"""
+        printer.metrics.reset()
+        printer.render_cache.clear()
+        server = MCPServer()
+        path = tmp_path / "printer.prom"
+
+        async def scenario():
+            await server.handle_request(call_tool(server, "print_memo", {"text": "측정"}))
+            await server.handle_request(call_tool(server, "print_memo", {"text": ""}))
+            return await server.handle_request(call_tool(server, "get_metrics", {"path": str(path)}))
+
+        response = asyncio.run(scenario())
+        text = response["result"]["content"][0]["text"]
+        snapshot = json.loads(text[text.index("{"):])
+        for stage in ("wrap", "encode", "lp", "printer_queue"):
+            assert snapshot["histograms"][f"stage_seconds{{stage={stage}}}"]["count"] == 1
+        assert snapshot["printer_queues"]["depths"] == {"BIXOLON_SRP_330II": 0}
+        assert snapshot["counters"]["tool_calls_total{result=success,tool=print_memo}"] == 1
+        assert snapshot["counters"]["tool_calls_total{result=failure,tool=print_memo}"] == 1
+        assert snapshot["counters"]["print_jobs_total{result=success}"] == 1
+        assert snapshot["render_cache"]["entries"] == 1
+        assert 'todo_printer_stage_seconds_count{stage="lp"} 1' in path.read_text()
+
+    def test_concurrency_not_capped_by_thread_pool(self, fake_cups, monkeypatch):
+        """느린 lpstat 호출이 스레드 풀 크기(2)에 묶이지 않고 동시에 실행되는지 테스트"""
+        monkeypatch.setenv("FAKE_LPSTAT_DELAY", "0.3")
+        server = MCPServer()
+
+        async def check_many():
+            requests = [
+                call_tool(server, "get_printer_status", {"printer_name": "BIXOLON_SRP_330II"}, i)
+                for i in range(6)
+            ]
+            return await asyncio.gather(*(server.handle_request(r) for r in requests))
+
+        started = time.monotonic()
+        responses = asyncio.run(check_many())
+        assert [r["id"] for r in responses] == list(range(6))
+        assert time.monotonic() - started < 0.9
+
+
+class TestResponseTemplates:
+    """미리 직렬화된 고정 응답 템플릿 테스트"""
+
+    @pytest.mark.parametrize("request_id", [1, "abc", "\x00id\x00", None, 3.5, "한글 id"])
+    def test_static_responses_match_json_dumps(self, request_id):
+        """initialize/tools/list 응답이 일반 직렬화 결과와 같은지 테스트"""
+        server = MCPServer()
+        for method in ("initialize", "tools/list"):
+            response = asyncio.run(server.handle_request({"id": request_id, "method": method}))
+            expected_id = 1 if request_id is None else request_id
+            assert response["id"] == expected_id
+            assert json.loads(serialize_response(response)) == json.loads(json.dumps(dict(response)))
+            assert serialize_response(response) == json.dumps(dict(response), ensure_ascii=False)
+
+    def test_tools_list_is_serialized_once(self):
+        """tools/list는 매 요청마다 도구 목록을 다시 직렬화하지 않음"""
+        server = MCPServer()
+        with patch("mcp_wrapper.json.dumps", wraps=json.dumps) as mock_dumps:
+            response = asyncio.run(server.handle_request({"id": 5, "method": "tools/list"}))
+            serialize_response(response)
+        # id 하나만 직렬화
+        assert [c.args[0] for c in mock_dumps.call_args_list] == [5]
+
+    def test_error_template_with_message(self):
+        """오류 템플릿은 id와 메시지만 끼워 넣음"""
+        template = ResponseTemplate.error(-32601)
+        response = template.render("q", 'Method not found: "x\x00message\x00"')
+        assert json.loads(response.json) == {
+            "jsonrpc": "2.0", "id": "q",
+            "error": {"code": -32601, "message": 'Method not found: "x\x00message\x00"'},
+        }
+        assert response["error"]["message"].startswith("Method not found")
+
+    def test_batch_serialization(self):
+        """배치 응답은 템플릿 응답과 일반 응답을 섞어 배열로 직렬화"""
+        server = MCPServer()
+        responses = asyncio.run(server.handle_message([
+            {"id": 1, "method": "initialize"},
+            {"id": 2, "method": "tools/call", "params": {"name": "unknown", "arguments": {}}},
+        ]))
+        assert json.loads(serialize_response(responses)) == json.loads(json.dumps(responses))
+
+
+class TestStatusCache:
+    """프린터 상태 TTL 캐시 테스트"""
+
+    def test_status_cache_hit(self, fake_cups):
+        """TTL 이내 반복 조회는 lpstat을 다시 실행하지 않음"""
+        server = MCPServer()
+        request = call_tool(server, "get_printer_status", {"printer_name": "BIXOLON_SRP_330II"})
+
+        async def check_twice():
+            await server.handle_request(request)
+            await server.handle_request(request)
+
+        asyncio.run(check_twice())
+        assert fake_cups.calls == ["lpstat -p BIXOLON_SRP_330II"]
+        assert server.status_cache.stats() == {"hits": 1, "stale_hits": 0, "misses": 1, "entries": 1}
+
+    def test_stale_while_revalidate(self):
+        """만료된 값은 즉시 반환하고 백그라운드에서 갱신"""
+        cache = StatusCache(ttl=0, stale_ttl=60)
+        results = iter(["old", "new"])
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return next(results)
+
+        async def scenario():
+            assert await cache.get("p", fetch) == "old"
+            started = time.monotonic()
+            assert await cache.get("p", fetch) == "old"  # 만료됐지만 즉시 반환
+            assert time.monotonic() - started < 0.03
+            await asyncio.sleep(0.1)
+            assert cache._entries["p"]["value"] == "new"
+
+        asyncio.run(scenario())
+        assert cache.stale_hits == 1 and cache.misses == 1
+
+    def test_concurrent_misses_share_one_fetch(self):
+        """동시에 들어온 조회는 한 번의 fetch로 합쳐짐"""
+        cache = StatusCache()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "idle"
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get("p", fetch) for _ in range(5)))
+
+        assert asyncio.run(scenario()) == ["idle"] * 5
+        assert len(calls) == 1
+
+    def test_print_invalidates_status(self, fake_cups):
+        """출력 후에는 다음 상태 조회가 lpstat을 다시 실행"""
+        server = MCPServer()
+        status = call_tool(server, "get_printer_status", {"printer_name": "BIXOLON_SRP_330II"})
+
+        async def scenario():
+            await server.handle_request(status)
+            await server.handle_request(call_tool(server, "print_memo", {"text": "메모"}))
+            await server.handle_request(status)
+
+        asyncio.run(scenario())
+        assert [c for c in fake_cups.calls if c.startswith("lpstat")] == ["lpstat -p BIXOLON_SRP_330II"] * 2
+
+    def test_background_poller_refreshes_hot_printers(self, fake_cups):
+        """폴러가 최근 조회된 프린터 상태를 주기적으로 갱신"""
+        server = MCPServer(status_ttl=0.05, status_poll_interval=0.05)
+
+        async def scenario():
+            poller = asyncio.ensure_future(server._poll_status())
+            await server.handle_request(call_tool(server, "list_printers", {}))
+            await asyncio.sleep(0.3)
+            poller.cancel()
+
+        asyncio.run(scenario())
+        assert len(fake_cups.calls) >= 3
+
+
+class TestPrintCoalescer:
+    """print_memo 요청 병합 대기열 테스트"""
+
+    def test_burst_merged_per_printer(self, fake_cups):
+        """같은 프린터로 몰린 요청은 lp 한 번, 다른 프린터는 별도 작업"""
+        server = MCPServer(coalesce_window=0.05)
+        texts = ["우유", "계란", "빵"]
+
+        async def burst():
+            requests = [call_tool(server, "print_memo", {"text": t}, i) for i, t in enumerate(texts)]
+            requests.append(call_tool(server, "print_memo", {"text": "다른 프린터", "printer_name": "HP_LaserJet"}, 9))
+            return await asyncio.gather(*(server.handle_request(r) for r in requests))
+
+        responses = asyncio.run(burst())
+        assert [r["result"]["content"][0]["text"] for r in responses[:3]] == ["✅ 출력 완료: 2자", "✅ 출력 완료: 2자", "✅ 출력 완료: 1자"]
+        assert sorted(fake_cups.calls) == ["lp -d BIXOLON_SRP_330II -o raw", "lp -d HP_LaserJet -o raw"]
+        assert fake_cups.spooled.count(b"\x1b@") == 2
+        assert server.print_queue.stats() == {"jobs": 4, "batches": 2, "pending": 0}
+
+    def test_max_jobs_flushes_before_window(self):
+        """max_jobs개가 모이면 대기 시간을 기다리지 않고 바로 출력"""
+        submitted = []
+
+        async def submit(texts, printer_name):
+            submitted.append(list(texts))
+            return [{"success": text != "실패", "lines": 1, "error": None} for text in texts]
+
+        queue = PrintCoalescer(window=30.0, max_jobs=2, submit=submit)
+
+        async def scenario():
+            return await asyncio.gather(queue.submit("성공", "P"), queue.submit("실패", "P"))
+
+        started = time.monotonic()
+        results = asyncio.run(scenario())
+        assert time.monotonic() - started < 1.0
+        assert submitted == [["성공", "실패"]]
+        assert [r["success"] for r in results] == [True, False]
+
+    def test_submit_error_reported_to_each_caller(self):
+        """작업 제출 중 예외는 모든 호출자에게 실패로 전달"""
+        async def submit(texts, printer_name):
+            raise RuntimeError("연결 끊김")
+
+        queue = PrintCoalescer(window=0.01, submit=submit)
+
+        async def scenario():
+            return await asyncio.gather(queue.submit("가", "P"), queue.submit("나", "P"))
+
+        results = asyncio.run(scenario())
+        assert all(not r["success"] and "연결 끊김" in r["error"] for r in results)
+
+
+class TestPrinterScheduler:
+    """프린터별 FIFO 작업자 테스트"""
+
+    def test_same_printer_strictly_ordered(self):
+        """같은 프린터 작업은 들어온 순서대로, 겹치지 않고 실행"""
+        scheduler = PrinterScheduler()
+        events = []
+
+        def job(i):
+            async def run():
+                events.append(("start", i))
+                await asyncio.sleep(0.01 * (5 - i))  # 먼저 들어온 작업이 더 오래 걸림
+                events.append(("end", i))
+                return i
+            return run
+
+        async def scenario():
+            return await asyncio.gather(*(scheduler.submit("A", job(i)) for i in range(5)))
+
+        assert asyncio.run(scenario()) == list(range(5))
+        assert events == [(kind, i) for i in range(5) for kind in ("start", "end")]
+
+    def test_printers_run_in_parallel(self):
+        """다른 프린터 작업은 서로 기다리지 않음"""
+        scheduler = PrinterScheduler()
+
+        async def scenario():
+            started = time.monotonic()
+            await asyncio.gather(*(scheduler.submit(name, lambda: asyncio.sleep(0.2)) for name in "ABCD"))
+            return time.monotonic() - started
+
+        assert asyncio.run(scenario()) < 0.35
+        assert scheduler.started == 4
+
+    def test_depths_and_idle_reaping(self):
+        """대기열 깊이 보고, 작업자는 처음 쓸 때 생성되고 일이 없으면 종료"""
+        scheduler = PrinterScheduler(idle_timeout=0.05)
+        assert scheduler.stats()["workers"] == 0
+
+        async def scenario():
+            gate = asyncio.Event()
+            tasks = [asyncio.ensure_future(scheduler.submit("A", gate.wait)) for _ in range(3)]
+            tasks.append(asyncio.ensure_future(scheduler.submit("B", gate.wait)))
+            await asyncio.sleep(0.01)
+            depths = scheduler.depths()
+            gate.set()
+            await asyncio.gather(*tasks)
+            await asyncio.sleep(0.15)
+            return depths
+
+        assert asyncio.run(scenario()) == {"A": 3, "B": 1}
+        stats = scheduler.stats()
+        assert stats["workers"] == 0 and stats["started"] == 2 and stats["reaped"] == 2
+        assert stats["jobs"] == 4 and stats["depths"] == {}
+
+    def test_errors_and_cancelled_callers(self):
+        """작업 예외는 호출자에게 전달, 호출자가 취소되어도 대기열의 작업은 실행"""
+        scheduler = PrinterScheduler()
+        ran = []
+
+        async def fail():
+            raise RuntimeError("lp 없음")
+
+        async def record():
+            ran.append(1)
+
+        async def scenario():
+            with pytest.raises(RuntimeError):
+                await scheduler.submit("A", fail)
+            caller = asyncio.ensure_future(scheduler.submit("A", record))
+            await asyncio.sleep(0)
+            caller.cancel()
+            await scheduler.drain()
+
+        asyncio.run(scenario())
+        assert ran == [1]
+
+    def test_survives_event_loop_change(self):
+        """이벤트 루프가 바뀌면 작업자를 새로 만듦"""
+        scheduler = PrinterScheduler()
+
+        async def one():
+            return await scheduler.submit("A", lambda: asyncio.sleep(0, result="ok"))
+
+        assert asyncio.run(one()) == "ok"
+        assert asyncio.run(one()) == "ok"
+        assert scheduler.started == 2
+
+    def test_server_orders_jobs_per_printer(self, fake_cups):
+        """서버의 모든 출력 도구가 같은 프린터 대기열을 거쳐 요청 순서대로 스풀"""
+        server = MCPServer()
+
+        async def scenario():
+            await asyncio.gather(
+                server.handle_request(call_tool(server, "print_document", {"text": "문서 " * 3000})),
+                server.handle_request(call_tool(server, "print_memos", {"memos": ["둘째"]})),
+                server.handle_request(call_tool(server, "print_memo", {"text": "셋째", "markup": True})),
+            )
+            return server.scheduler.stats()
+
+        stats = asyncio.run(scenario())
+        spooled = fake_cups.spooled
+        positions = [spooled.find(word.encode("cp949")) for word in ("문서", "둘째", "셋째")]
+        assert positions == sorted(positions) and -1 not in positions
+        assert stats["jobs"] == 3 and stats["started"] == 1
+
+    def test_coalesced_memos_keep_order_with_direct_jobs(self, fake_cups):
+        """모으는 중인 메모는 같은 프린터의 모으지 않는 작업보다 먼저 출력 (다른 프린터는 계속 모음)"""
+        server = MCPServer(coalesce_window=0.2)
+
+        async def scenario():
+            await asyncio.gather(
+                server.handle_request(call_tool(server, "print_memo", {"text": "FIRST plain"})),
+                server.handle_request(call_tool(server, "print_memo", {"text": "OTHER plain", "printer_name": "HP_LaserJet"})),
+                server.handle_request(call_tool(server, "print_memo", {"text": "**SECOND** markup", "markup": True})),
+                server.handle_request(call_tool(server, "print_memo", {"text": "FOURTH plain"})),
+                server.handle_request(call_tool(server, "print_memos", {"memos": ["FIFTH bulk"]})),
+                server.handle_request(call_tool(server, "print_document", {"text": "SIXTH document"})),
+            )
+
+        asyncio.run(scenario())
+        spooled = fake_cups.spooled
+        positions = [spooled.find(word) for word in (b"FIRST", b"SECOND", b"FOURTH", b"FIFTH", b"SIXTH")]
+        assert positions == sorted(positions) and -1 not in positions
+        assert server.print_queue.stats() == {"jobs": 3, "batches": 3, "pending": 0}
+
+
+class TestRequestProfiler:
+    """선택적 도구 호출 프로파일링 테스트"""
+
+    def test_disabled_by_default(self):
+        """기본값은 프로파일러 없음"""
+        assert MCPServer().profiler is None
+
+    def test_every_nth_call_dumps_profile(self, tmp_path):
+        """every_n번째 호출만 .prof 파일과 상위 함수 로그를 남기는지 테스트"""
+        logs = []
+        server = MCPServer(profiler=RequestProfiler(every_n=2, directory=str(tmp_path), log=logs.append))
+
+        async def scenario():
+            for i in range(4):
+                await server.handle_request(call_tool(server, "print_memo", {"text": f"메모 {i}", "preview": True}, i))
+
+        asyncio.run(scenario())
+        dumps = sorted(p.name for p in tmp_path.iterdir())
+        assert len(dumps) == 2
+        assert dumps[0].startswith("request-00002-print_memo-") and dumps[0].endswith(".prof")
+        assert len(logs) == 2 and "cumulative" in logs[0]
+
+        import pstats
+        assert pstats.Stats(str(tmp_path / dumps[0])).total_calls > 0
+
+    def test_threshold_skips_fast_calls(self, tmp_path):
+        """임계값보다 빠른 호출은 저장하지 않음"""
+        profiler = RequestProfiler(threshold_ms=60_000, directory=str(tmp_path), log=lambda m: None)
+        server = MCPServer(profiler=profiler)
+        asyncio.run(server.handle_request(call_tool(server, "print_memo", {"text": "빠름", "preview": True})))
+        assert profiler.calls == 1 and profiler.dumps == 0
+        assert list(tmp_path.iterdir()) == []
+
+    def test_initialize_option_and_env_spec(self, tmp_path):
+        """initialize 옵션으로 켜고 끄기, 환경변수 문자열 해석"""
+        server = MCPServer()
+        asyncio.run(server.handle_request({
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {"initializationOptions": {"profiling": {"every_n": 5, "dir": str(tmp_path)}}},
+        }))
+        assert server.profiler.every_n == 5 and server.profiler.directory == str(tmp_path)
+
+        server.configure_profiling({"enabled": False})
+        assert server.profiler is None
+
+        options = RequestProfiler.parse_spec("every=10, threshold_ms=200,dir=/tmp/prof")
+        profiler = RequestProfiler.from_options(options)
+        assert (profiler.every_n, profiler.threshold_ms, profiler.directory) == (10, 200.0, "/tmp/prof")
+
+    @pytest.mark.parametrize("profiling, enabled", [
+        (True, True), (False, False), ({"every_n": "abc"}, False), ({"every_n": 0}, False),
+        ("yes", False), (RequestProfiler.parse_spec("every=x"), False),
+    ])
+    def test_bad_or_boolean_options_keep_handshake(self, profiling, enabled):
+        """true/false를 받고, 잘못된 설정은 로그만 남기고 끈 채로 initialize 성공"""
+        server = MCPServer()
+        response = asyncio.run(server.handle_request({
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {"initializationOptions": {"profiling": profiling}},
+        }))
+        assert "error" not in response and "serverInfo" in response["result"]
+        assert (server.profiler is not None) == enabled
+
+
+class TestBatchRequests:
+    """JSON-RPC 배치 요청 테스트"""
+
+    def test_batch_responses_in_request_order(self, fake_cups):
+        """배치 응답은 요청 순서대로 한 배열로 반환"""
+        server = MCPServer()
+        batch = [
+            {"jsonrpc": "2.0", "id": "a", "method": "tools/list"},
+            call_tool(server, "get_printer_status", {"printer_name": "BIXOLON_SRP_330II"}, "b"),
+            {"jsonrpc": "2.0", "id": "c", "method": "unknown/method"},
+        ]
+        responses = asyncio.run(server.handle_message(batch))
+        assert [r["id"] for r in responses] == ["a", "b", "c"]
+        assert "tools" in responses[0]["result"]
+        assert responses[2]["error"]["code"] == -32601
+
+    def test_batch_members_run_concurrently(self, fake_cups, monkeypatch):
+        """배치 항목이 동시에 처리되는지 테스트 (같은 프린터 작업은 순서대로이므로 프린터를 나눔)"""
+        monkeypatch.setenv("FAKE_LP_DELAY", "0.3")
+        server = MCPServer()
+        batch = [call_tool(server, "print_memo", {"text": f"메모 {i}", "printer_name": f"PRINTER_{i}"}, i)
+                 for i in range(5)]
+
+        started = time.monotonic()
+        responses = asyncio.run(server.handle_message(batch))
+        assert all("출력 완료" in r["result"]["content"][0]["text"] for r in responses)
+        assert time.monotonic() - started < 1.0
+
+    def test_batch_concurrency_is_bounded(self):
+        """세마포어로 동시 실행 수가 제한되는지 테스트"""
+        server = MCPServer(batch_concurrency=2)
+        running = []
+        peak = []
+
+        async def slow_request(request):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.pop()
+            return {"jsonrpc": "2.0", "id": request["id"], "result": {}}
+
+        server.handle_request = slow_request
+        responses = asyncio.run(server.handle_message([{"id": i, "method": "x"} for i in range(6)]))
+        assert len(responses) == 6
+        assert max(peak) == 2
+
+    def test_invalid_batches(self):
+        """빈 배치와 객체가 아닌 항목은 -32600 오류"""
+        server = MCPServer()
+        assert asyncio.run(server.handle_message([]))["error"]["code"] == -32600
+        responses = asyncio.run(server.handle_message([1, {"id": 2, "method": "tools/list"}]))
+        assert responses[0]["error"]["code"] == -32600
+        assert "result" in responses[1]
+
+
+class TestStdioLoop:
+    """stdio 루프 파이프라인 처리 테스트"""
+
+    def run_server(self, server, lines, monkeypatch, capsys):
+        """입력 줄들을 stdin으로 넣고 stdout 응답 목록 반환"""
+        monkeypatch.setattr(sys, "stdin", io.StringIO("".join(line + "\n" for line in lines)))
+        asyncio.run(server.run())
+        return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    def test_fast_request_overtakes_slow(self, monkeypatch, capsys):
+        """느린 요청 뒤에 들어온 빠른 요청의 응답이 먼저 나가는지 테스트"""
+        server = MCPServer()
+        original = server.handle_request
+
+        async def handle_request(request):
+            if request.get("id") == "slow":
+                await asyncio.sleep(0.3)
+            return await original(request)
+
+        server.handle_request = handle_request
+        responses = self.run_server(server, [
+            json.dumps({"jsonrpc": "2.0", "id": "slow", "method": "initialize"}),
+            json.dumps({"jsonrpc": "2.0", "id": "fast", "method": "tools/list"}),
+        ], monkeypatch, capsys)
+        assert [r["id"] for r in responses] == ["fast", "slow"]
+
+    def test_concurrency_limit(self, monkeypatch, capsys):
+        """동시 처리 수 제한을 넘지 않는지 테스트"""
+        server = MCPServer(max_concurrent_requests=2)
+        running = []
+        peak = []
+
+        async def handle_request(request):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.pop()
+            return {"jsonrpc": "2.0", "id": request["id"], "result": {}}
+
+        server.handle_request = handle_request
+        lines = [json.dumps({"id": i, "method": "x"}) for i in range(6)]
+        responses = self.run_server(server, lines, monkeypatch, capsys)
+        assert sorted(r["id"] for r in responses) == list(range(6))
+        assert max(peak) == 2
+
+    def test_parse_error_response(self, monkeypatch, capsys):
+        """잘못된 JSON 줄은 -32700 응답 후 다음 요청 계속 처리"""
+        server = MCPServer()
+        responses = self.run_server(server, [
+            "not json",
+            json.dumps({"jsonrpc": "2.0", "id": 7, "method": "tools/list"}),
+        ], monkeypatch, capsys)
+        assert {r["id"]: r for r in responses}[1]["error"]["code"] == -32700
+        assert "tools" in {r["id"]: r for r in responses}[7]["result"]
+
+    def test_oversized_frame_is_rejected(self, monkeypatch, capsys):
+        """최대 프레임 크기를 넘는 줄은 버리고 다음 요청은 정상 처리"""
+        server = MCPServer(max_frame_size=256)
+        responses = self.run_server(server, [
+            json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                        "params": {"name": "print_memo", "arguments": {"text": "x" * 1000}}}),
+            json.dumps({"jsonrpc": "2.0", "id": 2, "method": "initialize"}),
+        ], monkeypatch, capsys)
+        assert responses[0]["error"]["code"] == -32600
+        assert responses[1]["id"] == 2 and "result" in responses[1]
+
+    def test_stdio_pipes(self):
+        """실제 파이프로 연결된 프로세스에서 요청/응답 테스트"""
+        wrapper = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp_wrapper.py")
+        requests = "".join(
+            json.dumps({"jsonrpc": "2.0", "id": i, "method": "tools/list"}) + "\n" for i in range(20)
+        )
+        result = subprocess.run([sys.executable, wrapper], input=requests.encode(),
+                                capture_output=True, timeout=10)
+        responses = [json.loads(line) for line in result.stdout.decode().splitlines()]
+        assert sorted(r["id"] for r in responses) == list(range(20))
+
+
+class TestColdStart:
+    """기동 시간 관련 지연 초기화 테스트"""
+
+    def test_import_defers_non_essential_work(self):
+        """서버 import/생성 시 CLI 전용 모듈, 폭 테이블, 스레드 풀을 만들지 않음"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = (
+            "import sys, mcp_wrapper, printer\n"
+            "server = mcp_wrapper.MCPServer()\n"
+            "print(sorted(m for m in ('argparse', 'tempfile') if m in sys.modules))\n"
+            "print(printer._bmp_width_tables is None, server._executor is None)\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=root,
+                                capture_output=True, text=True, timeout=10)
+        assert result.stdout.splitlines() == ["[]", "True True"]
+
+    def test_executor_created_on_first_use(self):
+        """미리보기 요청 시 스레드 풀 생성"""
+        server = MCPServer()
+        assert server._executor is None
+        asyncio.run(server.handle_request(call_tool(server, "print_memo", {"text": "메모", "preview": True})))
+        assert server._executor is not None
+        server.shutdown_executor()
+        assert server._executor is None
@@ -3,8 +3,15 @@
 """
 
 import pytest
+import asyncio
 import tempfile
 import os
+import socket
+import socketserver
+import io
+import tracemalloc
+import threading
+import time
 from unittest.mock import patch, MagicMock
 
 # 테스트를 위해 상위 디렉터리의 모듈들을 import
@@ -12,12 +19,64 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from printer import (
-    get_text_width, wrap_text,
+    get_text_width, char_width, wrap_text, iter_wrapped_lines,
     prepare_print_content, create_esc_pos_content,
-    get_available_printers, check_printer_status
+    printer_list, printer_status, printer_print,
+    parse_raw_printer, RawConnectionPool, SPOOL_TEMPFILE,
+    printer_print_async, printer_list_async, printer_status_async,
+    parse_lpstat_inventory, describe_printer, printer_inventory, printer_inventory_async,
+    printer_preview, RenderCache, Metrics,
+    create_esc_pos_document, printer_print_many, printer_print_many_async,
+    ESC_POS_PROLOGUE, ESC_POS_CUT, optimize_esc_pos,
+    PrinterProfile, DEFAULT_PROFILE, PROFILE_58MM, get_printer_profile, register_printer_profile,
+    unencodable_chars, qr_code_command, barcode_command, with_symbols, compile_markup,
+    iter_esc_pos_chunks, _iter_sanitized_words, printer_print_stream, printer_print_stream_async
 )
 
 
+class FakeRawPrinter(socketserver.ThreadingTCPServer):
+    """raw 9100 포트를 흉내내는 로컬 소켓 서버 (받은 바이트 누적)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, close_after_job=False):
+        self.received = bytearray()
+        self.connections = 0
+        self.close_after_job = close_after_job
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), self._Handler)
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    class _Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            server = self.server
+            with server.lock:
+                server.connections += 1
+            while True:
+                data = self.request.recv(65536)
+                if not data:
+                    return
+                with server.lock:
+                    server.received += data
+                if server.close_after_job and data.endswith(b'\x1D\x56\x00'):
+                    return
+
+    @property
+    def uri(self):
+        return f"socket://127.0.0.1:{self.server_address[1]}"
+
+    def wait_for(self, size, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while len(self.received) < size and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return bytes(self.received)
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
 class TestTextProcessing:
     """텍스트 처리 함수 테스트"""
     
@@ -35,8 +94,27 @@ class TestTextProcessing:
     
     def test_get_text_width_mixed(self):
         """혼합 텍스트 폭 계산 테스트"""
-        assert get_text_width("Hello 안녕") == 9  # 5 + 1 + 4 = 10이 아니라 9 (공백=1)
+        assert get_text_width("Hello 안녕") == 10  # 5 + 1 + 4 = 10 (공백=1)
         assert get_text_width("카페 Latte") == 10  # 2*2 + 1 + 5 = 10
+
+    def test_get_text_width_east_asian_width(self):
+        """전각/반각/결합문자 폭 계산 테스트"""
+        assert get_text_width("ＡＢ") == 4  # 전각 영문
+        assert get_text_width("ｱｲｳ") == 3  # 반각 가나
+        assert get_text_width("※①") == 4  # 모호한 폭 기호는 한글 모드에서 전각
+        assert get_text_width("e\u0301") == 1  # 결합 악센트는 폭 0
+        assert get_text_width("😀a") == 3  # BMP 밖 이모지
+        assert get_text_width("할일 ｱ") == 6  # CP949 불가 문자가 섞인 경우
+
+    def test_get_text_width_matches_char_table(self):
+        """CP949 빠른 경로와 문자별 테이블 결과 일치 테스트"""
+        for code_point in range(0x80, 0x10000):
+            char = chr(code_point)
+            try:
+                char.encode('cp949')
+            except UnicodeEncodeError:
+                continue
+            assert get_text_width(char * 3) == char_width(char) * 3, hex(code_point)
     
     def test_wrap_text_short(self):
         """짧은 텍스트 줄바꿈 테스트"""
@@ -58,7 +136,28 @@ class TestTextProcessing:
         assert len(result) > 1
         for line in result:
             assert get_text_width(line) <= 20
-    
+
+    def test_wrap_text_hard_breaks_long_word(self):
+        """한 줄보다 긴 단어 강제 줄바꿈 테스트"""
+        url = "https://example.com/" + "a" * 50
+        result = wrap_text(f"링크 {url} 확인", max_width=20)
+        assert "".join(result).replace(" ", "") == f"링크{url}확인"
+        for line in result:
+            assert get_text_width(line) <= 20
+
+        result = wrap_text("가나다라마바사아자차카타", max_width=5)
+        assert result == ["가나", "다라", "마바", "사아", "자차", "카타"]
+
+    def test_wrap_text_preserves_newlines(self):
+        """원문 줄바꿈 및 빈 줄 유지 테스트"""
+        result = wrap_text("장보기\n- 우유\n\n- 계란", max_width=40)
+        assert result == ["장보기", "- 우유", "", "- 계란"]
+        assert wrap_text("   ") == []
+
+    def test_iter_wrapped_lines_is_lazy(self):
+        """제너레이터가 첫 줄을 즉시 생성하는지 테스트"""
+        lines = iter_wrapped_lines("첫줄\n" + "단어 " * 100000)
+        assert next(lines) == "첫줄"
 
 
 class TestPrintContent:
@@ -73,7 +172,7 @@ class TestPrintContent:
     
     def test_prepare_print_content_multiline(self):
         """여러 줄 텍스트 출력 준비 테스트"""
-        long_text = "This is a very long text that will be wrapped into multiple lines for testing purposes"
+        long_text = "This is a very long text that will be wrapped into multiple lines for testing purposes on a narrow eighty millimeter thermal receipt printer roll"
         result = prepare_print_content(long_text)
         assert len(result) > 5
         assert result[0] == ""  # 위쪽 여백
@@ -105,7 +204,7 @@ class TestPrinterCommunication:
             stdout="printer BIXOLON_SRP_330II is idle\nprinter HP_LaserJet is busy"
         )
         
-        result = get_available_printers()
+        result = printer_list()
         assert "BIXOLON_SRP_330II" in result
         assert "HP_LaserJet" in result
         mock_run.assert_called_once_with(['lpstat', '-p'], capture_output=True, text=True)
@@ -115,7 +214,7 @@ class TestPrinterCommunication:
         """프린터 목록 조회 실패 테스트"""
         mock_run.return_value = MagicMock(returncode=1)
         
-        result = get_available_printers()
+        result = printer_list()
         assert result == []
     
     @patch('printer.subprocess.run')
@@ -126,7 +225,7 @@ class TestPrinterCommunication:
             stdout="printer BIXOLON_SRP_330II is idle. enabled since Mon 01 Jan 2024"
         )
         
-        result = check_printer_status("BIXOLON_SRP_330II")
+        result = printer_status("BIXOLON_SRP_330II")
         assert "idle" in result
         assert "enabled" in result
     
@@ -135,10 +234,933 @@ class TestPrinterCommunication:
         """존재하지 않는 프린터 상태 확인 테스트"""
         mock_run.return_value = MagicMock(returncode=1)
         
-        result = check_printer_status("NONEXISTENT_PRINTER")
+        result = printer_status("NONEXISTENT_PRINTER")
         assert "찾을 수 없습니다" in result
 
 
+class TestRenderCache:
+    """렌더링 결과 LRU 캐시 테스트"""
+
+    def test_artifacts_match_uncached(self):
+        """캐시 결과가 직접 렌더링한 결과와 동일"""
+        cache = RenderCache()
+        text = "캐시 테스트 memo"
+        lines = prepare_print_content(text)
+        assert cache.lines(text) == lines
+        assert cache.content(text) == create_esc_pos_content(lines)
+        assert cache.preview(text) == printer_preview(text)
+        assert cache.render(text) == (lines, create_esc_pos_content(lines))
+
+    def test_preview_then_print_hits(self):
+        """미리보기 후 출력은 줄바꿈을 다시 하지 않음"""
+        cache = RenderCache()
+        with patch('printer.prepare_print_content', wraps=prepare_print_content) as mock_prepare:
+            cache.preview("같은 메모")
+            cache.render("같은 메모")
+            cache.render("같은 메모")
+        assert mock_prepare.call_count == 1
+        stats = cache.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 1 and stats["entries"] == 1
+
+    def test_size_based_eviction(self):
+        """용량을 넘으면 가장 오래 사용하지 않은 항목부터 제거"""
+        cache = RenderCache(max_bytes=1100)
+        for i in range(3):
+            cache.content(f"메모 {i} " + "x" * 100)
+        cache.content("메모 0 " + "x" * 100)  # 0번을 최근 사용으로
+        cache.content("메모 3 " + "x" * 100)
+        assert cache.size <= 1100
+        assert cache.evictions >= 1
+        keys = [key[0][:4] for key in cache._entries]
+        assert keys[-1] == "메모 3"
+        assert "메모 0" in keys and "메모 1" not in keys
+
+    def test_print_many_looks_up_each_memo_once(self, fake_cups):
+        """묶음 출력은 메모마다 캐시를 한 번만 조회 (적중률이 부풀지 않음)"""
+        import printer
+        before = printer.render_cache.stats()
+        results = printer_print_many(["조회 한 번 A", "조회 한 번 B"], "BIXOLON_SRP_330II", isFromMCP=True)
+        after = printer.render_cache.stats()
+        assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (0, 2)
+        assert [r["lines"] for r in results] == [len(prepare_print_content("조회 한 번 A"))] * 2
+        assert RenderCache().render_body("본문") == (
+            len(prepare_print_content("본문")), RenderCache().body("본문"))
+
+    def test_lines_returns_copy(self):
+        """반환된 줄 목록을 수정해도 캐시에 영향 없음"""
+        cache = RenderCache()
+        cache.lines("복사본").append("변경")
+        assert cache.lines("복사본") == prepare_print_content("복사본")
+
+
+class TestMetrics:
+    """고정 버킷 히스토그램/카운터 테스트"""
+
+    def test_observe_uses_fixed_buckets(self):
+        """관측값이 상한이 가장 작은 버킷에 들어가는지 테스트"""
+        metrics = Metrics(buckets=(0.01, 0.1, 1.0))
+        for seconds in (0.005, 0.01, 0.05, 5.0):
+            metrics.observe("stage_seconds", seconds, stage="lp")
+        histogram = metrics.histogram("stage_seconds", stage="lp")
+        assert histogram["counts"] == [2, 1, 0, 1]
+        assert histogram["count"] == 4
+        assert metrics.histogram("stage_seconds", stage="wrap") is None
+
+    def test_timer_records_even_on_error(self):
+        """with 블록에서 예외가 나도 시간이 기록되는지 테스트"""
+        metrics = Metrics()
+        with pytest.raises(ValueError):
+            with metrics.time("stage_seconds", stage="encode"):
+                raise ValueError("실패")
+        assert metrics.histogram("stage_seconds", stage="encode")["count"] == 1
+
+    def test_prometheus_text(self, tmp_path):
+        """Prometheus 텍스트 형식 (누적 버킷, +Inf, sum/count, 라벨 이스케이프)"""
+        metrics = Metrics(buckets=(0.01, 0.1))
+        metrics.observe("stage_seconds", 0.05, stage="lp")
+        metrics.inc("tool_calls_total", tool="print_memo", result="success")
+        metrics.inc("tool_calls_total", tool='따옴표"', result="failure")
+        text = metrics.to_prometheus()
+        assert "# TYPE todo_printer_stage_seconds histogram" in text
+        assert 'todo_printer_stage_seconds_bucket{stage="lp",le="0.01"} 0' in text
+        assert 'todo_printer_stage_seconds_bucket{stage="lp",le="0.1"} 1' in text
+        assert 'todo_printer_stage_seconds_bucket{stage="lp",le="+Inf"} 1' in text
+        assert 'todo_printer_stage_seconds_count{stage="lp"} 1' in text
+        assert 'todo_printer_tool_calls_total{result="success",tool="print_memo"} 1' in text
+        assert 'tool="따옴표\\""' in text
+        assert text.count("# TYPE todo_printer_tool_calls_total counter") == 1
+
+        path = metrics.write_prometheus(str(tmp_path / "printer.prom"))
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == text
+
+    def test_render_stages_recorded(self):
+        """렌더링 캐시 실패 시 wrap/encode 단계와 적중 카운터가 기록되는지 테스트"""
+        import printer
+        printer.metrics.reset()
+        cache = RenderCache()
+        cache.render("단계 측정")
+        cache.render("단계 측정")
+        assert printer.metrics.histogram("stage_seconds", stage="wrap")["count"] == 1
+        assert printer.metrics.histogram("stage_seconds", stage="encode")["count"] == 1
+        assert printer.metrics.counter("render_cache_total", result="hit") == 1
+        assert printer.metrics.counter("render_cache_total", result="miss") == 1
+
+
+class TestPrinterInventory:
+    """lpstat 한 번으로 전체 프린터 상태를 조회하는 인벤토리 테스트"""
+
+    def test_parse_lpstat_inventory(self):
+        """lpstat -l -p -a 출력 파싱 테스트"""
+        output = (
+            "printer BIX is idle.  enabled since Mon 01 Jan 2024\n"
+            "\tDescription: BIXOLON\n"
+            "\tAlerts: none\n"
+            "printer Kitchen now printing Kitchen-42.  enabled since Mon 01 Jan 2024\n"
+            "\tWaiting for printer to finish.\n"
+            "printer HP disabled since Mon 01 Jan 2024 -\n"
+            "\tPaper jam\n"
+            "\tDescription: HP\n"
+            "BIX accepting requests since Mon 01 Jan 2024\n"
+            "Kitchen accepting requests since Mon 01 Jan 2024\n"
+            "HP not accepting requests since Mon 01 Jan 2024 -\n"
+            "\tRejecting Jobs\n"
+        )
+        records = {r["name"]: r for r in parse_lpstat_inventory(output)}
+        assert list(records) == ["BIX", "Kitchen", "HP"]
+        assert records["BIX"]["state"] == "idle"
+        assert records["BIX"]["enabled"] and records["BIX"]["accepting"]
+        assert records["BIX"]["reason"] == ""
+        assert records["Kitchen"]["state"] == "printing"
+        assert records["Kitchen"]["reason"] == "Waiting for printer to finish."
+        assert records["HP"]["state"] == "stopped"
+        assert records["HP"]["enabled"] is False
+        assert records["HP"]["accepting"] is False
+        assert records["HP"]["reason"] == "Paper jam"
+        assert describe_printer(records["HP"]).endswith("- Paper jam (작업 거부 중)")
+
+    def test_parse_lpstat_inventory_empty(self):
+        """프린터가 없으면 빈 목록"""
+        assert parse_lpstat_inventory("") == []
+
+    def test_printer_inventory_single_lpstat_call(self, fake_cups):
+        """프린터 수와 관계없이 lpstat을 한 번만 실행"""
+        records = printer_inventory()
+        assert [r["name"] for r in records] == ["BIXOLON_SRP_330II", "HP_LaserJet"]
+        assert records[0]["reason"] == ""  # 'Users allowed:' 아래 '\t\t(all)'는 사유가 아님
+        assert records[1]["reason"] == "Paused"
+        assert "(all)" not in describe_printer(records[0])
+        assert fake_cups.calls == ["lpstat -l -p -a"]
+        assert asyncio.run(printer_inventory_async()) == records
+
+    @patch('printer.subprocess.run')
+    def test_printer_inventory_failure(self, mock_run):
+        """lpstat 실패 시 빈 목록"""
+        mock_run.return_value = MagicMock(returncode=1, stdout="")
+        assert printer_inventory() == []
+
+
+class TestLpSpooling:
+    """lp 작업 제출 방식 테스트"""
+
+    @patch('printer.subprocess.run')
+    def test_printer_print_pipes_stdin(self, mock_run):
+        """기본 방식은 임시 파일 없이 lp 표준입력으로 전달"""
+        mock_run.return_value = MagicMock(returncode=0, stdout=b"request id is BIX-1", stderr=b"")
+
+        with patch('tempfile.NamedTemporaryFile') as mock_tempfile:
+            assert printer_print("파이프 출력", "BIXOLON_SRP_330II", isFromMCP=True) is True
+            mock_tempfile.assert_not_called()
+
+        expected = optimize_esc_pos(create_esc_pos_content(prepare_print_content("파이프 출력")))
+        mock_run.assert_called_once_with(
+            ['lp', '-d', 'BIXOLON_SRP_330II', '-o', 'raw'],
+            input=expected, capture_output=True
+        )
+
+    @patch('printer.subprocess.run')
+    def test_printer_print_tempfile_cleans_up(self, mock_run):
+        """임시 파일 방식은 lp 실패 시에도 파일을 삭제"""
+        seen = {}
+
+        def fake_run(cmd, capture_output):
+            seen["path"] = cmd[-1]
+            with open(cmd[-1], "rb") as f:
+                seen["data"] = f.read()
+            return MagicMock(returncode=1, stdout=b"", stderr=b"lp: error")
+
+        mock_run.side_effect = fake_run
+        assert printer_print("파일 출력", "BIXOLON_SRP_330II", isFromMCP=True,
+                             spool=SPOOL_TEMPFILE) is False
+        assert seen["data"] == optimize_esc_pos(create_esc_pos_content(prepare_print_content("파일 출력")))
+        assert not os.path.exists(seen["path"])
+
+    def test_optimizer_can_be_disabled(self, fake_cups, monkeypatch):
+        """OPTIMIZE_ESC_POS=False면 동기/비동기 모두 만든 바이트 그대로 제출"""
+        import printer
+        expected = create_esc_pos_content(prepare_print_content("최적화 끔"))
+        monkeypatch.setattr(printer, "OPTIMIZE_ESC_POS", False)
+        assert printer_print("최적화 끔", "BIXOLON_SRP_330II", isFromMCP=True) is True
+        assert fake_cups.spooled == expected
+        assert asyncio.run(printer_print_async("최적화 끔", "BIXOLON_SRP_330II", isFromMCP=True)) is True
+        assert fake_cups.spooled == expected * 2  # 제출한 작업 바이트가 누적됨
+
+        monkeypatch.setattr(printer, "OPTIMIZE_ESC_POS", True)
+        assert printer._submit_job(expected, "BIXOLON_SRP_330II", optimize=False)[0] == 0
+        assert fake_cups.spooled == expected * 3
+
+    def test_printer_print_unknown_spool(self):
+        """알 수 없는 스풀 방식은 실패 처리"""
+        assert printer_print("출력", "BIXOLON_SRP_330II", isFromMCP=True, spool="fax") is False
+
+
+class TestPrinterProfiles:
+    """프린터 프로필(용지 폭, 코드페이지, 절단)과 인코딩 테스트"""
+
+    def test_profile_selected_by_printer_name(self):
+        """프린터 이름 패턴으로 프로필 선택, 없으면 기본 프로필"""
+        assert get_printer_profile("BIXOLON_SRP_330II") is DEFAULT_PROFILE
+        assert get_printer_profile(None) is DEFAULT_PROFILE
+        assert get_printer_profile("Kitchen_58mm") is PROFILE_58MM
+
+    def test_register_profile(self):
+        """등록한 패턴이 프린터 이름에 적용되는지 테스트"""
+        profile = PrinterProfile("test-48", paper_width=48, feed_lines=5, cut=b"\x1dVB\x10")
+        register_printer_profile(profile, "TEST_WIDE_*")
+        assert get_printer_profile("test_wide_1") is profile
+        assert profile.cut == b"\n" * 5 + b"\x1dVB\x10"
+        assert create_esc_pos_content(["x"], profile).endswith(b"\x1ba\x00" + profile.cut)
+
+    def test_default_profile_bytes_unchanged(self):
+        """기본 프로필의 고정 명령은 기존 바이트 그대로"""
+        assert ESC_POS_PROLOGUE == b"\x1b@\x1bt\x12\x1c&\x1c.\x1ba\x01"
+        assert DEFAULT_PROFILE.epilogue == b"\x1ba\x00\n\n\n\x1dV\x00"
+
+    def test_58mm_wraps_to_32_columns(self):
+        """58mm 프로필은 32칸으로 줄바꿈하고 미리보기도 같은 폭"""
+        text = "회의 준비사항: 프레젠테이션 자료 준비와 회의실 예약"
+        lines = RenderCache().lines(text, PROFILE_58MM)
+        assert max(get_text_width(line) for line in lines) <= 32
+        assert lines == prepare_print_content(text, width=32)
+        assert printer_preview(text, "Kitchen_58mm").startswith("=" * 34 + "\n")
+
+    def test_print_uses_profile_of_printer(self, fake_cups):
+        """출력 시 프린터 이름의 프로필로 렌더링"""
+        text = "가나다라마바사아자차카타파하 " * 3
+        assert printer_print(text, "Kitchen_58mm", isFromMCP=True) is True
+        expected = create_esc_pos_content(prepare_print_content(text, width=32), PROFILE_58MM)
+        assert fake_cups.spooled == optimize_esc_pos(expected)
+
+    def test_whole_document_encoding_matches_per_line(self):
+        """본문 전체 인코딩 결과가 줄별 EUC-KR 인코딩과 같음"""
+        lines = prepare_print_content("우유 사오기\n회의 준비 Meeting 10:00 ①②")
+        expected = b"".join(line.encode("euc-kr") + b"\n" for line in lines)
+        assert create_esc_pos_content(lines) == ESC_POS_PROLOGUE + expected + DEFAULT_PROFILE.epilogue
+
+    def test_unencodable_replaced_not_utf8(self):
+        """EUC-KR/CP949에 없는 문자는 UTF-8로 보내지 않고 대체 문자로 바꿈"""
+        content = create_esc_pos_content(["커피 ☕ 😀 OK"])
+        assert b"\xf0" not in content and b"\xe2" not in content
+        assert "커피 ? ? OK\n".encode("cp949") in content
+        assert unencodable_chars("커피 ☕ 😀 OK") == {"☕", "😀"}
+
+    def test_escape_policy_and_zero_width(self):
+        """escape 방식은 코드 포인트 표기, 결합/서식 문자는 버림"""
+        profile = PrinterProfile("escape", unencodable="escape")
+        assert profile.sanitize("엄지 👍🏽 가족 👨\u200d👩") == "엄지 [U+1F44D][U+1F3FD] 가족 [U+1F468][U+1F469]"
+        with pytest.raises(ValueError):
+            PrinterProfile("bad", unencodable="utf8")
+
+    def test_sanitized_before_wrapping(self):
+        """대체한 텍스트 기준으로 줄바꿈 (대체 문자열 폭 반영)"""
+        profile = PrinterProfile("escape-narrow", paper_width=12, unencodable="escape")
+        lines = RenderCache().lines("😀😀😀", profile)
+        assert "".join(lines) == "[U+1F600]" * 3
+        assert max(get_text_width(line) for line in lines) == 12
+
+    def test_raster_policy_images_only_unencodable_lines(self):
+        """raster 방식은 인코딩할 수 없는 문자가 있는 줄만 GS v 0 이미지로 출력"""
+        profile = PrinterProfile("raster", unencodable="raster")
+        assert profile.sanitize("커피 ☕") == "커피 ☕"
+        body = profile.encode("우유 사오기\n커피 ☕ 두 잔\n")
+        band = profile.raster_renderer().band("커피 ☕ 두 잔")
+        assert body == "우유 사오기\n".encode("cp949") + band
+        assert band.startswith(b"\x1dv0\x00\x3c\x00\x18\x00")  # 480도트(60바이트) x 24줄
+        assert profile.encode("우유") == "우유".encode("cp949")
+
+
+class TestSymbols:
+    """프린터가 직접 그리는 QR 코드/바코드 명령 테스트"""
+
+    def test_qr_code_command(self):
+        """QR 명령은 모델/크기/오류정정/저장/출력 순서의 GS ( k 함수들"""
+        command = qr_code_command("https://example.com/order/123", module_size=4, error_correction="Q")
+        assert command.startswith(b"\x1d(k\x04\x001A2\x00")
+        assert b"\x1d(k\x03\x001C\x04" in command
+        assert b"\x1d(k\x03\x001E2" in command
+        store = b"\x1d(k" + bytes((29 + 3, 0)) + b"1P0https://example.com/order/123"
+        assert store in command
+        assert command.endswith(b"\x1d(k\x03\x001Q0")
+
+    def test_qr_long_payload_length_bytes(self):
+        """256바이트 이상 데이터는 pH에 상위 바이트 기록"""
+        command = qr_code_command("A" * 300)
+        assert b"\x1d(k" + bytes(((300 + 3) & 0xFF, 1)) + b"1P0" in command
+
+    @pytest.mark.parametrize("data,kwargs", [
+        ("", {}),
+        ("x" * 8000, {}),
+        ("x" * 2332, {}),
+        ("x" * 1274, {"error_correction": "H"}),
+        ("가" * 1000, {}),  # UTF-8 3000바이트
+        ("data", {"module_size": 20}),
+        ("data", {"error_correction": "X"}),
+    ])
+    def test_qr_validation(self, data, kwargs):
+        with pytest.raises(ValueError):
+            qr_code_command(data, **kwargs)
+
+    @pytest.mark.parametrize("level,limit", [("L", 2953), ("M", 2331), ("Q", 1663), ("H", 1273)])
+    def test_qr_byte_mode_capacity(self, level, limit):
+        """오류 정정 수준별 바이트 모드 최대 크기까지는 허용"""
+        command = qr_code_command("x" * limit, error_correction=level)
+        assert command.endswith(b"\x1d(k\x03\x001Q0")
+        with pytest.raises(ValueError):
+            qr_code_command("x" * (limit + 1), error_correction=level)
+
+    def test_barcode_command(self):
+        """바코드 명령: HRI/높이/폭 설정 후 GS k (CODE128은 코드 세트 B 접두)"""
+        command = barcode_command("ORDER-123")
+        assert command == b"\x1dH\x02\x1dhP\x1dw\x02\x1dkI\x0b{BORDER-123"
+        assert barcode_command("4006381333931", "EAN13").endswith(b"\x1dkC\x0d4006381333931")
+        with pytest.raises(ValueError):
+            barcode_command("12AB", "EAN13")
+        with pytest.raises(ValueError):
+            barcode_command("주문", "CODE128")
+        with pytest.raises(ValueError):
+            barcode_command("X", "QRCODE")
+
+    def test_code128_escapes_brace(self):
+        """CODE128의 '{'는 '{{'로 보내고, '{'로 시작하는 데이터도 코드 세트 B 접두를 붙임"""
+        assert barcode_command("A{B").endswith(b"\x1dkI\x06{BA{{B")
+        assert barcode_command("{A}").endswith(b"\x1dkI\x06{B{{A}")
+        assert barcode_command("x" * 253).endswith(b"\x1dkI\xff{B" + b"x" * 253)
+        with pytest.raises(ValueError):
+            barcode_command("x" * 254)
+        with pytest.raises(ValueError):
+            barcode_command("{" * 127)  # 이스케이프 후 256바이트
+
+    def test_content_with_symbols_small_and_optimizable(self):
+        """심볼이 든 작업은 수백 바이트이고 최적화 후에도 출력 결과가 같음"""
+        lines = prepare_print_content("주문 확인")
+        symbols = [qr_code_command("https://example.com/o/123"), barcode_command("ORDER-123")]
+        content = create_esc_pos_content(lines, symbols=symbols)
+        assert len(content) < 300
+        assert content == with_symbols(create_esc_pos_content(lines), symbols)
+        optimized = optimize_esc_pos(content)
+        assert simulate_printer(optimized) == simulate_printer(content)
+        assert symbols[0] in optimized and symbols[1][-13:] in optimized
+
+    def test_print_with_symbols(self, fake_cups):
+        """출력 시 본문 아래에 심볼 명령 포함"""
+        symbol = qr_code_command("https://example.com")
+        assert printer_print("QR 메모", "BIXOLON_SRP_330II", isFromMCP=True, symbols=[symbol]) is True
+        assert symbol in fake_cups.spooled
+
+
+class TestMarkup:
+    """마크업 컴파일 테스트 (simulate_printer로 줄별 정렬/글자별 굵게·크기 확인)"""
+
+    @staticmethod
+    def printed_lines(text, profile=None):
+        profile = profile or DEFAULT_PROFILE
+        _, body = compile_markup(text, profile)
+        printed, _ = simulate_printer(profile.prologue + body + profile.epilogue)
+        return [entry for entry in printed if entry[0] == "line"]
+
+    def test_heading_halves_column_budget(self):
+        """'# '는 가로세로 2배라 20칸, '## '는 세로만 2배라 40칸 기준으로 줄바꿈"""
+        lines, _ = compile_markup("# " + "가나다라 " * 6)
+        assert lines[1:4] == ["가나다라 가나다라", "가나다라 가나다라", "가나다라 가나다라"]
+        assert max(get_text_width(line) * 2 for line in lines) <= 40
+        lines, _ = compile_markup("## " + "가나다라 " * 6)
+        assert lines[1:3] == ["가나다라 가나다라 가나다라 가나다라", "가나다라 가나다라"]
+
+    def test_modes_per_line(self):
+        """제목은 굵게+2배, >>는 오른쪽 정렬, 표시 없는 줄은 프로필 정렬(가운데)"""
+        heading, body, right = self.printed_lines("# 제목\n본문\n>>2026-10-18")
+        assert {char[:2] for char in heading[2]} == {(1, 0x11)}
+        assert body[1] == 1 and {char[:2] for char in body[2]} == {(0, 0)}
+        assert right[1] == 2
+
+    def test_bold_survives_wrapping(self):
+        """**굵게** 구간이 줄바꿈으로 나뉘어도 해당 글자만 굵게"""
+        text = "앞 **" + "굵은 글씨 " * 8 + "끝** 뒤"
+        lines = self.printed_lines(text)
+        decoded = [(bytes(c[4] for c in line[2] if c[0]), bytes(c[4] for c in line[2] if not c[0]))
+                   for line in lines]
+        bold = b" ".join(part for part, _ in decoded).decode("cp949").split()
+        plain = b" ".join(part for _, part in decoded).decode("cp949").split()
+        assert len(lines) > 1
+        assert bold == ("굵은 글씨 " * 8 + "끝").split()
+        assert plain == ["앞", "뒤"]
+
+    def test_raster_lines_follow_size_and_alignment(self):
+        """래스터로 보내는 줄도 '##'는 세로만 2배, '#'은 가로세로 2배, >>/<<는 정렬 반영"""
+        profile = PrinterProfile("raster", unencodable="raster")
+        renderer = profile.raster_renderer()
+        _, body = compile_markup("## 커피 ☕\n# ☕\n>>☕ 끝\n<<☕ 끝", profile)
+        printed, _ = simulate_printer(profile.prologue + body + profile.epilogue)
+        bands = [entry[2] for entry in printed if entry[0] == "raster"]
+        assert bands == [
+            renderer.band("커피 ☕", 1, 2, 1), renderer.band("☕", 2, 2, 1),
+            renderer.band("☕ 끝", 1, 1, 2), renderer.band("☕ 끝", 1, 1, 0),
+        ]
+        heights = [band[6] + band[7] * 256 for band in bands]
+        assert heights == [48, 48, 24, 24]
+        assert bands[2] != bands[3]
+
+    def test_unmatched_marker_literal_and_padding(self):
+        """짝 없는 **는 그대로, 여백 줄은 prepare_print_content와 같은 규칙"""
+        lines, body = compile_markup("2 ** 3")
+        assert lines == prepare_print_content("2 ** 3")
+        assert body == b"\n2 ** 3\n\n\n\n"
+
+    def test_plain_text_matches_unmarked_output(self):
+        """마크업이 없으면 기존 출력과 같은 결과"""
+        text = "회의 준비사항: 프레젠테이션 자료 준비, 회의실 예약, 참석자 확인"
+        content = DEFAULT_PROFILE.prologue + compile_markup(text)[1] + DEFAULT_PROFILE.epilogue
+        assert content == create_esc_pos_content(prepare_print_content(text))
+
+    def test_compiled_output_cached(self):
+        """같은 마크업은 한 번만 컴파일하고, 일반 텍스트와는 별도 항목"""
+        cache = RenderCache()
+        first = cache.content("# 제목", markup=True)
+        assert cache.content("# 제목", markup=True) is first
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+        assert cache.content("# 제목") != first
+        assert cache.lines("# 제목", markup=True) == ["", "제목", "", "", ""]
+
+    def test_optimizer_keeps_markup_output(self):
+        """최적화 후에도 마크업 출력 결과가 같음"""
+        body = compile_markup("# 제목\n**굵게** 보통\n>>오른쪽\n<<왼쪽")[1]
+        data = DEFAULT_PROFILE.prologue + body + DEFAULT_PROFILE.epilogue
+        assert simulate_printer(optimize_esc_pos(data)) == simulate_printer(data)
+
+
+class TestStreaming:
+    """긴 문서 스트리밍 출력 테스트"""
+
+    @pytest.mark.parametrize("text", [
+        "우유 사오기",
+        "회의록 메모 Meeting notes 결정 사항과 후속 조치 항목 " * 200,
+        "\n\n첫 줄\n\n\n둘째 줄\n\n",
+        "   \n  ",
+        "커피 ☕ 😀\n" * 50,
+        "윈도우 줄끝\r\n맥 줄끝\r다음\x0c쪽\x0b세로탭\u2028줄\x85끝\r\n",
+    ])
+    def test_chunks_match_full_render(self, text):
+        """조각을 이어 붙이면 한 번에 만든 작업 바이트와 같음 (문자열/파일 입력 모두)"""
+        expected = create_esc_pos_content(prepare_print_content(text))
+        assert b"".join(iter_esc_pos_chunks(text, chunk_size=256)) == expected
+        assert b"".join(iter_esc_pos_chunks(io.StringIO(text), chunk_size=256)) == expected
+
+    def test_source_lines_split_like_splitlines(self):
+        """\r, \x0c 등도 prepare_print_content와 같은 줄로 나눔 (빈 줄 포함)"""
+        text = "첫 줄\r둘째 줄\x0c\x0c셋째\r\n\r\n넷째"
+        expected = create_esc_pos_content(prepare_print_content(text))
+        assert b"".join(iter_esc_pos_chunks(text)) == expected
+        assert b"".join(iter_esc_pos_chunks(io.StringIO(text, newline=""))) == expected
+        assert b"\r" not in expected and b"\x0c" not in expected
+
+    def test_chunks_bounded_and_lazy(self):
+        """조각 크기는 chunk_size 근처로 제한되고, 첫 조각은 원문을 다 읽기 전에 나옴"""
+        consumed = []
+
+        def source():
+            for i in range(1000):
+                consumed.append(i)
+                yield f"{i}번째 줄 회의록 메모 Meeting notes\n"
+
+        stats = {}
+        chunks = iter_esc_pos_chunks(source(), chunk_size=1024, stats=stats)
+        first = next(chunks)
+        assert len(consumed) < 50
+        sizes = [len(first)] + [len(chunk) for chunk in chunks]
+        assert max(sizes) <= 1024 + 100
+        assert stats["lines"] == 1000 and stats["chunks"] == len(sizes) and stats["bytes"] == sum(sizes)
+
+    def test_constant_memory(self):
+        """문서 크기가 커져도 최대 메모리 사용량이 늘지 않음"""
+        def peak(count):
+            lines = (f"{i} 로그 메시지 log message payload\n" for i in range(count))
+            tracemalloc.start()
+            for _ in iter_esc_pos_chunks(lines):
+                pass
+            result = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return result
+
+        small, large = peak(500), peak(20000)
+        assert large < small * 2 and large < 256 * 1024
+
+    def test_single_huge_line_constant_memory(self):
+        """줄바꿈 없는 거대한 한 줄도 줄 단위 목록이나 대체 처리 사본을 만들지 않음"""
+        def peak(repeat_count):
+            text = "회의록 😀 meeting notes " * repeat_count
+            tracemalloc.start()
+            for _ in iter_esc_pos_chunks(text):
+                pass
+            result = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return result
+
+        small, large = peak(1000), peak(50000)
+        assert large < small * 2 and large < 256 * 1024
+
+    @pytest.mark.parametrize("piece_size", [1, 3, 7, 64])
+    def test_sanitized_words_across_pieces(self, piece_size):
+        """조각 경계에 걸친 단어와 대체 문자도 줄 전체를 처리한 결과와 같음"""
+        line = "  커피☕ 😀\u200dabc   x " + "긴단어" * 10 + "\u2009끝"
+        expected = DEFAULT_PROFILE.sanitize(line).split()
+        assert list(_iter_sanitized_words(line, DEFAULT_PROFILE, piece_size)) == expected
+
+    def test_print_stream_lp(self, fake_cups):
+        """lp 표준입력으로 조각을 흘려 보내고 작업은 하나"""
+        text = "긴 문서 " * 2000
+        stats = {}
+        assert printer_print_stream(text, "BIXOLON_SRP_330II", isFromMCP=True, chunk_size=1024, stats=stats)
+        assert fake_cups.spooled == create_esc_pos_content(prepare_print_content(text))
+        assert len(fake_cups.calls) == 1 and stats["chunks"] > 10
+
+    def test_print_stream_async_lp(self, fake_cups):
+        text = "비동기 긴 문서 " * 1000
+        assert asyncio.run(printer_print_stream_async(text, "BIXOLON_SRP_330II", isFromMCP=True))
+        assert fake_cups.spooled == create_esc_pos_content(prepare_print_content(text))
+
+    def test_print_stream_lp_failure(self, fake_cups, monkeypatch):
+        monkeypatch.setenv("PATH", "/nonexistent")
+        assert printer_print_stream("문서", "BIXOLON_SRP_330II", isFromMCP=True) is False
+        assert asyncio.run(printer_print_stream_async("문서", "BIXOLON_SRP_330II", isFromMCP=True)) is False
+
+    def test_raw_stream_starts_before_last_line(self):
+        """raw 프린터는 마지막 줄을 렌더링하기 전에 첫 조각을 받음"""
+        server = FakeRawPrinter()
+        received_midway = []
+
+        def source():
+            for i in range(2000):
+                if i == 1500:
+                    received_midway.append(len(server.wait_for(1)))
+                yield f"{i} 스트리밍 raw 출력\n"
+
+        try:
+            assert printer_print_stream(source(), server.uri, isFromMCP=True, chunk_size=1024)
+            assert received_midway[0] > 0
+            expected = b"".join(iter_esc_pos_chunks((f"{i} 스트리밍 raw 출력" for i in range(2000))))
+            assert server.wait_for(len(expected)) == expected
+        finally:
+            server.stop()
+
+
+class TestPrintMany:
+    """여러 메모를 작업 하나로 출력하는 기능 테스트"""
+
+    def test_document_has_single_prologue(self):
+        """초기화 명령은 한 번만, 절단은 옵션에 따라 메모마다 또는 한 번"""
+        bodies = [b"A\n", b"B\n", b"C\n"]
+        each = create_esc_pos_document(bodies, cut_each=True)
+        once = create_esc_pos_document(bodies, cut_each=False)
+        assert each.count(ESC_POS_PROLOGUE) == once.count(ESC_POS_PROLOGUE) == 1
+        assert each.count(ESC_POS_CUT) == 3
+        assert once.count(ESC_POS_CUT) == 1
+
+    def test_single_memo_matches_print_content(self):
+        """메모 하나짜리 문서는 create_esc_pos_content와 같은 바이트"""
+        from printer import render_cache
+        lines = prepare_print_content("한 개")
+        assert create_esc_pos_document([render_cache.body("한 개")]) == create_esc_pos_content(lines)
+
+    def test_print_many_one_lp_job(self, fake_cups):
+        """메모 여러 개가 lp 한 번으로 제출되는지 테스트"""
+        texts = ["우유 사오기", "회의 준비", "운동"]
+        results = printer_print_many(texts, "BIXOLON_SRP_330II", isFromMCP=True)
+        assert [r["success"] for r in results] == [True, True, True]
+        assert [r["lines"] for r in results] == [len(prepare_print_content(t)) for t in texts]
+        assert fake_cups.calls == ["lp -d BIXOLON_SRP_330II -o raw"]
+        assert fake_cups.spooled.count(b"\x1b@") == 1
+        assert "회의 준비".encode("euc-kr") in fake_cups.spooled
+
+    @patch('printer.subprocess.run')
+    def test_print_many_failure_marks_items(self, mock_run):
+        """작업 제출이 실패하면 모든 항목이 실패로 표시"""
+        mock_run.return_value = MagicMock(returncode=1, stdout=b"", stderr=b"lp: printer not found")
+        results = printer_print_many(["가", "나"], "NOPE", isFromMCP=True)
+        assert [r["success"] for r in results] == [False, False]
+        assert "printer not found" in results[0]["error"]
+
+    def test_print_many_async(self, fake_cups):
+        """비동기 버전도 작업 하나로 제출"""
+        results = asyncio.run(printer_print_many_async(["하나", "둘"], "BIXOLON_SRP_330II",
+                                                       isFromMCP=True, cut_each=False))
+        assert all(r["success"] for r in results)
+        assert len(fake_cups.calls) == 1
+        assert fake_cups.spooled.count(b"\x1dV\x00") == 1
+
+
+def simulate_printer(data):
+    """ESC/POS 바이트를 프린터처럼 해석해 (인쇄 결과, 최종 모드) 반환
+
+    최적화 전후 출력이 같은지 비교하기 위한 최소 해석기. 줄마다 정렬과
+    글자별 (강조, 크기, 코드페이지, 한글 모드)를, 빈 줄은 그때의 문자 크기를 기록한다.
+    """
+    defaults = {"align": 0, "codepage": 0, "bold": 0, "size": 0, "kanji": "기본값"}
+    modes = {key: "모름" for key in defaults}
+    printed = []
+    line = []
+    line_align = None
+    barcode_settings = {}
+
+    def feed():
+        nonlocal line, line_align
+        printed.append(("line", line_align, tuple(line)) if line else ("feed", modes["size"]))
+        line, line_align = [], None
+
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        two = data[i:i + 2]
+        if byte == 0x0A:
+            feed()
+            i += 1
+        elif two == b"\x1b@":
+            line, line_align = [], None
+            modes = dict(defaults)
+            barcode_settings = {}
+            i += 2
+        elif two == b"\x1ba":
+            if not line:
+                n = data[i + 2]
+                modes["align"] = n - 48 if n >= 48 else n
+            i += 3
+        elif two in (b"\x1bt", b"\x1d!"):
+            modes["codepage" if two == b"\x1bt" else "size"] = data[i + 2]
+            i += 3
+        elif two == b"\x1bE":
+            modes["bold"] = data[i + 2] & 1
+            i += 3
+        elif data[i:i + 4] == b"\x1c&\x1c.":
+            # SRP-330II 한글 우회 쌍: 값으로는 FS .과 같지만 실기기 동작이 다르므로 따로 기록
+            modes["kanji"] = "FS & -> FS ."
+            i += 4
+        elif two in (b"\x1c&", b"\x1c."):
+            modes["kanji"] = 1 if two == b"\x1c&" else 0
+            i += 2
+        elif two == b"\x1bd":
+            for _ in range(data[i + 2]):
+                feed()
+            i += 3
+        elif two == b"\x1dV":
+            printed.append(("cut",))
+            i += 3 if data[i + 2] in (0, 1, 48, 49) else 4
+        elif data[i:i + 3] == b"\x1d(k":
+            size = 5 + data[i + 3] + data[i + 4] * 256
+            printed.append(("symbol", modes["align"], data[i:i + size]))
+            i += size
+        elif data[i:i + 3] == b"\x1dv0":
+            size = 8 + (data[i + 4] + data[i + 5] * 256) * (data[i + 6] + data[i + 7] * 256)
+            printed.append(("raster", modes["align"], data[i:i + size]))
+            i += size
+        elif two in (b"\x1dH", b"\x1dh", b"\x1dw"):
+            barcode_settings[two] = data[i + 2]
+            i += 3
+        elif two == b"\x1dk":
+            size = 4 + data[i + 3]
+            printed.append(("barcode", modes["align"], dict(barcode_settings), data[i:i + size]))
+            i += size
+        elif byte in (0x1B, 0x1C, 0x1D):
+            printed.append(("raw", data[i:]))
+            break
+        else:
+            if not line:
+                line_align = modes["align"]
+            line.append((modes["bold"], modes["size"], modes["codepage"], modes["kanji"], byte))
+            i += 1
+    if line:
+        printed.append(("unprinted", tuple(line)))
+    return printed, modes
+
+
+class TestEscPosOptimizer:
+    """ESC/POS peephole 최적화 테스트 (해석 결과가 최적화 전후로 같아야 함)"""
+
+    def assert_same_output(self, data):
+        optimized = optimize_esc_pos(data)
+        assert simulate_printer(optimized) == simulate_printer(data)
+        return optimized
+
+    @pytest.mark.parametrize("text", [
+        "우유 사오기",
+        "회의 준비사항: 프레젠테이션 자료 준비, 회의실 예약, 참석자 확인 " * 3,
+        "첫 줄\n\n\n\n\n\n다섯 줄 띄운 뒤",
+        "emoji 😀 fallback",
+    ])
+    def test_single_job_identical_and_smaller(self, text):
+        """메모 하나의 출력 결과는 같고 바이트는 줄어듦"""
+        data = create_esc_pos_content(prepare_print_content(text))
+        optimized = self.assert_same_output(data)
+        assert len(optimized) < len(data)
+        assert optimized.startswith(DEFAULT_PROFILE.prologue)  # 초기화 구간(FS & -> FS . 포함)은 그대로
+
+    def test_raster_job_identical(self):
+        """래스터 띠가 섞인 작업도 결과가 같고, 띠 안의 바이트는 건드리지 않음"""
+        profile = PrinterProfile("raster", unencodable="raster")
+        data = create_esc_pos_content(prepare_print_content("커피 ☕\n\n\n\n\n줄"), profile)
+        optimized = self.assert_same_output(data)
+        assert profile.raster_renderer().band("커피 ☕") in optimized
+
+    def test_feed_runs_folded(self):
+        """연속 줄바꿈 4개 이상은 ESC d n, 3개 이하는 그대로"""
+        data = b"\x1b@A" + b"\n" * 7 + b"B" + b"\n" * 3 + b"C" + b"\n" * 300
+        optimized = self.assert_same_output(data)
+        assert b"A\x1bd\x07B\n\n\nC\x1bd\xff\x1bd\x2d" == optimized[2:]
+
+    def test_concatenated_jobs_keep_each_prologue(self):
+        """이어 붙인 작업의 ESC @ 와 초기화 명령은 작업마다 그대로 유지"""
+        jobs = [create_esc_pos_content(prepare_print_content(t)) for t in ("우유", "계란", "빵")]
+        optimized = self.assert_same_output(b"".join(jobs))
+        assert optimized.count(DEFAULT_PROFILE.prologue) == 3
+
+    def test_kanji_workaround_pair_kept(self):
+        """FS & -> FS . 쌍은 초기화 구간 밖에서도 지우거나 앞뒤 명령과 순서를 바꾸지 않음"""
+        data = b"\x1b@abc\n\x1bE\x01\x1c&\x1c.\x1bE\x01def\n\x1c&\x1c.\x1c.ghi\n"
+        optimized = self.assert_same_output(data)
+        assert optimized == b"\x1b@abc\n\x1bE\x01\x1c&\x1c.def\n\x1c&\x1c.\x1c.ghi\n"
+
+    def test_redundant_mode_sets_dropped(self):
+        """글자를 찍기 전에 덮어쓴 설정과 이미 같은 값인 설정은 제거 (초기화 구간은 그대로)"""
+        data = b"\x1b@\x1ba\x01\x1ba\x01abc\n\x1ba\x02\x1ba\x01\x1bE\x01\x1bE\x00\x1d!\x00def\n"
+        optimized = self.assert_same_output(data)
+        assert optimized == b"\x1b@\x1ba\x01\x1ba\x01abc\ndef\n"
+
+    def test_reset_kept_without_kanji_reset(self):
+        """다음 작업이 한글 모드를 다시 설정하지 않으면 ESC @ 유지 (기본값을 알 수 없음)"""
+        data = b"\x1b@\x1c&abc\n\x1b@def\n"
+        optimized = self.assert_same_output(data)
+        assert optimized.count(b"\x1b@") == 2
+
+    def test_mid_line_align_untouched(self):
+        """줄 중간의 정렬 명령은 그대로 (프린터가 무시)"""
+        data = b"\x1b@ab\x1ba\x02cd\n\x1ba\x02ef\n"
+        assert self.assert_same_output(data) == data
+
+    def test_symbol_payload_not_rewritten(self):
+        """심볼 명령 데이터 안의 0x0A 바이트는 줄바꿈으로 취급하지 않음"""
+        payload = b"\n" * 6
+        symbol = b"\x1d(k" + bytes((len(payload) + 3, 0)) + b"1P0" + payload
+        data = b"\x1b@\x1ba\x01" + symbol + b"\n" * 5
+        optimized = self.assert_same_output(data)
+        assert symbol in optimized
+        assert optimized.endswith(b"\x1bd\x05")
+
+    def test_unknown_command_passed_through(self):
+        """모르는 명령 뒤는 그대로 전달"""
+        tail = b"\x1b3\x20\n\n\n\n\n\x1ba\x01x\n"
+        data = b"\x1b@\x1ba\x00" + tail
+        assert optimize_esc_pos(data) == data
+
+
+class TestAsyncSubprocess:
+    """asyncio 서브프로세스 기반 비동기 버전 테스트 (가짜 lp/lpstat 사용)"""
+
+    def test_printer_print_async(self, fake_cups):
+        """비동기 출력이 lp 표준입력으로 작업을 전달하는지 테스트"""
+        assert asyncio.run(printer_print_async("비동기 출력", "BIXOLON_SRP_330II", True)) is True
+        assert fake_cups.spooled == optimize_esc_pos(create_esc_pos_content(prepare_print_content("비동기 출력")))
+        assert fake_cups.calls == ["lp -d BIXOLON_SRP_330II -o raw"]
+
+    def test_printer_print_async_tempfile(self, fake_cups):
+        """임시 파일 방식 비동기 출력 테스트"""
+        result = asyncio.run(printer_print_async("파일", "BIXOLON_SRP_330II", True, spool=SPOOL_TEMPFILE))
+        assert result is True
+        assert fake_cups.spooled == optimize_esc_pos(create_esc_pos_content(prepare_print_content("파일")))
+
+    def test_printer_print_async_timeout(self, fake_cups, monkeypatch):
+        """lp가 응답하지 않으면 시간 초과 후 실패 반환"""
+        monkeypatch.setenv("FAKE_LP_DELAY", "5")
+        started = time.monotonic()
+        result = asyncio.run(printer_print_async("느린 출력", "BIXOLON_SRP_330II", True, timeout=0.2))
+        assert result is False
+        assert time.monotonic() - started < 2
+
+    def test_printer_print_async_cancel(self, fake_cups, monkeypatch):
+        """작업 취소 시 CancelledError 전파"""
+        monkeypatch.setenv("FAKE_LP_DELAY", "5")
+
+        async def cancel_soon():
+            task = asyncio.create_task(printer_print_async("취소", "BIXOLON_SRP_330II", True))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            await task
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(cancel_soon())
+
+    def test_printer_list_and_status_async(self, fake_cups):
+        """비동기 프린터 목록/상태 조회 테스트"""
+        assert asyncio.run(printer_list_async()) == ["BIXOLON_SRP_330II", "HP_LaserJet"]
+        assert "idle" in asyncio.run(printer_status_async("BIXOLON_SRP_330II"))
+        assert "찾을 수 없습니다" in asyncio.run(printer_status_async("NONEXISTENT"))
+
+    def test_status_calls_run_concurrently(self, fake_cups, monkeypatch):
+        """느린 lpstat 여러 개가 스레드 수 제한 없이 동시에 실행되는지 테스트"""
+        monkeypatch.setenv("FAKE_LPSTAT_DELAY", "0.3")
+
+        async def check_many():
+            return await asyncio.gather(*(printer_status_async("BIXOLON_SRP_330II") for _ in range(6)))
+
+        started = time.monotonic()
+        statuses = asyncio.run(check_many())
+        assert all("idle" in status for status in statuses)
+        assert time.monotonic() - started < 1.2
+
+
+class TestRawTransport:
+    """raw 소켓(9100) 전송 테스트"""
+
+    def test_parse_raw_printer(self):
+        """socket:// 프린터 이름 파싱 테스트"""
+        assert parse_raw_printer("socket://10.0.0.5:9100") == ("10.0.0.5", 9100)
+        assert parse_raw_printer("socket://printer.local") == ("printer.local", 9100)
+        assert parse_raw_printer("socket://[::1]:9101") == ("::1", 9101)
+        assert parse_raw_printer("BIXOLON_SRP_330II") is None
+
+    def test_pool_reuses_connection(self):
+        """여러 작업이 하나의 keep-alive 연결을 재사용하는지 테스트"""
+        server = FakeRawPrinter()
+        pool = RawConnectionPool()
+        try:
+            job = create_esc_pos_content(["", "재사용 테스트", ""])
+            for _ in range(5):
+                pool.send("127.0.0.1", server.server_address[1], job)
+            assert server.wait_for(len(job) * 5) == job * 5
+            assert server.connections == 1
+            assert pool.connects == 1
+            assert pool.reuses == 4
+        finally:
+            pool.close()
+            server.stop()
+
+    def test_pool_reconnects_after_peer_close(self):
+        """프린터가 연결을 끊으면 새로 연결해서 전송하는지 테스트"""
+        server = FakeRawPrinter(close_after_job=True)
+        pool = RawConnectionPool()
+        try:
+            job = create_esc_pos_content(["", "재연결 테스트", ""])
+            pool.send("127.0.0.1", server.server_address[1], job)
+            server.wait_for(len(job))
+            time.sleep(0.05)  # 서버 쪽 연결 종료 대기
+            pool.send("127.0.0.1", server.server_address[1], job)
+            assert server.wait_for(len(job) * 2) == job * 2
+            assert server.connections == 2
+        finally:
+            pool.close()
+            server.stop()
+
+    def test_pool_does_not_retry_fresh_connection(self):
+        """새로 연 연결의 전송 오류는 (일부가 이미 출력됐을 수 있으므로) 재시도하지 않음"""
+        pool = RawConnectionPool()
+        broken = MagicMock()
+        broken.sendall.side_effect = ConnectionResetError
+        with patch.object(pool, "_connect", return_value=broken) as connect:
+            with pytest.raises(ConnectionResetError):
+                pool.send("127.0.0.1", 9100, b"job")
+        assert connect.call_count == 1 and broken.sendall.call_count == 1
+        broken.close.assert_called_once()
+        assert pool._idle == {}
+
+    def test_pool_retries_stale_idle_connection_once(self):
+        """재사용한 유휴 연결이 끊겨 있었으면 새 연결로 한 번만 재시도"""
+        pool = RawConnectionPool()
+        stale, fresh = MagicMock(), MagicMock()
+        stale.sendall.side_effect = BrokenPipeError
+        pool._release(("127.0.0.1", 9100), stale)
+        with patch.object(RawConnectionPool, "_is_alive", return_value=True), \
+                patch.object(pool, "_connect", return_value=fresh) as connect:
+            pool.send("127.0.0.1", 9100, b"job")
+        assert connect.call_count == 1 and pool.reuses == 1
+        stale.close.assert_called_once()
+        fresh.sendall.assert_called_once_with(b"job")
+
+        fresh.sendall.side_effect = BrokenPipeError
+        retry = MagicMock()
+        retry.sendall.side_effect = BrokenPipeError
+        with patch.object(RawConnectionPool, "_is_alive", return_value=True), \
+                patch.object(pool, "_connect", return_value=retry) as connect:
+            with pytest.raises(BrokenPipeError):
+                pool.send("127.0.0.1", 9100, b"job")
+        assert connect.call_count == 1 and retry.sendall.call_count == 1
+
+    @patch('printer.subprocess.run')
+    def test_printer_print_raw_bypasses_lp(self, mock_run):
+        """socket:// 프린터는 lp를 호출하지 않는지 테스트"""
+        server = FakeRawPrinter()
+        try:
+            assert printer_print("raw 출력", server.uri, isFromMCP=True) is True
+            expected = optimize_esc_pos(create_esc_pos_content(prepare_print_content("raw 출력")))
+            assert server.wait_for(len(expected)) == expected
+            mock_run.assert_not_called()
+        finally:
+            server.stop()
+
+    def test_printer_print_raw_unreachable(self):
+        """연결할 수 없는 raw 프린터는 실패를 반환하는지 테스트"""
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        assert printer_print("실패", f"socket://127.0.0.1:{port}", isFromMCP=True) is False
+
+
 class TestIntegration:
     """통합 테스트"""
     
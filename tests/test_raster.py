@@ -0,0 +1,123 @@
+"""
+래스터 출력(GS v 0) 테스트
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from raster import (
+    BuiltinGlyphSource, PillowGlyphSource, GlyphCache, RasterRenderer,
+    raster_command, CELL_WIDTH, LINE_HEIGHT,
+)
+
+
+def band_rows(width_bytes, height, data):
+    """이미지 바이트를 행별 '#'/'.' 문자열로"""
+    return [
+        format(int.from_bytes(data[y * width_bytes:(y + 1) * width_bytes], "big"), f"0{width_bytes * 8}b")
+        .replace("0", ".").replace("1", "#")
+        for y in range(height)
+    ]
+
+
+class TestBuiltinGlyphSource:
+    def test_cell_sizes_follow_char_width(self):
+        """반각 12x24, 전각 24x24, 결합 문자 폭 0, 가로/세로 배율 확대"""
+        source = BuiltinGlyphSource()
+        assert source.glyph("A")[:2] == (CELL_WIDTH, LINE_HEIGHT)
+        assert source.glyph("😀")[:2] == (2 * CELL_WIDTH, LINE_HEIGHT)
+        assert source.glyph("‍") == (0, LINE_HEIGHT, [])
+        width, height, rows = source.glyph("A", 2, 2)
+        assert (width, height, len(rows)) == (2 * CELL_WIDTH, 2 * LINE_HEIGHT, 2 * LINE_HEIGHT)
+
+    def test_width_and_height_scale_independently(self):
+        """세로만 2배면 같은 행이 두 번씩, 가로만 2배면 각 픽셀이 두 칸씩"""
+        source = BuiltinGlyphSource()
+        _, _, rows = source.glyph("A")
+        width, height, tall = source.glyph("A", 1, 2)
+        assert (width, height) == (CELL_WIDTH, 2 * LINE_HEIGHT)
+        assert tall == [row for row in rows for _ in range(2)]
+        width, height, wide = source.glyph("A", 2, 1)
+        assert (width, height, len(wide)) == (2 * CELL_WIDTH, LINE_HEIGHT, LINE_HEIGHT)
+        assert format(wide[10], "024b") == "".join(bit * 2 for bit in format(rows[10], "012b"))
+
+    def test_ascii_glyph_shape(self):
+        """'I'는 가운데 세로 막대 (5x7 글꼴을 2배 확대, 위 4도트 여백)"""
+        width, _, rows = BuiltinGlyphSource().glyph("I")
+        assert all(row == 0 for row in rows[:4] + rows[20:])
+        assert format(rows[10], f"0{width}b") == "....##......".replace(".", "0").replace("#", "1")
+        assert BuiltinGlyphSource().glyph(" ")[2] == [0] * LINE_HEIGHT
+
+    def test_hex_box_shows_code_point(self):
+        """ASCII 밖 문자는 코드 포인트 16진수를 적은 상자"""
+        width, _, rows = BuiltinGlyphSource().glyph("😀")
+        assert rows[0] == rows[-1] == (1 << width) - 1
+        assert rows[6] != rows[13]  # "01F" / "600" 두 줄
+        assert BuiltinGlyphSource().glyph("가")[2] != rows
+
+
+class TestRasterRenderer:
+    def test_line_centered_in_fixed_band(self):
+        """띠 폭은 용지 칸 수 기준으로 고정, 줄은 가운데 정렬"""
+        renderer = RasterRenderer(10)
+        width_bytes, height, data = renderer.bitmap("I")
+        assert (width_bytes, height, len(data)) == (15, 24, 15 * 24)
+        rows = band_rows(width_bytes, height, data)
+        assert rows[10] == "." * 54 + "...." + "##" + "......" + "." * 54
+
+    @pytest.mark.parametrize("align,left", [(0, 0), (1, 54), (2, 108)])
+    def test_alignment(self, align, left):
+        """align은 ESC a 값과 같음 (0: 왼쪽, 1: 가운데, 2: 오른쪽)"""
+        rows = band_rows(*RasterRenderer(10).bitmap("I", align=align))
+        assert rows[10].index("#") == left + 4
+
+    def test_assembly_matches_glyph_bitmaps(self):
+        """조립한 띠의 각 칸이 글리프 비트맵과 같음"""
+        source = BuiltinGlyphSource()
+        renderer = RasterRenderer(4, source)
+        rows = band_rows(*renderer.bitmap("a가"))
+        for char, left in (("a", 6), ("가", 18)):
+            width, _, glyph = source.glyph(char)
+            for y in range(LINE_HEIGHT):
+                assert rows[y][left:left + width] == format(glyph[y], f"0{width}b").replace("0", ".").replace("1", "#")
+
+    def test_overflow_clipped(self):
+        """띠보다 긴 줄은 넘치는 글자를 잘라냄"""
+        renderer = RasterRenderer(2)
+        assert renderer.bitmap("ABC") == renderer.bitmap("AB")
+
+    def test_glyph_and_band_caches(self):
+        """글리프는 (문자, 크기)별 한 번만 만들고, 같은 줄의 띠는 그대로 재사용"""
+        renderer = RasterRenderer(40)
+        first = renderer.band("aaa 😀")
+        assert renderer.glyphs.misses == 3 and renderer.glyphs.hits == 2
+        assert renderer.band("aaa 😀") is first and renderer.band_hits == 1
+        renderer.bitmap("aa", 2, 2)
+        renderer.bitmap("aa", 1, 2)
+        assert renderer.glyphs.misses == 5
+        assert renderer.band("aaa 😀", align=0) is not first and renderer.band_hits == 1
+
+    def test_glyph_cache_bounded(self):
+        cache = GlyphCache(BuiltinGlyphSource(), 480, max_entries=2)
+        for char in "abc":
+            cache.get(char)
+        assert list(cache._entries) == [("b", 1, 1), ("c", 1, 1)]
+
+    def test_raster_command_header(self):
+        assert raster_command(60, 24, b"\x00" * 1440)[:8] == b"\x1dv0\x00\x3c\x00\x18\x00"
+        assert raster_command(2, 300, b"")[:8] == b"\x1dv0\x00\x02\x00\x2c\x01"
+
+
+def test_pillow_source_requires_pillow():
+    """Pillow가 없으면 설치 안내와 함께 실패"""
+    try:
+        import PIL  # noqa: F401
+        pytest.skip("Pillow가 설치되어 있음")
+    except ImportError:
+        pass
+    with pytest.raises(RuntimeError, match="Pillow"):
+        PillowGlyphSource("/nonexistent.ttf")